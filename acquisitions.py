@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Acquisition-target scoring of independent hospitals.
+
+    python acquisitions.py candidates.xlsx [--competitor "Veterinary Practice Partners"]
+                           [--top 10] [--output ranked.csv]
+
+Candidates come as xlsx, csv or parquet files in the layout of the partner
+spreadsheets (`vets_partners_*_google_reviews.xlsx`); only the columns in
+CANDIDATE_COLUMNS are needed. Each candidate gets a 0-100 score, the
+weighted sum of these parts, each between 0 and 1:
+
+* Rating Quality: Google rating shrunk towards the average of the existing branches
+  by MIN_REVIEWS_FOR_RANKING pseudo-reviews, so a 5.0 from three reviews does
+  not beat a 4.8 from five hundred.
+* Review Volume, Local Demand: percentile of the review count and of the
+  population within DISPLAY_CATCHMENT_MILES among all candidates.
+* AAHA: 1 for accredited hospitals.
+* Alliance Gap, Competitor Presence: distance to the nearest Alliance and
+  competitor branch, as in `whitespace`.
+
+Candidates that already are Alliance or competitor branches (same hospital
+ID) are dropped. The spatial indexes over the density grid and the branches
+are built once per data version (`TargetScorer`), and candidates are scored
+in chunks of vectorized queries, so tens of thousands take seconds.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from build_bundle import DEFAULT_OUTPUT
+from competitors import ALLIANCE, COMPETITORS, is_available
+from dataset import open_current
+from hospital_ids import HOSPITAL_ID, hospital_ids
+from readers import READERS
+from spatial_index import DISPLAY_CATCHMENT_MILES, SpatialIndex
+from tiers import MIN_REVIEWS_FOR_RANKING
+from whitespace import REACH_MILES, STATE_REGIONS
+
+CANDIDATE_COLUMNS = [
+    "Veterinary Partner Name", "Location", "StatesShortName", "latitude", "longitude",
+    "Rating", "Total Ratings #", "AAHA Accreditation Status",
+]
+
+# Weight of every part of the score; they add up to 1
+SCORE_WEIGHTS = {
+    "Rating Quality": 0.30,
+    "Review Volume": 0.15,
+    "AAHA": 0.15,
+    "Local Demand": 0.20,
+    "Alliance Gap": 0.15,
+    "Competitor Presence": 0.05,
+}
+
+# Candidates whose spatial features are computed in one step
+SCORING_CHUNK = 10_000
+
+# Parsers for candidate files. Candidate lists are uploaded by dashboard users,
+# so formats that can run code when loaded (pickles) are never accepted
+CANDIDATE_READERS = {extension: READERS[extension] for extension in (".xlsx", ".csv", ".parquet")}
+
+RANKED_COLUMNS = [
+    "Region", "Rank", "Veterinary Partner Name", "Location", "Score", *SCORE_WEIGHTS,
+    "Rating", "Total Ratings #", "AAHA Accreditation Status",
+    f"Population within {DISPLAY_CATCHMENT_MILES} mi", "Alliance Miles", "Competitor Miles",
+]
+
+
+def read_candidates(source, name=None):
+    """Candidate frame from a file path, or from a file object whose file name is `name`."""
+    extension = os.path.splitext(name or source)[1].lower()
+    if extension not in CANDIDATE_READERS:
+        raise ValueError(f"Unsupported candidate file type: {name or source}")
+    candidates = CANDIDATE_READERS[extension](source)
+    missing = [column for column in CANDIDATE_COLUMNS if column not in candidates.columns]
+    if missing:
+        raise ValueError(f"Candidate file is missing columns {missing}")
+    return candidates
+
+
+class TargetScorer:
+    """Spatial indexes and rating prior of one data version, for scoring candidate pools against it."""
+
+    def __init__(self, us_density, aa_hospitals, comp_hospitals):
+        density = us_density.dropna(subset=["latitude", "longitude"])
+        self.population = SpatialIndex(density["latitude"], density["longitude"], density["population"])
+        # Branches without coordinates still count as branches, but not as places
+        aa_located = aa_hospitals.dropna(subset=["latitude", "longitude"])
+        comp_located = comp_hospitals.dropna(subset=["latitude", "longitude"])
+        self.alliance = SpatialIndex(aa_located["latitude"], aa_located["longitude"])
+        self.competitor = SpatialIndex(comp_located["latitude"], comp_located["longitude"])
+        branches = pd.concat([aa_hospitals, comp_hospitals], ignore_index=True)
+        self.branch_ids = set(branches[HOSPITAL_ID])
+        self.prior_rating = float(
+            np.average(branches["Rating"], weights=branches["Total Ratings #"])
+        ) if branches["Total Ratings #"].sum() else 4.5
+
+    def spatial_features(self, candidates, chunk=SCORING_CHUNK):
+        """Population within the catchment and distances to the nearest branches, one chunk at a time."""
+        parts = []
+        for start in range(0, len(candidates), chunk):
+            latitude = candidates["latitude"].iloc[start:start + chunk]
+            longitude = candidates["longitude"].iloc[start:start + chunk]
+            parts.append(pd.DataFrame({
+                f"Population within {DISPLAY_CATCHMENT_MILES} mi": self.population.sum_within(
+                    latitude, longitude, DISPLAY_CATCHMENT_MILES
+                ).astype("int64"),
+                "Alliance Miles": self.alliance.nearest_miles(latitude, longitude),
+                "Competitor Miles": self.competitor.nearest_miles(latitude, longitude),
+            }, index=latitude.index))
+        return pd.concat(parts) if parts else pd.DataFrame(columns=RANKED_COLUMNS[-3:], dtype="float64")
+
+    def score(self, candidates):
+        """
+        Scored candidates, ranked within each region (see module docstring),
+        and a summary with the number of candidates read, skipped for each
+        reason, scored, and scored but left unranked because their state
+        lies in no region.
+        """
+        summary = {"candidates": len(candidates)}
+        candidates = candidates[CANDIDATE_COLUMNS + (["Region"] if "Region" in candidates else [])]
+        located = candidates.dropna(subset=["latitude", "longitude"]).reset_index(drop=True)
+        summary["without_coordinates"] = len(candidates) - len(located)
+        candidates = located.assign(**{
+            HOSPITAL_ID: hospital_ids(located, ["Veterinary Partner Name", "Location"]),
+            "Rating": pd.to_numeric(located["Rating"], errors="coerce"),
+            "Total Ratings #": pd.to_numeric(located["Total Ratings #"], errors="coerce").fillna(0),
+        })
+        independent = candidates[~candidates[HOSPITAL_ID].isin(self.branch_ids)]
+        summary["existing_branches"] = len(candidates) - len(independent)
+        candidates = independent.drop_duplicates(HOSPITAL_ID).reset_index(drop=True)
+        summary["duplicates"] = len(independent) - len(candidates)
+        if "Region" not in candidates:
+            candidates["Region"] = candidates["StatesShortName"].astype(str).map(STATE_REGIONS)
+        candidates = candidates.join(self.spatial_features(candidates))
+
+        reviews = candidates["Total Ratings #"].to_numpy(dtype="float64")
+        rating = candidates["Rating"].fillna(self.prior_rating).to_numpy(dtype="float64")
+        shrunk = (rating * reviews + self.prior_rating * MIN_REVIEWS_FOR_RANKING) / (reviews + MIN_REVIEWS_FOR_RANKING)
+        parts = pd.DataFrame({
+            "Rating Quality": (shrunk - 1) / 4,
+            "Review Volume": candidates["Total Ratings #"].rank(pct=True),
+            "AAHA": (candidates["AAHA Accreditation Status"].astype(str) == "Yes").astype("float64"),
+            "Local Demand": candidates[f"Population within {DISPLAY_CATCHMENT_MILES} mi"].rank(pct=True),
+            "Alliance Gap": 1 - np.exp(-candidates["Alliance Miles"].fillna(np.inf) / REACH_MILES),
+            "Competitor Presence": np.exp(-candidates["Competitor Miles"].fillna(np.inf) / REACH_MILES),
+        })
+        candidates["Score"] = 100 * (parts * pd.Series(SCORE_WEIGHTS)).sum(axis=1)
+        candidates = candidates.assign(**parts.round(3)).round(
+            {"Score": 1, "Alliance Miles": 1, "Competitor Miles": 1}
+        )
+        candidates = candidates.sort_values(["Region", "Score"], ascending=[True, False], kind="stable")
+        # Candidates outside every region keep their score but get no rank
+        candidates["Rank"] = (candidates.groupby("Region").cumcount() + 1).astype("Int64")
+        summary["scored"] = len(candidates)
+        summary["unranked"] = int(candidates["Rank"].isna().sum())
+        return candidates[RANKED_COLUMNS].reset_index(drop=True), summary
+
+
+def top_targets(ranked, region, count=10):
+    """The `count` best candidates of `region`, or of all regions for "All"."""
+    if region == "All":
+        return ranked.sort_values("Score", ascending=False, kind="stable").head(count)
+    return ranked[ranked["Region"] == region].head(count)
+
+
+def describe_scoring(summary):
+    """One-line account of a `TargetScorer.score` summary."""
+    skipped = [
+        f"{summary[key]:,} {reason}"
+        for key, reason in [
+            ("without_coordinates", "without coordinates"),
+            ("existing_branches", "already Alliance or competitor branches"),
+            ("duplicates", "duplicates"),
+        ]
+        if summary[key]
+    ]
+    text = f"{summary['scored']:,} of {summary['candidates']:,} candidates scored"
+    if skipped:
+        text += f" ({', '.join(skipped)} skipped)"
+    if summary["unranked"]:
+        text += f"; {summary['unranked']:,} in states outside the regions are not ranked"
+    return text + "."
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("candidates", help="xlsx/csv/parquet file of candidate hospitals")
+    parser.add_argument("--bundle", default=os.environ.get("AAH_BUNDLE_DIR", DEFAULT_OUTPUT), help="bundle root directory")
+    parser.add_argument(
+        "--competitor",
+        default=next(name for name in COMPETITORS if is_available(name)),
+        help="competitor whose branches count as competitor presence",
+    )
+    parser.add_argument("--top", type=int, default=5, help="candidates to print per region")
+    parser.add_argument("--output", help="write all ranked candidates to this CSV file")
+    args = parser.parse_args(argv)
+
+    dataset = open_current(args.bundle)
+    scorer = TargetScorer(
+        dataset.table("us_density", ["latitude", "longitude", "population"]),
+        dataset.hospitals(ALLIANCE),
+        dataset.hospitals(args.competitor),
+    )
+    ranked, summary = scorer.score(read_candidates(args.candidates))
+    print(describe_scoring(summary))
+    if args.output:
+        ranked.to_csv(args.output, index=False)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(ranked.groupby("Region").head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Headless performance benchmark of dashboard.py.
+
+    python benchmarks/bench_dashboard.py [--output bench_results.json] [--repeat 3]
+                                         [--compare previous.json]
+
+The script is driven through Streamlit's AppTest runner, once per sidebar
+combination (every competitor in the registry x every region) plus a set of
+representative Section V interactions. Every scenario runs in a Python
+process of its own, so its memory figure is not inflated by the scenarios
+before it. For each scenario it records:
+
+    cold_s      first run in a fresh session with all Streamlit caches cleared
+    warm_s      median of `--repeat` reruns of the same session
+    sections_s  per-section wall time of the last warm rerun (see perf.py)
+    peak_rss_mb peak resident set size of the scenario's process, including
+                the interpreter and imports
+
+Results are written as JSON together with the data bundle version and the
+git commit, so runs can be compared across data drops and code changes.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from competitors import COMPETITORS, is_available  # noqa: E402
+from data_loader import current_version  # noqa: E402
+from metrics_cube import REGIONS  # noqa: E402
+from perf import TIMER_KEY  # noqa: E402
+
+DASHBOARD = os.path.join(REPO_ROOT, "dashboard.py")
+
+# Section V interactions run on top of the default sidebar selection
+SECTION_V_INTERACTIONS = [
+    ("tier filter", {"category_selectbox": "Tier 1", "comp_category_selectbox": "Tier 4"}),
+    ("branch search", {"search": "animal hospital"}),
+    ("branch search typo", {"search": "afordable comp"}),
+    ("competitor deep-dive", {"company": "Veterinary Practice Partners", "search": "30th"}),
+]
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def display_name(competitor):
+    return competitor if is_available(competitor) else f"(Unavailable) {competitor}"
+
+
+def timed_run(app):
+    start = time.perf_counter()
+    app.run()
+    elapsed = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(f"Dashboard raised: {app.exception[0].value}")
+    return elapsed
+
+
+def apply_interaction(app, interaction):
+    for key in ("category_selectbox", "comp_category_selectbox"):
+        if key in interaction:
+            app.selectbox(key=key).set_value(interaction[key])
+    if "company" in interaction:
+        company_select = next(s for s in app.selectbox if s.label == "For further deep-dive below")
+        company_select.set_value(interaction["company"])
+    if "search" in interaction:
+        app.text_input[0].set_value(interaction["search"])
+
+
+def run_scenario(name, competitor, region, interaction=None, repeat=3):
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+    app = AppTest.from_file(DASHBOARD, default_timeout=600)
+    # The default sidebar selection is the first competitor and "All"
+    cold = timed_run(app)
+    app.sidebar.selectbox[0].set_value(display_name(competitor))
+    app.sidebar.selectbox[1].set_value(region)
+    cold += timed_run(app)
+    if interaction:
+        apply_interaction(app, interaction)
+        timed_run(app)
+
+    warm = [timed_run(app) for _ in range(repeat)]
+    timer = app.session_state[TIMER_KEY] if TIMER_KEY in app.session_state else None
+    return {
+        "scenario": name,
+        "competitor": competitor,
+        "region": region,
+        "interaction": interaction,
+        "cold_s": cold,
+        "warm_s": statistics.median(warm),
+        "sections_s": dict(timer.timings) if timer is not None else {},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def scenarios():
+    for competitor in COMPETITORS:
+        for region in REGIONS:
+            yield f"{competitor} / {region}", competitor, region, None
+    default_competitor = next(iter(COMPETITORS))
+    for name, interaction in SECTION_V_INTERACTIONS:
+        yield f"Section V: {name}", default_competitor, "All", interaction
+
+
+def run_isolated(name, repeat):
+    """Run scenario `name` in a fresh process (see `--scenario`) and return its entry."""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--scenario", name, "--repeat", str(repeat)],
+        capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scenario {name!r} failed:\n{completed.stderr}")
+    # The entry is the last line; the dashboard may print before it
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, previous):
+    """Print the warm/cold time ratio of every scenario present in both runs."""
+    before = {entry["scenario"]: entry for entry in previous["scenarios"]}
+    print(f"{'scenario':60s} {'cold x':>8s} {'warm x':>8s}")
+    for entry in results["scenarios"]:
+        if entry["scenario"] not in before:
+            continue
+        old = before[entry["scenario"]]
+        print(
+            f"{entry['scenario'][:60]:60s} "
+            f"{entry['cold_s'] / old['cold_s']:8.2f} {entry['warm_s'] / old['warm_s']:8.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless performance benchmark of dashboard.py")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--repeat", type=int, default=3, help="warm reruns per scenario")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--filter", default="", help="only run scenarios whose name contains this text")
+    # Internal: run one scenario in this process and print its entry as JSON
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output)
+    # The dashboard reads its data and images relative to the repository root
+    os.chdir(REPO_ROOT)
+
+    if args.scenario is not None:
+        name, competitor, region, interaction = next(
+            scenario for scenario in scenarios() if scenario[0] == args.scenario
+        )
+        entry = run_scenario(name, competitor, region, interaction, repeat=args.repeat)
+        print(json.dumps(entry))
+        return
+
+    results = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "data_version": current_version(),
+        "python": platform.python_version(),
+        "streamlit": st.__version__,
+        "scenarios": [],
+    }
+    for name, competitor, region, interaction in scenarios():
+        if args.filter not in name:
+            continue
+        entry = run_isolated(name, args.repeat)
+        results["scenarios"].append(entry)
+        print(
+            f"{name[:60]:60s} cold {entry['cold_s']:7.3f}s  warm {entry['warm_s']:7.3f}s  "
+            f"peak {entry['peak_rss_mb']:7.1f} MB"
+        )
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent-session load test of dashboard.py.
+
+    python benchmarks/load_test.py [--users 1,4,16] [--actions 20] [--think 0.5]
+                                   [--url ws://localhost:8501 --server-pid PID]
+                                   [--output load_results.json]
+
+Simulates N users, each with their own browser session, clicking through the
+dashboard: switch region, change a tier filter, search a branch and switch the
+deep-dive company. For every N it reports the p50/p95/p99 rerun latency (from
+sending the widget change to the script finishing), throughput in reruns per
+second and the server's resident memory.
+
+Users talk to a real `streamlit run dashboard.py` server over its websocket
+protocol, exactly like the browser frontend, so caching, fragments and
+contention between sessions behave as in production. Without `--url` the
+script starts a headless server on a free port and stops it at the end.
+Streamlit's AppTest runner cannot be used here: it runs one app at a time per
+process.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import streamlit as st
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+from bench_dashboard import DASHBOARD, REPO_ROOT, git_commit
+
+STREAM_PATH = "/_stcore/stream"
+HEALTH_PATH = "/_stcore/health"
+
+# Branch searches typed by the simulated users, including typos and partial names
+SEARCHES = ["", "animal", "animal hospital", "vet clinic", "afordable", "30th", "wilk", "pet care"]
+
+# Widgets the click paths use, by their key or label
+REGION = "Select Region"
+TIER_FILTERS = ["category_selectbox", "comp_category_selectbox"]
+COMPANY = "For further deep-dive below"
+SEARCH = "Fuzzy-Search Branch Name"
+
+
+class Session:
+    """
+    One simulated browser tab. Like the frontend, it remembers the widgets of
+    the latest run and sends the values the user changed with every rerun.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.widgets = {}  # widget name -> (element kind, proto, fragment id)
+        self.states = {}   # widget id -> WidgetState
+        self.errors = 0
+        self._ws = None
+
+    async def connect(self):
+        self._ws = await websocket_connect(
+            self.url + STREAM_PATH, subprotocols=["streamlit"], max_message_size=256 * 2**20
+        )
+
+    def close(self):
+        self._ws.close()
+
+    async def rerun(self, fragment_id=""):
+        """Request a (fragment) rerun and wait for it to finish. Returns its latency."""
+        message = BackMsg()
+        message.rerun_script.page_script_hash = ""
+        message.rerun_script.fragment_id = fragment_id
+        message.rerun_script.widget_states.widgets.extend(self.states.values())
+
+        start = time.perf_counter()
+        await self._ws.write_message(message.SerializeToString(), binary=True)
+        widgets = {}
+        while True:
+            raw = await self._ws.read_message()
+            if raw is None:
+                raise ConnectionError("The server closed the session")
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof("type")
+            if kind == "script_finished":
+                break
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                element_kind = element.WhichOneof("type")
+                if element_kind == "exception":
+                    self.errors += 1
+                elif element_kind in ("selectbox", "text_input"):
+                    widget = getattr(element, element_kind)
+                    key = widget.id.rsplit("-", 1)[-1]
+                    name = widget.label if key == "None" else key
+                    widgets[name] = (element_kind, widget, forward.delta.fragment_id)
+        elapsed = time.perf_counter() - start
+
+        # A fragment run only redraws the widgets of that fragment
+        if fragment_id:
+            widgets.update(
+                (name, widget) for name, widget in self.widgets.items() if widget[2] != fragment_id
+            )
+        self.widgets = widgets
+        live_ids = {widget.id for _, widget, _ in widgets.values()}
+        self.states = {widget_id: state for widget_id, state in self.states.items() if widget_id in live_ids}
+        return elapsed
+
+    def set(self, name, value):
+        """Change widget `name` to `value`; returns the fragment the widget belongs to."""
+        kind, widget, fragment_id = self.widgets[name]
+        state = WidgetState(id=widget.id)
+        if kind == "selectbox":
+            state.int_value = list(widget.options).index(value)
+        else:
+            state.string_value = value
+        self.states[widget.id] = state
+        return fragment_id
+
+    def options(self, name):
+        return list(self.widgets[name][1].options)
+
+
+def next_action(session, rng):
+    """Pick a click the user can make on the current page: (action name, widget, value)."""
+    actions = []
+    if REGION in session.widgets:
+        actions.append(("switch region", REGION, rng.choice(session.options(REGION))))
+    tier_filters = [name for name in TIER_FILTERS if name in session.widgets]
+    if tier_filters:
+        name = rng.choice(tier_filters)
+        actions.append(("change tier filter", name, rng.choice(session.options(name))))
+    if SEARCH in session.widgets:
+        actions.append(("search branch", SEARCH, rng.choice(SEARCHES)))
+    if COMPANY in session.widgets:
+        actions.append(("switch company", COMPANY, rng.choice(session.options(COMPANY))))
+    return rng.choice(actions)
+
+
+async def simulate_user(url, actions, think, seed, samples):
+    """Load the page, then make `actions` clicks with random think time in between."""
+    rng = random.Random(seed)
+    session = Session(url)
+    await session.connect()
+    try:
+        samples.append(("page load", await session.rerun()))
+        for _ in range(actions):
+            if think:
+                await asyncio.sleep(rng.expovariate(1 / think))
+            action, name, value = next_action(session, rng)
+            fragment_id = session.set(name, value)
+            samples.append((action, await session.rerun(fragment_id)))
+    finally:
+        session.close()
+    return session.errors
+
+
+def percentiles(latencies):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"p50_s": p50, "p95_s": p95, "p99_s": p99}
+
+
+def server_memory_mb(pid):
+    """Current and peak resident memory of process `pid` (Linux only)."""
+    if pid is None or not os.path.exists(f"/proc/{pid}/status"):
+        return None, None
+    values = {}
+    with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                values[key] = int(value.split()[0]) / 1024
+    return values.get("VmRSS"), values.get("VmHWM")
+
+
+async def run_level(url, users, actions, think, seed, server_pid):
+    samples = []
+    start = time.perf_counter()
+    errors = await asyncio.gather(
+        *(simulate_user(url, actions, think, seed * 1000 + user, samples) for user in range(users))
+    )
+    wall = time.perf_counter() - start
+    rss, peak_rss = server_memory_mb(server_pid)
+
+    by_action = {}
+    for action, latency in samples:
+        by_action.setdefault(action, []).append(latency)
+    return {
+        "users": users,
+        "reruns": len(samples),
+        "errors": sum(errors),
+        "wall_s": wall,
+        "throughput_rps": len(samples) / wall,
+        **percentiles([latency for _, latency in samples]),
+        "actions": {action: {"count": len(values), **percentiles(values)} for action, values in by_action.items()},
+        "server_rss_mb": rss,
+        "server_peak_rss_mb": peak_rss,
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, timeout=120):
+    """Start a headless dashboard server on `port` and wait until it is healthy."""
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", DASHBOARD,
+            "--server.headless", "true",
+            "--server.port", str(port),
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=REPO_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The dashboard server exited during startup")
+        try:
+            with urllib.request.urlopen(f"http://localhost:{port}{HEALTH_PATH}", timeout=1) as response:
+                if response.status == 200:
+                    return process
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise TimeoutError(f"The dashboard server did not become healthy within {timeout}s")
+
+
+async def run(args, url, server_pid):
+    # One untimed page load so every level starts from warm shared caches
+    for _ in range(args.warmup):
+        await simulate_user(url, 0, 0, -1, [])
+
+    levels = []
+    for users in args.users:
+        level = await run_level(url, users, args.actions, args.think, args.seed, server_pid)
+        levels.append(level)
+        memory = f"{level['server_rss_mb']:.0f} MB" if level["server_rss_mb"] is not None else "n/a"
+        print(
+            f"{users:4d} users  {level['reruns']:5d} reruns  {level['throughput_rps']:7.2f}/s  "
+            f"p50 {level['p50_s'] * 1000:7.0f} ms  p95 {level['p95_s'] * 1000:7.0f} ms  "
+            f"p99 {level['p99_s'] * 1000:7.0f} ms  errors {level['errors']}  server RSS {memory}"
+        )
+    return levels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of dashboard.py")
+    parser.add_argument("--users", default="1,4,16", help="comma-separated numbers of concurrent users")
+    parser.add_argument("--actions", type=int, default=20, help="clicks per user after the page load")
+    parser.add_argument("--think", type=float, default=0.5, help="mean think time between clicks, in seconds")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed page loads before the first level")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the click paths")
+    parser.add_argument("--url", help="websocket URL of a running dashboard, e.g. ws://localhost:8501")
+    parser.add_argument("--server-pid", type=int, help="process id of that server, to report its memory")
+    parser.add_argument("--output", default="load_results.json", help="where to write the JSON results")
+    args = parser.parse_args(argv)
+    args.users = [int(users) for users in args.users.split(",")]
+
+    server = None
+    url, server_pid = args.url, args.server_pid
+    if url is None:
+        port = free_port()
+        server = start_server(port)
+        url, server_pid = f"ws://localhost:{port}", server.pid
+    try:
+        levels = asyncio.run(run(args, url.rstrip("/"), server_pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    results = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "streamlit": st.__version__,
+        "actions_per_user": args.actions,
+        "think_s": args.think,
+        "levels": levels,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Typo-tolerant search over hospital branch names and locations.
+
+The index maps every character trigram of the normalized branch text to the
+branches containing it. A query is scored by the share of its trigrams each
+branch contains, so small typos only cost a few trigrams instead of failing
+the match, and matches that start with or contain the query are ranked first.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Share of the query's trigrams a branch must contain to be returned
+MIN_QUERY_COVERAGE = 0.5
+
+
+def normalize(text):
+    """Lowercase `text` and reduce it to single-space separated alphanumeric words."""
+    return " ".join(re.findall(r"[a-z0-9]+", str(text).lower()))
+
+
+def trigrams(text):
+    """Unique trigrams of the words in `text`, padded so word starts weigh more."""
+    grams = set()
+    for word in normalize(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class BranchSearchIndex:
+    """Trigram index over branch names; build once, query on every keystroke."""
+
+    def __init__(self, branches, companies):
+        self.branches = np.asarray(branches, dtype=object)
+        self._normalized = [normalize(branch) for branch in self.branches]
+        company_codes, self.companies = pd.factorize(pd.Series(companies), sort=False)
+        self._company_codes = company_codes
+
+        postings = {}
+        self._gram_counts = np.zeros(len(self.branches), dtype="int32")
+        for position, branch in enumerate(self.branches):
+            grams = trigrams(branch)
+            self._gram_counts[position] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        self._postings = {gram: np.asarray(rows, dtype="int32") for gram, rows in postings.items()}
+
+    def _company_mask(self, company):
+        if company is None:
+            return np.ones(len(self.branches), dtype=bool)
+        matches = np.flatnonzero(self.companies == company)
+        if len(matches) == 0:
+            return np.zeros(len(self.branches), dtype=bool)
+        return self._company_codes == matches[0]
+
+    def search(self, query, company=None, limit=None):
+        """
+        Branch names matching `query`, best first, optionally limited to one
+        company. An empty query returns every branch alphabetically.
+        """
+        mask = self._company_mask(company)
+        query_grams = trigrams(query)
+        if not query_grams:
+            return sorted(self.branches[mask].tolist())[:limit]
+
+        hits = [self._postings[gram] for gram in query_grams if gram in self._postings]
+        if not hits:
+            return []
+        overlap = np.bincount(np.concatenate(hits), minlength=len(self.branches))
+        coverage = overlap / len(query_grams)
+        candidates = np.flatnonzero(mask & (coverage >= MIN_QUERY_COVERAGE))
+
+        normalized_query = normalize(query)
+        # Dice similarity favours branches whose text is close to the query as a whole
+        dice = 2 * overlap[candidates] / (len(query_grams) + self._gram_counts[candidates])
+        prefix = np.array([self._normalized[i].startswith(normalized_query) for i in candidates])
+        substring = np.array([normalized_query in self._normalized[i] for i in candidates])
+        score = coverage[candidates] + dice + prefix + 0.5 * substring
+
+        order = np.lexsort((self.branches[candidates], -score))
+        return self.branches[candidates[order]].tolist()[:limit]
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Compile the raw xlsx/pkl inputs into a versioned columnar data bundle.
+
+    python build_bundle.py [--source-dir .] [--output data_bundle]
+
+Every table listed in `schema.TABLES` is read from its source file, cast to
+the declared dtypes and written as Parquet into `<output>/<version>/`, next
+to a `manifest.json` describing the tables. Derived tables, such as the
+level-of-detail density grids and the per-branch catchment tables, are
+computed here as well. The version is a
+hash of the source contents and the schema, so rebuilding unchanged inputs
+is a no-op.
+Rows of tables with a `geocode` column that come without coordinates are
+geocoded from it (see `geocoding`), with the lookups cached in
+`geocode_cache.csv` next to the sources.
+Branch ratings come from the review store (`reviews.sqlite`) when it
+exists. Manual fixes listed in `corrections.json` are applied after that and
+logged to `corrections_log.json` in the version directory.
+`<output>/CURRENT` names the version the dashboard reads and is replaced
+atomically once the new version is complete.
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from corrections import CORRECTIONS_FILE, apply_corrections, load_corrections
+from density_lod import LOD_BIN_SIZES, build_density_levels
+from geocoding import GEOCODE_CACHE_FILE, Gazetteer, fill_coordinates, load_cache, save_cache
+from hospital_ids import HOSPITAL_ID, hospital_ids
+from readers import read_source
+from review_store import REVIEW_STORE_FILE, apply_ratings, connect, hospital_ratings, ratings_fingerprint
+from schema import BUNDLE_FORMAT_VERSION, SHARED_CATEGORIES, TABLES
+from spatial_index import CATCHMENT_MILES, build_catchment_tables
+
+DEFAULT_OUTPUT = "data_bundle"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def apply_dtypes(frame, dtypes, table):
+    """Keep the declared columns of `frame` and cast them to their dtypes."""
+    missing = [column for column in dtypes if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Source for table '{table}' is missing columns: {missing}")
+    return frame[list(dtypes)].astype(dtypes)
+
+
+def geocode_sources(raw, source_dir):
+    """
+    Fill in the missing coordinates of the raw tables with a `geocode`
+    column, against the raw `us_density` gazetteer and the geocode cache in
+    `source_dir`. Returns the frames and the geocoding summary per table.
+    """
+    raw = dict(raw)
+    summaries = {}
+    gazetteer = None
+    cache_path = os.path.join(source_dir, GEOCODE_CACHE_FILE)
+    cache = load_cache(cache_path)
+    for name, spec in TABLES.items():
+        if "geocode" not in spec:
+            continue
+        frame = raw[name]
+        if {"latitude", "longitude"} <= set(frame.columns) and frame[["latitude", "longitude"]].notna().all(axis=None):
+            continue
+        if gazetteer is None:
+            gazetteer = Gazetteer(raw["us_density"])
+        raw[name], cache, summaries[name] = fill_coordinates(frame, spec["geocode"], gazetteer, cache)
+    if summaries:
+        save_cache(cache, cache_path)
+    return raw, summaries
+
+
+def add_hospital_ids(frame, key_columns):
+    """
+    Add the `Hospital ID` column to `frame` and keep the first row of every
+    ID. Returns the frame and the number of duplicate rows dropped.
+    """
+    frame = frame.assign(**{HOSPITAL_ID: hospital_ids(frame, key_columns)})
+    duplicated = frame[HOSPITAL_ID].duplicated()
+    return frame[~duplicated].reset_index(drop=True), int(duplicated.sum())
+
+
+def share_categories(frames, columns=SHARED_CATEGORIES):
+    """Give each categorical column in `columns` the union of its categories across `frames`."""
+    frames = dict(frames)
+    for column in columns:
+        holders = [
+            name for name, frame in frames.items()
+            if column in frame.columns and isinstance(frame[column].dtype, pd.CategoricalDtype)
+        ]
+        categories = sorted(set().union(*(frames[name][column].cat.categories for name in holders)))
+        for name in holders:
+            frames[name] = frames[name].assign(
+                **{column: frames[name][column].cat.set_categories(categories)}
+            )
+    return frames
+
+
+def bundle_version(source_hashes):
+    payload = json.dumps(
+        {
+            "format": BUNDLE_FORMAT_VERSION,
+            "tables": TABLES,
+            "density_lod": LOD_BIN_SIZES,
+            "catchment_miles": CATCHMENT_MILES,
+            "sources": source_hashes,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def write_table(frame, name, staging_dir, manifest, **info):
+    file_name = f"{name}.parquet"
+    frame.to_parquet(os.path.join(staging_dir, file_name), index=False)
+    manifest["tables"][name] = {
+        "file": file_name,
+        "rows": len(frame),
+        "columns": {column: str(dtype) for column, dtype in frame.dtypes.items()},
+        **info,
+    }
+
+
+def write_version(frames, version, output=DEFAULT_OUTPUT, table_info=None, corrections=None, ratings=None,
+                  **manifest_info):
+    """
+    Write `frames` ({table name: frame}), with hospital IDs added, the review
+    store's `ratings` and `corrections` applied, the density LOD grids
+    derived from `us_density` and the catchment tables of the hospitals
+    as bundle `version`. `table_info` adds per-table manifest entries,
+    `manifest_info` top-level ones. The version directory only appears once
+    it is complete.
+    """
+    table_info = {name: dict(info) for name, info in (table_info or {}).items()}
+    frames = dict(frames)
+    for name, spec in TABLES.items():
+        if "hospital_key" in spec and name in frames:
+            frames[name], dropped = add_hospital_ids(frames[name], spec["hospital_key"])
+            table_info.setdefault(name, {})["duplicate_hospitals_dropped"] = dropped
+    if ratings is not None:
+        frames, updated = apply_ratings(frames, ratings)
+        for name, rows in updated.items():
+            table_info.setdefault(name, {})["ratings_from_review_store"] = rows
+    audit = []
+    if corrections is not None:
+        frames, audit = apply_corrections(frames, corrections)
+    frames = share_categories(frames)
+    version_dir = os.path.join(output, version)
+    staging_dir = version_dir + ".tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "version": version,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        **manifest_info,
+        "corrections": {
+            "log": "corrections_log.json",
+            "entries": len(audit),
+            "unmatched": sum(1 for entry in audit if entry["rows"] == 0),
+        },
+        "tables": {},
+    }
+    for name, frame in frames.items():
+        write_table(frame, name, staging_dir, manifest, **table_info.get(name, {}))
+
+    for name, frame in build_density_levels(frames["us_density"]).items():
+        write_table(frame, name, staging_dir, manifest, derived_from="us_density")
+
+    hospital_tables = [
+        name for name, spec in TABLES.items()
+        if "hospital_key" in spec and name in frames and "latitude" in frames[name].columns
+    ]
+    hospitals = pd.concat([frames[name] for name in hospital_tables], ignore_index=True)
+    for name, frame in build_catchment_tables(hospitals, frames["us_density"]).items():
+        write_table(frame, name, staging_dir, manifest, derived_from=hospital_tables + ["us_density"])
+
+    with open(os.path.join(staging_dir, "corrections_log.json"), "w", encoding="utf-8") as f:
+        json.dump(audit, f, indent=2)
+    with open(os.path.join(staging_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.replace(staging_dir, version_dir)
+
+
+def publish_version(version, output=DEFAULT_OUTPUT):
+    """Point `<output>/CURRENT` at `version`, switching readers over in one step."""
+    pointer = os.path.join(output, "CURRENT")
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+
+
+def build_bundle(source_dir=".", output=DEFAULT_OUTPUT, force=False):
+    """Build the bundle and point `<output>/CURRENT` at it. Returns the version."""
+    source_hashes = {
+        name: file_sha256(os.path.join(source_dir, spec["source"]))
+        for name, spec in TABLES.items()
+    }
+    corrections_path = os.path.join(source_dir, CORRECTIONS_FILE)
+    corrections_hash = file_sha256(corrections_path) if os.path.exists(corrections_path) else None
+    ratings = None
+    store_path = os.path.join(source_dir, REVIEW_STORE_FILE)
+    if os.path.exists(store_path):
+        conn = connect(store_path)
+        try:
+            ratings = hospital_ratings(conn)
+        finally:
+            conn.close()
+    version = bundle_version({
+        **source_hashes,
+        CORRECTIONS_FILE: corrections_hash,
+        REVIEW_STORE_FILE: ratings_fingerprint(ratings) if ratings is not None else None,
+    })
+
+    if force or not os.path.exists(os.path.join(output, version, "manifest.json")):
+        raw = {name: read_source(os.path.join(source_dir, spec["source"])) for name, spec in TABLES.items()}
+        raw, geocoded = geocode_sources(raw, source_dir)
+        frames = {name: apply_dtypes(raw[name], spec["dtypes"], name) for name, spec in TABLES.items()}
+        table_info = {
+            name: {"source": spec["source"], "source_sha256": source_hashes[name]}
+            for name, spec in TABLES.items()
+        }
+        for name, summary in geocoded.items():
+            table_info[name]["geocoding"] = summary
+        write_version(frames, version, output, table_info, load_corrections(corrections_path), ratings)
+
+    publish_version(version, output)
+    return version
+
+
+def prune_versions(output=DEFAULT_OUTPUT, keep=2):
+    """Delete all but the `keep` most recent bundle versions, never the current one."""
+    with open(os.path.join(output, "CURRENT"), encoding="utf-8") as f:
+        current = f.read().strip()
+    versions = sorted(
+        (entry for entry in os.scandir(output) if entry.is_dir() and entry.name != current),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in versions[max(keep - 1, 0):]:
+        shutil.rmtree(entry.path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source-dir", default=".", help="directory holding the raw xlsx/pkl files")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="bundle root directory")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the version exists")
+    parser.add_argument("--keep", type=int, default=2, help="number of bundle versions to keep")
+    args = parser.parse_args(argv)
+
+    version = build_bundle(args.source_dir, args.output, force=args.force)
+    prune_versions(args.output, keep=args.keep)
+    print(f"Bundle version {version} written to {os.path.join(args.output, version)}")
+    with open(os.path.join(args.output, version, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    for name, info in manifest["tables"].items():
+        geocoding = info.get("geocoding")
+        if geocoding and geocoding["unresolved"]:
+            print(
+                f"{name}: {len(geocoding['unresolved'])} locations could not be geocoded, add latitude/longitude "
+                f"corrections for them: {'; '.join(geocoding['unresolved'])}"
+            )
+    corrections = manifest["corrections"]
+    if corrections["unmatched"]:
+        print(
+            f"{corrections['unmatched']} of {corrections['entries']} corrections matched no rows, "
+            f"see {corrections['log']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
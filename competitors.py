@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Registry of the companies the dashboard can benchmark.
+
+Each competitor maps to the bundle table holding its hospitals; the table's
+source file and dtypes are declared in `schema.TABLES`. Competitors without
+collected data map to None and are listed as unavailable. To add one, declare
+its table in `schema.TABLES`, rebuild the bundle and register the table here.
+
+Hospital tables are only read when a company is actually selected, and the
+shared `dataset.Dataset` keeps them per bundle version, so switching between
+competitors is a cache lookup.
+"""
+
+from hospital_ids import HOSPITAL_ID
+
+ALLIANCE = "Alliance Animal Health"
+ALLIANCE_TABLE = "aa_partners"
+
+COMPETITORS = {
+    "Veterinary Practice Partners": "vvp_partners",
+    "All": None,
+    "Nebraska Animal Medical and Emergency Center": None,
+    "Victor Medical Company": None,
+    "VCA Animal Hospitals": None,
+    "Mission Veterinary Partners": None,
+}
+
+# Hospital columns every company table provides to the dashboard
+PARTNER_COLUMNS = [
+    HOSPITAL_ID, "Company", "Veterinary Partner Name", "Region", "Location", "Rating",
+    "Total Ratings #", "AAHA Accreditation Status", "latitude", "longitude",
+]
+
+
+def is_available(company):
+    return company == ALLIANCE or COMPETITORS.get(company) is not None
+
+
+def hospital_table(company):
+    """Bundle table holding the hospitals of `company` (Alliance or a registered competitor)."""
+    if not is_available(company):
+        raise KeyError(f"No hospital data registered for '{company}'")
+    return ALLIANCE_TABLE if company == ALLIANCE else COMPETITORS[company]
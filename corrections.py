@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Manual data corrections applied when the bundle is built.
+
+`corrections.json`, next to the raw data files, lists value overrides and row
+exclusions for tables keyed by hospital (see `schema.TABLES`):
+
+    {
+      "overrides": [
+        {"table": "vet_reviews_details", "hospital": "Name, City, ST",
+         "column": "Doctors Praised", "value": "...", "reason": "..."}
+      ],
+      "exclusions": [
+        {"table": "vet_reviews_details", "hospital": "Name, City, ST", "reason": "..."}
+      ]
+    }
+
+Hospitals are matched by ID, so the "Name, Location" text only has to match
+up to case and whitespace. All entries of one table and column are applied in
+a single vectorized step. Values are converted to the column's dtype, so a
+latitude / longitude override stays numeric; values that cannot be converted
+are rejected. Each entry is recorded in an audit log, together with the
+number of rows it matched and the values it replaced.
+"""
+
+import json
+import os
+
+import pandas as pd
+
+from hospital_ids import HOSPITAL_ID, hospital_id
+from schema import TABLES
+
+CORRECTIONS_FILE = "corrections.json"
+
+
+def load_corrections(path):
+    """Corrections listed in `path`, or none if the file does not exist."""
+    if not os.path.exists(path):
+        return {"overrides": [], "exclusions": []}
+    with open(path, encoding="utf-8") as f:
+        corrections = json.load(f)
+    return {"overrides": corrections.get("overrides", []), "exclusions": corrections.get("exclusions", [])}
+
+
+def _check_entry(entry, frames):
+    table = entry["table"]
+    if "hospital_key" not in TABLES.get(table, {}):
+        raise ValueError(f"Corrections are only supported for hospital tables, not '{table}'")
+    if "column" in entry and entry["column"] not in frames[table].columns:
+        raise ValueError(f"Correction for unknown column '{entry['column']}' of table '{table}'")
+
+
+def _override_values(values, entries, frame, table, column):
+    """
+    `values` ({hospital ID: value}) converted to the dtype of `frame[column]`,
+    so an override never changes the dtype the schema declares.
+    """
+    dtype = frame[column].dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return values
+    try:
+        return values.astype(dtype)
+    except (TypeError, ValueError):
+        for entry in entries.itertuples(index=False):
+            try:
+                pd.Series([entry.value]).astype(dtype)
+            except (TypeError, ValueError):
+                raise ValueError(
+                    f"Override of column '{column}' of table '{table}' for '{entry.hospital}' is not a valid "
+                    f"{dtype} value: {entry.value!r}"
+                ) from None
+        raise
+
+
+def apply_corrections(frames, corrections):
+    """
+    Apply `corrections` to `frames` ({table name: frame with hospital IDs}).
+    Returns the corrected frames and the audit log, one record per entry.
+    """
+    frames = dict(frames)
+    audit = []
+    overrides = pd.DataFrame(corrections["overrides"], columns=["table", "hospital", "column", "value", "reason"])
+    exclusions = pd.DataFrame(corrections["exclusions"], columns=["table", "hospital", "reason"])
+    for entry in corrections["overrides"] + corrections["exclusions"]:
+        _check_entry(entry, frames)
+    overrides["id"] = [hospital_id(hospital) for hospital in overrides["hospital"]]
+    exclusions["id"] = [hospital_id(hospital) for hospital in exclusions["hospital"]]
+
+    for (table, column), entries in overrides.groupby(["table", "column"], sort=False):
+        frame = frames[table]
+        values = entries.drop_duplicates("id", keep="last").set_index("id")["value"]
+        values = _override_values(values, entries, frame, table, column)
+        matched = frame[HOSPITAL_ID].isin(values.index)
+        previous = frame.loc[matched].set_index(HOSPITAL_ID)[column]
+        frame = frame.copy()
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            added = values.dropna().unique()
+            frame[column] = frame[column].cat.add_categories(
+                [value for value in added if value not in frame[column].cat.categories]
+            )
+        frame.loc[matched, column] = frame.loc[matched, HOSPITAL_ID].map(values)
+        frames[table] = frame
+        for entry in entries.itertuples(index=False):
+            old = previous.get(entry.id)
+            audit.append({
+                "action": "override",
+                "table": table,
+                "hospital": entry.hospital,
+                "column": column,
+                "rows": int((frame[HOSPITAL_ID] == entry.id).sum()),
+                "previous": None if old is None or pd.isna(old) else str(old),
+                "value": entry.value,
+                "reason": entry.reason,
+            })
+
+    for table, entries in exclusions.groupby("table", sort=False):
+        frame = frames[table]
+        excluded = frame[HOSPITAL_ID].isin(entries["id"])
+        counts = frame.loc[excluded, HOSPITAL_ID].value_counts()
+        frames[table] = frame[~excluded].reset_index(drop=True)
+        for entry in entries.itertuples(index=False):
+            audit.append({
+                "action": "exclude",
+                "table": table,
+                "hospital": entry.hospital,
+                "rows": int(counts.get(entry.id, 0)),
+                "reason": entry.reason,
+            })
+    return frames, audit
@@ -5,11 +5,33 @@ Created on Mon Dec  9 12:59:35 2024
 @author: huang
 """
 
+import io
+import os
+from contextlib import closing
+
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import numpy as np
-import plotly.express as px
+
+from acquisitions import (
+    CANDIDATE_COLUMNS, CANDIDATE_READERS, TargetScorer, describe_scoring, read_candidates, top_targets
+)
+from branch_search import BranchSearchIndex
+from competitors import ALLIANCE, COMPETITORS, is_available
+from data_loader import ensure_bundle, load_dataset, open_review_store
+from density_lod import lod_table_name, pick_bin_size
+from figure_cache import FigureCache
+from figures import build_presence_map, build_tier_pie
+from hospital_ids import HOSPITAL_ID
+from metrics_cube import REGIONS, build_metrics_cube
+from perf import end_section, record_frame, render_profile_panel, reset_timer, start_section
+from review_store import search_reviews
+from spatial_index import DISPLAY_CATCHMENT_MILES
+from tiers import MIN_REVIEWS_FOR_RANKING, TIERS, TierTable, classify_tiers
+from whitespace import DENSITY_COLUMNS as WHITESPACE_DENSITY_COLUMNS, build_whitespace, top_areas
+
+# Frames returned by the dataset are shared across sessions; copy-on-write
+# keeps edits made by this script from leaking into the shared copies
+pd.set_option("mode.copy_on_write", True)
 
 # Set Streamlit page configuration
 st.set_page_config(
@@ -18,18 +40,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"  # Expands the sidebar by default
 )
 
+# Wall time per section of this run, read by the benchmarks
+reset_timer()
+start_section("Static content")
+
 # Title for the dashboard
 st.title("Alliance Animal Health Competitive Analysis Dashboard [Prototype]")
 
-# Define options and their availability
-options = {
-    "Veterinary Practice Partners": True,
-    "All": False,
-    "Nebraska Animal Medical and Emergency Center": False,
-    "Victor Medical Company": False,
-    "VCA Animal Hospitals": False,
-    "Mission Veterinary Partners": False,
-}
+# Define options and their availability (see competitors.COMPETITORS)
+options = {name: is_available(name) for name in COMPETITORS}
 
 # Create a list of display names for the selectbox
 display_options = [
@@ -187,19 +206,7 @@ st.sidebar.markdown(
 
 # Dropdown Menu for Region Selection
 st.sidebar.header("Region Level Comparison")
-regions = [
-    "All",
-    "New England",
-    "Mid-Atlantic",
-    "East North Central",
-    "West North Central",
-    "South Atlantic",
-    "East South Central",
-    "West South Central",
-    "Mountain",
-    "Pacific",
-    
-]
+regions = REGIONS
 
 regions_explanation = {
     "All": ["",""],
@@ -326,209 +333,175 @@ st.markdown(
 
 
 
-# Load data
-us_density = pd.read_excel("us_density.xlsx")  # Ensure it has latitude, longitude, and density_category
-aa_partners = pd.read_excel("vets_partners_aa_google_reviews.xlsx")  # Ensure correct columns
-vet_reviews_details = pd.read_pickle(r"vet_reviews_details.pkl")
-
+# Columns each part of the dashboard reads from the data bundle
+DENSITY_COLUMNS = ["latitude", "longitude", "density_category"]
+REVIEW_DETAIL_COLUMNS = [
+    HOSPITAL_ID, "Hospital", "Key Complaints", "Doctors with Complaints", "Key Recommendations", "Doctors Praised",
+]
+REGION_SUMMARY_COLUMNS = [
+    "Region", "Medical Expertise", "Facilities", "Service Attitude", "Cost & Accessibility",
+]
 
+# Load data (read once per bundle version and shared across sessions). Every
+# table of this run comes from this one dataset, even if a new version is
+# published while the run is in progress
+start_section("Data load")
+ensure_bundle()
+dataset = load_dataset()
+aa_partners = dataset.hospitals(ALLIANCE)
+record_frame("aa_partners", aa_partners)
 
 
-# Cache data loading
-# @st.cache_data
-# def load_data():
-#     us_density = pd.read_parquet("us_density.parquet")
-#     aa_partners = pd.read_parquet("vets_partners_aa_google_reviews.parquet")
-#     #vvp_partners = pd.read_parquet("vets_partners_vvp_google_reviews.parquet")
-#     vet_reviews_details = pd.read_pickle("vet_reviews_details.pkl")
-#     return us_density, aa_partners, vet_reviews_details
+# Check if the selected option has data available
+if options[selected_option]:
+    st.write(f"Displaying data for Alliance Animal Health and {selected_option}")
+else:
+    st.warning(f"### Data for {selected_option} is currently unavailable. [Prototype] version ONLY incorporates Veterinary Practice Partner data for demonstration purposes. Please switch back to Veterinary Practice Partner.")
+    end_section()
+    render_profile_panel()
+    st.stop()
 
-# # Load data
-# us_density, aa_partners, vvp_partners, vet_reviews_details = load_data()
+# Only the selected competitor's hospitals are loaded
+comp_partners = dataset.hospitals(selected_option)
+record_frame("comp_partners", comp_partners)
 
 
+start_section("Section III map")
 
-# Normalize the density values for visualization
-us_density["normalized_density"] = np.log1p(us_density["density_category"])
+# Built figures are shared by all sessions and keyed by everything they depend on
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    return FigureCache()
 
 
-# Check if the selected option has data available
-if options[selected_option]:
-    st.write(f"Displaying data for Alliance Animal Health and {selected_option}")
-else:
-    st.warning(f"### Data for {selected_option} is currently unavailable. [Prototype] version ONLY incorporates Veterinary Practice Partner data for demonstration purposes. Please switch back to Veterinary Practice Partner.")
+figure_cache = get_figure_cache()
 
 
-# Create the base map
-fig = go.Figure()
-
-# Add density points to the map (without hover info)
-fig.add_trace(
-    go.Scattergeo(
-        lat=us_density["latitude"],
-        lon=us_density["longitude"],
-        marker=dict(
-            size=4,
-            color=us_density["density_category"],
-            colorscale="Blues",
-            showscale=True,
-            colorbar=dict(title="Density Category"),
+# Underserved areas for Alliance against the selected competitor, scored over
+# the full density grid once per data version and competitor
+def get_whitespace(dataset, competitor):
+    return dataset.derived(
+        ("whitespace", competitor),
+        lambda: build_whitespace(
+            dataset.table("us_density", WHITESPACE_DENSITY_COLUMNS),
+            dataset.hospitals(ALLIANCE),
+            dataset.hospitals(competitor),
         ),
-        hoverinfo="skip",  # Disable hover for density points
-        name="",
     )
-)
 
-# Add orange dots for Alliance Animal Health partners
-if selected_region == "All":
-    aa_partners_region = aa_partners
-else:
-    aa_partners_region = aa_partners[aa_partners["Region"]==selected_region]
-
-fig.add_trace(
-    go.Scattergeo(
-        lat=aa_partners_region["latitude"],
-        lon=aa_partners_region["longitude"],
-        # text=aa_partners.apply(
-        #     lambda row: (
-        #         f"<b>{row['Veterinary Partner Name']}</b><br>"
-        #         f"<b>Rating:</b> {row['Rating']}/5<br>"
-        #         f"<b>Total Reviews:</b> {row['Total Ratings #']}"
-        #     ),
-        #     axis=1,
-        # ),
-        text=aa_partners_region.apply(
-            lambda row: (
-                f"<span style='font-size:16px;'><b>{row['Veterinary Partner Name']}</b></span><br><br>"  # Extra <br> for spacing
-                f"<span style='font-size:16px;'><b>Rating/#Reviews:</b> {row['Rating']}/{row['Total Ratings #']}</span>"
-            ),
-            axis=1,
+
+# Number of underserved areas marked on the map and listed below it
+WHITESPACE_TOP_AREAS = 10
+
+
+def presence_map(dataset, competitor, region):
+    # The map always shows the full US (regions filter the markers, not the view),
+    # so the density overlay uses the grid level that matches that extent
+    return figure_cache.get_or_build(
+        ("presence_map", dataset.version, competitor, region),
+        lambda: build_presence_map(
+            dataset.table(lod_table_name(pick_bin_size()), DENSITY_COLUMNS),
+            dataset.hospitals(ALLIANCE, region),
+            dataset.hospitals(competitor, region),
+            competitor,
+            top_areas(get_whitespace(dataset, competitor), region, WHITESPACE_TOP_AREAS),
         ),
-        mode="markers",
-        marker=dict(color="orange", size=8),
-        name="Alliance Animal Health",
     )
-)
 
-# Add purple dots for competitors if selected
-if selected_option == "Veterinary Practice Partners":
-    vvp_partners = pd.read_excel("vets_partners_vvp_google_reviews.xlsx")  # Ensure correct columns
-    if selected_region == "All":
-        vvp_partners_region = vvp_partners
-    else: 
-        vvp_partners_region = vvp_partners[vvp_partners["Region"]==selected_region]
-    fig.add_trace(
-        go.Scattergeo(
-            lat=vvp_partners_region["latitude"],
-            lon=vvp_partners_region["longitude"],
-            text=vvp_partners_region.apply(
-                lambda row: (
-                    f"<span style='font-size:16px;'><b>{row['Veterinary Partner Name']}</b></span><br><br>"  # Extra <br> for spacing
-                    f"<span style='font-size:16px;'><b>Rating/#Reviews:</b> {row['Rating']}/{row['Total Ratings #']}</span><br>"
-                ),
-                axis=1,
-            ),
-            mode="markers",
-            marker=dict(color="purple", size=8),
-            name=selected_option,
-        )
-    )
-    
-    
-
-# Update map layout
-fig.update_layout(
-    geo=dict(
-        scope="usa",
-        showland=True,
-        landcolor="white",  # Set land color to white
-        showlakes=False,    # Optional: Disable lakes
-        showocean=False,    # Optional: Disable ocean             
-    ),
-    dragmode=False,  # Disable dragging/zooming
-    title={
-        "text": "US Veterinary Hospitals Presence based on Population Density",
-        "x": 0.5,  # Center title
-        "xanchor": "center",
-        "yanchor": "top",
-        "font": {"size": 20},  # Larger font for the title
-    },
-    height=800,
-    margin={"r": 0, "t": 100, "l": 0, "b": 0},
-    legend=dict(
-        orientation="h",
-        yanchor="top",
-        y=0.92,  # Place the legend below the title
-        xanchor="center",
-        x=0.5,
-        font=dict(size=14),
-    ),
-)
 
 # Render the map in Streamlit
-st.plotly_chart(fig, use_container_width=True)
+st.plotly_chart(presence_map(dataset, selected_option, selected_region), use_container_width=True)
+
+# Ranked underserved areas of the selected region, the red diamonds on the map
+st.markdown(
+    """
+    <div class="custom-font">
+        <strong>Underserved areas</strong>: populated zip codes far from any Alliance branch, weighted up where a competitor branch shows proven demand, grouped into areas and ranked by gap score.
+   </div>
+    """,
+    unsafe_allow_html=True
+)
+st.dataframe(
+    top_areas(get_whitespace(dataset, selected_option), selected_region, WHITESPACE_TOP_AREAS)[
+        ["Region", "Rank", "Area", "Population", "Zip Codes", "Alliance Miles", "Competitor Miles", "Gap Score"]
+    ],
+    hide_index=True,
+)
 
 
 #%% Section 2
+start_section("Section III metrics")
+
+# Catchment metrics shown for every branch, read from the bundle's
+# precomputed catchment tables; the rival of each company is the other one
+CATCHMENT_COLUMNS = [
+    f"Population within {DISPLAY_CATCHMENT_MILES} mi",
+    "Nearest Rival Miles",
+    f"Rivals within {DISPLAY_CATCHMENT_MILES} mi",
+]
+
+
+def build_hospitals(dataset, competitor):
+    hospitals = pd.concat([dataset.hospitals(ALLIANCE), dataset.hospitals(competitor)], ignore_index=True)
+    catchments = dataset.table("hospital_catchments", [HOSPITAL_ID, "Company", CATCHMENT_COLUMNS[0]])
+    competition = dataset.table("hospital_competition", [HOSPITAL_ID, "Company", "Rival Company", *CATCHMENT_COLUMNS[1:]])
+    competition = competition[
+        ((competition["Company"] == ALLIANCE) & (competition["Rival Company"] == competitor))
+        | ((competition["Company"] == competitor) & (competition["Rival Company"] == ALLIANCE))
+    ].drop(columns="Rival Company")
+    competition["Nearest Rival Miles"] = competition["Nearest Rival Miles"].round(1)
+    return (
+        hospitals.merge(catchments, on=[HOSPITAL_ID, "Company"], how="left")
+        .merge(competition, on=[HOSPITAL_ID, "Company"], how="left")
+    )
 
-vets_review = aa_partners
-vets_review["Ratings*Reviews"] = vets_review['Total Ratings #'] * vets_review['Rating'] 
-vets_sum1 = vets_review.groupby('Region')[["Veterinary Partner Name"]].nunique()
-vets_sum2 = vets_review.groupby('Region')[['Total Ratings #', "Ratings*Reviews"]].sum()
-vets_sum = pd.concat([vets_sum1, vets_sum2], axis=1)
-vets_sum.reset_index(inplace=True)
-vets_sum["Rating"] = vets_sum["Ratings*Reviews"] / vets_sum['Total Ratings #']
-vets_sum.loc[len(vets_sum)] = ["All", 
-                               sum(vets_sum['Veterinary Partner Name']), 
-                               sum(vets_sum['Total Ratings #']), 
-                               sum(vets_sum['Ratings*Reviews']),
-                               sum(vets_sum['Ratings*Reviews'])/sum(vets_sum['Total Ratings #'])]
-
-
-comp_vets_review = vvp_partners
-comp_vets_review["Ratings*Reviews"] = comp_vets_review['Total Ratings #'] * comp_vets_review['Rating'] 
-comp_vets_sum1 = comp_vets_review.groupby('Region')[["Veterinary Partner Name"]].nunique()
-comp_vets_sum2 = comp_vets_review.groupby('Region')[['Total Ratings #', "Ratings*Reviews"]].sum()
-comp_vets_sum = pd.concat([comp_vets_sum1, comp_vets_sum2], axis=1)
-comp_vets_sum.reset_index(inplace=True)
-comp_vets_sum["Rating"] = comp_vets_sum["Ratings*Reviews"] / comp_vets_sum['Total Ratings #']
-comp_vets_sum.loc[len(vets_sum)] = ["All", 
-                                   sum(comp_vets_sum['Veterinary Partner Name']), 
-                                   sum(comp_vets_sum['Total Ratings #']), 
-                                   sum(comp_vets_sum['Ratings*Reviews']),
-                                   sum(comp_vets_sum['Ratings*Reviews'])/sum(comp_vets_sum['Total Ratings #'])]    
-
-all_vets_review = pd.concat([vets_review[["Company", "Veterinary Partner Name", "Region", "Location", 'Total Ratings #', 'Rating', "AAHA Accreditation Status"]],
-                        comp_vets_review[["Company", "Veterinary Partner Name", "Region", "Location", 'Total Ratings #', 'Rating', "AAHA Accreditation Status"]]])
-region_bench = all_vets_review[["Region"]].drop_duplicates()
-region_bench.loc[len(region_bench)] = ["All"]
-vets_sum = pd.merge(region_bench, vets_sum, how="left", on="Region")
-vets_sum.fillna(0, inplace=True)
-
-
-
-all_vets_medium = all_vets_review[all_vets_review['Total Ratings #']>=100].groupby("Region")[['Rating']].median()
-all_vets_medium.reset_index(inplace=True)
-all_vets_medium.columns =["Region", "RatingMedium"]
-all_vets_review = pd.merge(all_vets_review, all_vets_medium, how="left", on="Region")
-all_vets_review["Top50%"] = all_vets_review.apply(lambda x: "Yes" if x["Rating"]>x["RatingMedium"] else "No", axis=1)
-
-all_vets_review_aa = all_vets_review[all_vets_review["Company"]=="Alliance Animal Health"]
-all_vets_review_comp = all_vets_review[all_vets_review["Company"]!="Alliance Animal Health"]
-
-
-
-# Filter DataFrames Based on Region Selection
-vets_filtered = (
-    all_vets_review_aa
-    if selected_region == "All"
-    else all_vets_review_aa[all_vets_review_aa["Region"] == selected_region]
-)
-comp_vets_filtered = (
-    all_vets_review_comp
-    if selected_region == "All"
-    else all_vets_review_comp[all_vets_review_comp["Region"] == selected_region]
-)
+
+# Hospitals of Alliance and the selected competitor in one frame, with their
+# catchment metrics, built once per data version and competitor and shared by
+# everything built from it
+def get_hospitals(dataset, competitor):
+    return dataset.derived(("hospitals", competitor), lambda: build_hospitals(dataset, competitor))
+
+
+# Company x region metrics, built once per data version and competitor and shared by all sessions
+def get_metrics_cube(dataset, competitor):
+    return dataset.derived(
+        ("metrics_cube", competitor),
+        lambda: build_metrics_cube(get_hospitals(dataset, competitor), regions),
+    )
+
+
+metrics_cube = get_metrics_cube(dataset, selected_option)
+
+start_section("Section III tiers")
+
+# Tier classification of Alliance and the selected competitor; the regional
+# medians depend on the pair, so it is built once per data version and competitor
+def get_tier_table(dataset, competitor):
+    return dataset.derived(
+        ("tier_table", competitor),
+        lambda: TierTable(classify_tiers(get_hospitals(dataset, competitor))),
+    )
+
+
+tier_table = get_tier_table(dataset, selected_option)
+
+
+def tier_pie(dataset, competitor, company, region):
+    return figure_cache.get_or_build(
+        ("tier_pie", dataset.version, competitor, company, region),
+        lambda: build_tier_pie(get_tier_table(dataset, competitor).counts(company, region)),
+    )
+
+
+# Columns shown in the "Filter by Tiers" tables
+TIER_DETAIL_COLUMNS = ["Veterinary Partner Name", "Location", "Rating", "Top50%", "Total Ratings #", "AAHA Accreditation Status", *CATCHMENT_COLUMNS]
+
+# Tier counts of the selected region
+tier_counts_aa = tier_table.counts(ALLIANCE, selected_region)
+tier_counts_comp = tier_table.counts(selected_option, selected_region)
+total_aa = int(tier_counts_aa.sum())
+total_comp = int(tier_counts_comp.sum())
 
 
 col1, col2 = st.columns(2)
@@ -539,27 +512,20 @@ with col1:
         "<h2 style='color: orange;'>Alliance Animal Health - Metrics</h2>",
         unsafe_allow_html=True
     )
-    
+
 with col2:
     st.markdown(
         "<h2 style='color: purple;'>"+selected_option+" - Metrics</h2>",
         unsafe_allow_html=True
     )    
-    
-# 1. # Total Practitioners
-total_practitioners_aa = int(vets_sum.loc[
-    vets_sum["Region"] == selected_region, "Veterinary Partner Name"
-].values[0])
-
-total_accredited_aa_details = vets_filtered[(vets_filtered["AAHA Accreditation Status"] == "Yes")]
-total_accredited_aa = len(total_accredited_aa_details)
-
 
+# 1. # Total Practitioners / Accredited Hospitals
 # 2. Overall Rating / Total Reviews
-rating_aa = vets_sum.loc[vets_sum["Region"] == selected_region, "Rating"].values[0]
-total_reviews_aa = vets_sum.loc[
-    vets_sum["Region"] == selected_region, "Total Ratings #"
-].values[0]
+aa_metrics = metrics_cube.metrics(ALLIANCE, selected_region)
+total_practitioners_aa = int(aa_metrics["hospitals"])
+total_accredited_aa = int(aa_metrics["accredited"])
+rating_aa = aa_metrics["rating"]
+total_reviews_aa = aa_metrics["total_reviews"]
 
 # Format total_reviews_aa with commas
 total_reviews_aa_formatted = f"{int(total_reviews_aa):,}"
@@ -571,21 +537,13 @@ with col1:
         f"#### Google Rating / Reviews: {rating_aa:.2f} / {total_reviews_aa_formatted}"
     )
 
-# 1. # Total Practitioners
-total_practitioners_comp = comp_vets_sum.loc[
-    comp_vets_sum["Region"] == selected_region, "Veterinary Partner Name"
-].values[0]
-
-total_accredited_comp_details = comp_vets_filtered[(comp_vets_filtered["AAHA Accreditation Status"] == "Yes")]
-total_accredited_comp = len(total_accredited_comp_details)
-
+# 1. # Total Practitioners / Accredited Hospitals
 # 2. Overall Rating / Total Reviews
-rating_comp = comp_vets_sum.loc[
-    comp_vets_sum["Region"] == selected_region, "Rating"
-].values[0]
-total_reviews_comp = comp_vets_sum.loc[
-    comp_vets_sum["Region"] == selected_region, "Total Ratings #"
-].values[0]
+comp_metrics = metrics_cube.metrics(selected_option, selected_region)
+total_practitioners_comp = int(comp_metrics["hospitals"])
+total_accredited_comp = int(comp_metrics["accredited"])
+rating_comp = comp_metrics["rating"]
+total_reviews_comp = comp_metrics["total_reviews"]
 
 # Format total_reviews_comp with commas
 total_reviews_comp_formatted = f"{int(total_reviews_comp):,}"
@@ -615,10 +573,10 @@ st.markdown(f"### Rank all these {total_practitioners_aa} + {total_practitioners
 
 
 st.markdown(
-    """
+    f"""
     <div class="custom-font">
     <ul>
-        <li><strong>Criteria 1</strong>: The hospital has a Google rating based on at least 50 reviews, ranking in the top 50% among all hospitals within Alliance and the selected competitor in the specified region.</li>
+        <li><strong>Criteria 1</strong>: The hospital has a Google rating based on at least {MIN_REVIEWS_FOR_RANKING} reviews, ranking in the top 50% among all hospitals within Alliance and the selected competitor in the specified region.</li>
         <li><strong>Criteria 2</strong>: The hospital holds accreditation from the AAHA (American Animal Hospital Association).</li>       
         <li><strong>4 Categories</strong>: <strong>Tier 1</strong> - Meets both Criteria 1 and Criteria 2; <strong>Tier 2</strong> - Meets only Criteria 1; <strong>Tier 3</strong> - Meets only Criteria 2; <strong>Tier 4</strong> - Does not meet either criterion.</li>
     </ul>
@@ -646,230 +604,44 @@ st.markdown(
 #     """,
 #     unsafe_allow_html=True
 # )    
-    
+
 st.markdown("**Reference:** [AAHA (American Animal Hospital Association) Accreditation.](https://www.aaha.org/for-pet-parents/find-an-aaha-hospital/) The only organization that accredits veterinary practices in the US and CA based on rigorous quality standards")
 
 # Create Columns for Side-by-Side Layout
 col3, col4 = st.columns(2)
 # 3. Piechart for Alliance Animal Health Practitioners
-if not vets_filtered.empty:
-    vets_filtered = vets_filtered[["Veterinary Partner Name", "Location", "Rating","Top50%", "Total Ratings #", "AAHA Accreditation Status"]]
-    top50_aa_aa_details = vets_filtered[
-                            (vets_filtered["Top50%"] == "Yes")
-                            & (vets_filtered["AAHA Accreditation Status"] == "Yes")
-                        ].sort_values(by="Rating", ascending=False)
-    
-    top50_aa_aa = len(top50_aa_aa_details)
-    
-    top50_aa_no_details = vets_filtered[
-                            (vets_filtered["Top50%"] == "Yes")
-                            & (vets_filtered["AAHA Accreditation Status"] == "No")
-                        ].sort_values(by="Rating", ascending=False)
-    
-    top50_aa_no = len(top50_aa_no_details)
-    
-    bottom50_aa_aa_details = vets_filtered[
-            (vets_filtered["Top50%"] == "No")
-            & (vets_filtered["AAHA Accreditation Status"] == "Yes")
-        ].sort_values(by="Rating", ascending=False)
-    
-    bottom50_aa_aa = len(bottom50_aa_aa_details)
-    
-    bottom50_aa_no_details = vets_filtered[
-            (vets_filtered["Top50%"] == "No")
-            & (vets_filtered["AAHA Accreditation Status"] == "No")
-        ].sort_values(by="Rating", ascending=True)
-    
-    bottom50_aa_no = len(bottom50_aa_no_details)
-    
-    
-    all_details = pd.concat([top50_aa_aa_details, top50_aa_no_details,
-                             bottom50_aa_aa_details, bottom50_aa_no_details])
-    
-    all_details.sort_values(by="Rating", inplace=True, ascending=False)
-
-
-    # Additional data corresponding to each category
-    details_mapping = {
-        "Top50% & AAHA Accredited": top50_aa_aa_details,
-        "Top50% & Not AAHA Accredited": top50_aa_no_details,
-        "Bottom50% & AAHA Accredited": bottom50_aa_aa_details,
-        "Bottom50% & Not AAHA Accredited": bottom50_aa_no_details,
-        "All": all_details
-    }
-    
-    
-    # Percentages for Pie Chart
-    total_aa = len(vets_filtered)
-    pie_data_aa = {
-        "Category": [
-            #"Top50% & AAHA Accredited",
-            #"Top50% & Not AAHA Accredited",
-            #"Bottom50% & AAHA Accredited",
-            #"Bottom50% & Not AAHA Accredited",
-            "Tier 1",
-            "Tier 2",
-            "Tier 3",
-            "Tier 4",
-            
-        ],
-        "Count": [top50_aa_aa, top50_aa_no, bottom50_aa_aa, bottom50_aa_no],
-        "Percentage": [
-            (top50_aa_aa / total_aa) * 100,
-            (top50_aa_no / total_aa) * 100,
-            (bottom50_aa_aa / total_aa) * 100,
-            (bottom50_aa_no / total_aa) * 100,
-        ],
-        "Color": ["darkblue", "blue", "lightblue", "white"],
-    }    
-
+if total_aa:
     # Alliance Animal Health Practitioner Ratings Breakdown
     with col3:
-        #st.subheader("Alliance Animal Health Practitioner Ratings")
-        # Create the pie chart with explicit category order
         st.markdown("#### Among Alliance's hospitals,")
-
-        pie_fig_aa = px.pie(
-            pie_data_aa,
-            names="Category",
-            values="Count",
-            color="Category",
-            color_discrete_map={
-                "Tier 1": "darkblue",
-                "Tier 2": "blue",
-                "Tier 3": "lightblue",
-                "Tier 4": "white",
-            },
-            #title="Ratings & Accreditation Breakdown",
-            category_orders={
-                "Category": [
-                    "Tier 1",
-                    "Tier 2",
-                    "Tier 3",
-                    "Tier 4",
-                ]
-            },
-        )
-        st.plotly_chart(pie_fig_aa, use_container_width=True)
-else:
-    details_mapping = np.nan
+        st.plotly_chart(tier_pie(dataset, selected_option, ALLIANCE, selected_region), use_container_width=True)
 
 # 3. Piechart for Competitor Practitioners
-if not comp_vets_filtered.empty:
-    comp_vets_filtered = comp_vets_filtered[["Veterinary Partner Name", "Location", "Rating","Top50%", "Total Ratings #", "AAHA Accreditation Status"]]
-    
-    top50_comp_aa_details = comp_vets_filtered[
-            (comp_vets_filtered["Top50%"] == "Yes")
-            & (comp_vets_filtered["AAHA Accreditation Status"] == "Yes")
-        ].sort_values(by="Rating", ascending=False)
-    
-    top50_comp_aa = len(top50_comp_aa_details)
-    
-    top50_comp_no_details = comp_vets_filtered[
-            (comp_vets_filtered["Top50%"] == "Yes")
-            & (comp_vets_filtered["AAHA Accreditation Status"] == "No")
-        ].sort_values(by="Rating", ascending=False)
-    top50_comp_no = len(top50_comp_no_details)
-    
-    
-    bottom50_comp_aa_details = comp_vets_filtered[
-            (comp_vets_filtered["Top50%"] == "No")
-            & (comp_vets_filtered["AAHA Accreditation Status"] == "Yes")
-        ].sort_values(by="Rating", ascending=False)
-    bottom50_comp_aa = len(bottom50_comp_aa_details)
-    
-    bottom50_comp_no_details = comp_vets_filtered[
-            (comp_vets_filtered["Top50%"] == "No")
-            & (comp_vets_filtered["AAHA Accreditation Status"] == "No")
-        ].sort_values(by="Rating", ascending=True)
-    bottom50_comp_no = len(bottom50_comp_no_details)
-    
-    all_details_comp = pd.concat([top50_comp_aa_details, top50_comp_no_details,
-                                  bottom50_comp_aa_details, bottom50_comp_no_details])
-    
-    all_details_comp.sort_values(by="Rating", inplace=True, ascending=False)
-    
-    # Additional data corresponding to each category
-    details_mapping_comp = {
-        "Top50% & AAHA Accredited": top50_comp_aa_details,
-        "Top50% & Not AAHA Accredited": top50_comp_no_details,
-        "Bottom50% & AAHA Accredited": bottom50_comp_aa_details,
-        "Bottom50% & Not AAHA Accredited": bottom50_comp_no_details,
-        "All": all_details_comp
-    }
-    
-    
-    # Percentages for Pie Chart
-    total_comp = len(comp_vets_filtered)
-    pie_data_comp = {
-        "Category": [
-                    "Tier 1",
-                    "Tier 2",
-                    "Tier 3",
-                    "Tier 4",
-        ],
-        "Count": [top50_comp_aa, top50_comp_no, bottom50_comp_aa, bottom50_comp_no],
-        "Percentage": [
-            (top50_comp_aa / total_comp) * 100,
-            (top50_comp_no / total_comp) * 100,
-            (bottom50_comp_aa / total_comp) * 100,
-            (bottom50_comp_no / total_comp) * 100,
-        ],
-        "Color": ["darkblue", "blue", "lightblue", "white"],
-    }
-    
+if total_comp:
     # Competitor Practitioner Ratings Breakdown
-    
     with col4:
-        # Create the pie chart with explicit category order
         st.markdown(
             f"#### Among the {selected_option}'s hospitals,"
         )
-        
-
-        
-        pie_fig_comp = px.pie(
-            pie_data_comp,
-            names="Category",
-            values="Count",
-            color="Category",
-            color_discrete_map={
-                "Tier 1": "darkblue",
-                "Tier 2": "blue",
-                "Tier 3": "lightblue",
-                "Tier 4": "white",
-            },
-            #title="Ratings & Accreditation Breakdown",
-            category_orders={
-                "Category": [
-                    "Tier 1",
-                    "Tier 2",
-                    "Tier 3",
-                    "Tier 4",
-                ]
-            },
-        )
-        # Hide the legend
-        #pie_fig_comp.update_layout(showlegend=False)
-        st.plotly_chart(pie_fig_comp, use_container_width=True)
-else:
-    details_mapping_comp = np.nan
+        st.plotly_chart(tier_pie(dataset, selected_option, selected_option, selected_region), use_container_width=True)
 
 # Create Columns for Side-by-Side Layout
 st.markdown("---")  # Optional horizontal rule for separation
 
 # AI Analysis
+start_section("Section IV region summary")
 st.markdown("### Section IV. OpenAI analyzes 100K+ reviews with improvement recommendations for Alliance vs. competitor in region level")
 
 
-vets_reviews_region_sum = pd.read_pickle(r"vets_reviews_region_sum.pkl")
+vets_reviews_region_sum = dataset.table("vets_reviews_region_sum", REGION_SUMMARY_COLUMNS)
+record_frame("vets_reviews_region_sum", vets_reviews_region_sum)
 filtered_df = vets_reviews_region_sum[vets_reviews_region_sum['Region']==selected_region]
 
 # Check if the region exists in the DataFrame
 if not filtered_df.empty:
     # Extract the row corresponding to the selected region
     row = filtered_df.iloc[0]
-    
+
     # Display the details using markdown
     #st.markdown(f"#### Based on customer reviews, is Alliance Animal Health better or worse than {selected_option}?")
     #st.markdown(f"#### For the specified region, OpenAI compares {total_reviews_aa_formatted} Google customer reviews of Alliance with {total_reviews_comp_formatted} reviews of {selected_option}, focusing on four key aspects. The assessment of Alliance's performance, benchmarked against {selected_option}, is summarized below:")
@@ -896,7 +668,7 @@ if not filtered_df.empty:
             <li style="font-size:21px;"><strong>Medical Expertise:</strong> <span style="color:{color}; font-size:30px;">{me_judge}.</span>{me_reason}</li>
         </ul>
     """, unsafe_allow_html=True)
-    
+
     fa_judge, par, fa_reason =  row['Facilities'].partition('.')
     if fa_judge.strip() == "Worse":
         color = "red"
@@ -911,7 +683,7 @@ if not filtered_df.empty:
         </ul>
     """, unsafe_allow_html=True)
 
-    
+
     sa_judge, par, sa_reason =  row['Service Attitude'].partition('.')
     if sa_judge.strip() == "Worse":
         color = "red"
@@ -926,7 +698,7 @@ if not filtered_df.empty:
         </ul>
     """, unsafe_allow_html=True)
 
-    
+
     ca_judge, par, ca_reason =  row['Cost & Accessibility'].partition('.')
     if ca_judge.strip() == "Worse":
         color = "red"
@@ -950,9 +722,10 @@ else:
 
 
 st.markdown("---")  # Optional horizontal rule for separation
-    
+
 
 # AI Analysis
+start_section("Section V setup")
 st.markdown("### Section V: Deep-dive into Alliance and competitor hospital branches with AI insights from reviews")
 # st.markdown("#### User guide for this section:")
 # st.markdown(
@@ -986,195 +759,347 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-#%%Mannually change
-aa_vvp_partners = pd.concat([aa_partners[['Company', 'Veterinary Partner Name', 'Location']], vvp_partners[['Company', 'Veterinary Partner Name', 'Location']]])
-aa_vvp_partners['Hospital'] = aa_vvp_partners.apply(lambda x: x['Veterinary Partner Name'] +", " + x['Location'], axis=1) 
-vet_reviews_details = pd.merge(vet_reviews_details, aa_vvp_partners[['Hospital', 'Company']], how="left", on="Hospital")
-vet_reviews_details = vet_reviews_details.drop([106, 107], errors='ignore')
+# Review insights joined to the company of their branch, built once per data
+# version and competitor and shared by all sessions
+def build_review_details(dataset, competitor):
+    hospitals = get_hospitals(dataset, competitor)
+    branch_companies = hospitals.drop_duplicates(HOSPITAL_ID).set_index(HOSPITAL_ID)["Company"]
+    review_details = dataset.table("vet_reviews_details", REVIEW_DETAIL_COLUMNS)
+    review_details["Company"] = review_details[HOSPITAL_ID].map(branch_companies)
+    return review_details.rename(columns={"Hospital": "Branch Name"})
+
+
+def get_review_details(dataset, competitor):
+    return dataset.derived(("review_details", competitor), lambda: build_review_details(dataset, competitor))
 
-vet_reviews_details.loc[
-    vet_reviews_details['Hospital'] == '30th Street Animal Hospital, Indianapolis, INDIANA',
-    'Doctors Praised'
-] = "Abby: identified as amazing, Dr. Barnes: praised for knowledge and explanatory skills, Dr. Sam: praised for diligently diagnosing and treating a dog's heart condition."
+
+vet_reviews_details = get_review_details(dataset, selected_option)
+record_frame("vet_reviews_details", vet_reviews_details)
 
 
 #%%
-# Create Columns for Side-by-Side Layout
-col5, col6 = st.columns(2)
+# Section V widgets rerun only their own fragment. Everything they depend on
+# from the sidebar selection and the full run is passed in explicitly.
+# Step 1: tier filter tables for Alliance and the selected competitor
+@st.fragment
+def branch_tier_tables(tier_table, selected_option, selected_region, total_practitioners_aa, total_practitioners_comp, total_aa, total_comp):
+    start_section("Section V tier tables")
+    # Create Columns for Side-by-Side Layout
+    col5, col6 = st.columns(2)
+
+    if total_aa:
+        with col5: 
+            # Left-Hand Side Box: Alliance Animal Health Practitioners
+            st.markdown(
+                f"<h3 style='color: orange;'>Alliance Animal Health - {total_practitioners_aa} Branches</h3>",
+                unsafe_allow_html=True
+            )
+            selected_category = st.selectbox(
+                "Filter by Tiers to View Details:",
+                options=["All"] + TIERS,
+                key="category_selectbox"
+            )
+
+            # Display the corresponding table
+            st.write(f"Details for {selected_category}:")
+            df_aa = tier_table.select(
+                ALLIANCE,
+                selected_region,
+                None if selected_category == "All" else selected_category,
+            )
+            st.dataframe(df_aa[TIER_DETAIL_COLUMNS].rename(columns={"Veterinary Partner Name":"Branch Name"}))
+
+    if total_comp:
+        with col6:  
+            st.markdown(
+                "<h3 style='color: purple;'>"+selected_option+ f" - {total_practitioners_comp} Branches</h3>",
+                unsafe_allow_html=True
+            )    
+            comp_selected_category = st.selectbox(
+                "Filter by Tiers to View Details:",
+                options=["All"] + TIERS,
+                key="comp_category_selectbox"
+            )
+
+            # Display the corresponding table
+            st.write(f"Details for {comp_selected_category}:")
+            df_comp = tier_table.select(
+                selected_option,
+                selected_region,
+                None if comp_selected_category == "All" else comp_selected_category,
+            )
+            st.dataframe(df_comp[TIER_DETAIL_COLUMNS].rename(columns={"Veterinary Partner Name":"Branch Name"}))
+
+    end_section()
+
+
+# Example data
+unique_companies = list(vet_reviews_details["Company"].unique())
+
+
+# Branch search index over Alliance and the selected competitor, built once per data version and competitor
+def get_branch_index(dataset, competitor):
+    review_details = get_review_details(dataset, competitor)
+    return dataset.derived(
+        ("branch_index", competitor),
+        lambda: BranchSearchIndex(review_details["Branch Name"], review_details["Company"]),
+    )
+
+
+branch_index = get_branch_index(dataset, selected_option)
+
+
+# Steps 2-4: company selection, branch search and the branch's AI insights
+@st.fragment
+def branch_insights(vet_reviews_details, branch_index, unique_companies):
+    start_section("Section V search")
+    # Create a selectbox for company selection
+    st.markdown(
+        """
+        <div class="custom-font">
+            <strong>Step 2 - Choose either Alliance Animal Health or the competitor</strong>
+       </div>
+        """,
+        unsafe_allow_html=True
+    )
+    selected_company = st.selectbox("For further deep-dive below", unique_companies)
+    # Search Functionality
+    #st.markdown("#### Veterinary Hospital Branch Search: Type the branch name for AI insights on customer reivews")
+    st.markdown(
+        """
+        <div class="custom-font">
+            <strong>Step 3 - Hospital Branch Search</strong>: Type the branch name to receive AI-generated analyses of customer reviews.
+       </div>
+        """,
+        unsafe_allow_html=True
+    )
+    # Auto-suggestion search box
+    search_input = st.text_input("Fuzzy-Search Branch Name", value="", placeholder="Start typing to search. Just the first few words of the name is sufficient...")
+
+    # Ranked, typo-tolerant matches of the selected company's branches
+    matching_names = branch_index.search(search_input, company=selected_company)
+
+    # Dropdown to select from matching results
+    # Define the default selection
+    default_selection = "Affordable Animal Hospital-Compton, Compton, CA"
+
+    # Check if the default selection is in the list of matching names
+    if default_selection in matching_names:
+        selected_name = st.selectbox(
+            "Select the exact hospital name that matches the fuzzy-search from the dropdown menu",
+            options=matching_names if matching_names else ["No matches found"],
+            index=matching_names.index(default_selection)
+        )
+    else:
+        selected_name = st.selectbox(
+            "Select the exact hospital name from the dropdown menu",
+            options=matching_names if matching_names else ["No matches found"]
+        )
+
+
+
+    st.markdown(
+        """
+        <div class="custom-font">
+            <strong>Step 4 - Access AI-Generated Insights</strong>: OpenAI has analyzed the branch's customer reviews to extract key findings.
+       </div>
+        """,
+        unsafe_allow_html=True
+    )
+
 
-tier_map = {"All":"All", 
-            "Tier 1":"Top50% & AAHA Accredited",
-            "Tier 2": "Top50% & Not AAHA Accredited",
-            "Tier 3": "Bottom50% & AAHA Accredited",
-            "Tier 4": "Bottom50% & Not AAHA Accredited"}
 
 
-if not pd.isna(details_mapping):
-    with col5: 
-        # Left-Hand Side Box: Alliance Animal Health Practitioners
+    # Display details as markdown when a selection is made
+    if selected_name and selected_name != "No matches found":
+        #selected_details = vet_reviews_details[vet_reviews_details["Veterinary Partner Name"] == selected_name].iloc[0]
+        selected_details = vet_reviews_details[
+            (vet_reviews_details["Branch Name"] == selected_name)
+            & (vet_reviews_details["Company"] == selected_company)
+        ].iloc[0]
+        
+        # st.markdown(f"""
+        #     <ul>
+        #         <li><strong style="font-size:21px;">Key Complaints:</strong> <span style="font-size:21px;">{selected_details['Key Complaints']}</span></li>
+        #         <li><strong style="font-size:21px;">Doctors with Complaints:</strong> <span style="font-size:21px;">{selected_details['Doctors with Complaints']}</span></li>
+        #         <li><strong style="font-size:21px;">Key Recommendations:</strong> <span style="font-size:21px;">{selected_details['Key Recommendations']}</span></li>
+        #         <li><strong style="font-size:21px;">Doctors Praised:</strong> <span style="font-size:21px;">{selected_details['Doctors Praised']}</span></li>
+        #     </ul>
+        # """, unsafe_allow_html=True)
+
+        # Inject custom CSS to add indentation
         st.markdown(
-            f"<h3 style='color: orange;'>Alliance Animal Health - {total_practitioners_aa} Branches</h3>",
+            """
+            <style>
+            .indented-content {
+                margin-left: 20px; /* Adjust the value as needed */
+            }
+            </style>
+            """,
             unsafe_allow_html=True
         )
-        # Ensure session state is initialized
-        if "selected_category" not in st.session_state:
-            st.session_state["selected_category"] = None
-        # Simulate click interaction
-        selected_category = st.selectbox(
-            "Filter by Tiers to View Details:",
-            options=["All",]+pie_data_aa["Category"], 
-            key="category_selectbox"
-        )
-        # Update session state
-        st.session_state["selected_category"] = selected_category
-    
-        # Display the corresponding table
-        if (st.session_state["selected_category"]):
-            category = st.session_state["selected_category"]
-            st.write(f"Details for {category}:")
-            df_aa = details_mapping[tier_map[category]].rename(columns={"Veterinary Partner Name":"Branch Name"})
-            st.dataframe(df_aa.sort_values(by='Rating'))
-
-if not pd.isna(details_mapping_comp):    
-    with col6:  
+
+        # st.markdown(
+        #     f"""
+        #     <div class="custom-font">
+        #         <strong>For {selected_company}</strong>, below are key customer review AI insights of branch - <strong>{selected_details['Branch Name']}</strong>:
+        #    </div>
+        #     """,
+        #     unsafe_allow_html=True
+        # )
+        # Display the indented list
         st.markdown(
-            "<h3 style='color: purple;'>"+selected_option+ f" - {total_practitioners_comp} Branches</h3>",
+            f"""
+            <div class="indented-content">
+                <strong style="font-size:21px;">For {selected_company}</strong><span style="font-size:21px;">, below are key customer review AI insights of branch - </span><strong style="font-size:21px;">{selected_details['Branch Name']}</strong>: 
+                <ul>
+                    <li><strong style="font-size:21px;">Key Complaints:</strong> <span style="font-size:21px;">{selected_details['Key Complaints']}</span></li>
+                    <li><strong style="font-size:21px;">Doctors with Complaints:</strong> <span style="font-size:21px;">{selected_details['Doctors with Complaints']}</span></li>
+                    <li><strong style="font-size:21px;">Key Recommendations:</strong> <span style="font-size:21px;">{selected_details['Key Recommendations']}</span></li>
+                    <li><strong style="font-size:21px;">Doctors Praised:</strong> <span style="font-size:21px;">{selected_details['Doctors Praised']}</span></li>
+                </ul>
+            </div>
+            """,
             unsafe_allow_html=True
-        )    
-        # Ensure session state is initialized
-        if "comp_selected_category" not in st.session_state:
-            st.session_state["comp_selected_category"] = None
-        # Simulate click interaction
-        comp_selected_category = st.selectbox(
-            "Filter by Tiers to View Details:",
-            options=["All", "Tier 1", "Tier 2", "Tier 3", "Tier 4"],#["All",]+pie_data_comp["Category"],
-            key="comp_category_selectbox"
         )
-        # Update session state
-        st.session_state["selected_category"] = comp_selected_category
-    
-        # Display the corresponding table
-        if (st.session_state["selected_category"]):
-            category = st.session_state["selected_category"]
-            st.write(f"Details for {category}:")
-            df_comp = details_mapping_comp[tier_map[category]].rename(columns={"Veterinary Partner Name":"Branch Name"})
-            st.dataframe(df_comp.sort_values(by='Rating'))
 
-# Example data
-vet_reviews_details.rename(columns={"Hospital":"Branch Name"},inplace=True)
-unique_companies = list(vet_reviews_details["Company"].unique())
-# Create a selectbox for company selection
-st.markdown(
-    """
-    <div class="custom-font">
-        <strong>Step 2 - Choose either Alliance Animal Health or the competitor</strong>
-   </div>
-    """,
-    unsafe_allow_html=True
-)
-selected_company = st.selectbox("For further deep-dive below", unique_companies)
-vet_reviews_details = vet_reviews_details[vet_reviews_details["Company"]==selected_company]
-# Search Functionality
-#st.markdown("#### Veterinary Hospital Branch Search: Type the branch name for AI insights on customer reivews")
+    end_section()
+
+
+# Step 5: full-text search over the raw reviews of the selected company's
+# branches in the selected region, answered by the review store's index
+@st.fragment
+def review_search(dataset, selected_region, unique_companies):
+    start_section("Section V review search")
+    st.markdown(
+        """
+        <div class="custom-font">
+            <strong>Step 5 - Search the Reviews</strong>: Find what customers write about a topic or a doctor across all branches of a company in the selected region.
+       </div>
+        """,
+        unsafe_allow_html=True
+    )
+    search_company = st.selectbox("Company to search", unique_companies, key="review_search_company")
+    search_text = st.text_input("Search Review Text", value="", placeholder="e.g. wait time, price, Dr. Smith")
+
+    if search_text.strip():
+        hospitals = dataset.hospitals(search_company, selected_region)
+        branch_names = pd.Series(
+            (hospitals["Veterinary Partner Name"] + ", " + hospitals["Location"]).to_numpy(),
+            index=hospitals[HOSPITAL_ID],
+        )
+        review_store = open_review_store()
+        if review_store is None:
+            st.info("No review store found. Ingest reviews with `python review_store.py ingest` to enable the search.")
+        else:
+            with closing(review_store):
+                hits, branches = search_reviews(review_store, search_text, branch_names.index)
+            region_label = "all regions" if selected_region == "All" else selected_region
+            st.write(
+                f"{branches['Hits'].sum():,} reviews of {len(branches)} {search_company} branches "
+                f"in {region_label} mention \"{search_text.strip()}\"."
+            )
+            if len(branches):
+                col_branches, col_hits = st.columns([2, 3])
+                with col_branches:
+                    st.dataframe(
+                        branches.assign(**{"Branch Name": branches[HOSPITAL_ID].map(branch_names)})
+                        [["Branch Name", "Hits", "Average Rating"]],
+                        hide_index=True,
+                    )
+                with col_hits:
+                    st.dataframe(
+                        hits.assign(**{"Branch Name": hits[HOSPITAL_ID].map(branch_names)})
+                        [["Branch Name", "Published", "Rating", "Excerpt"]],
+                        hide_index=True,
+                    )
+
+    end_section()
+
+
+branch_tier_tables(tier_table, selected_option, selected_region, total_practitioners_aa, total_practitioners_comp, total_aa, total_comp)
+branch_insights(vet_reviews_details, branch_index, unique_companies)
+review_search(dataset, selected_region, unique_companies)
+
+
+#%% Section VI
+start_section("Section VI setup")
+st.markdown("### Section VI. Score independent hospitals as acquisition targets")
 st.markdown(
-    """
+    f"""
     <div class="custom-font">
-        <strong>Step 3 - Hospital Branch Search</strong>: Type the branch name to receive AI-generated analyses of customer reviews.
+        Upload a list of independent hospitals in the layout of the partner spreadsheets (columns {", ".join(CANDIDATE_COLUMNS)}). Each candidate is scored from 0 to 100 on its Google rating and review volume, AAHA accreditation, the population around it and its distance to Alliance and {selected_option} branches, and ranked within its region.
    </div>
     """,
     unsafe_allow_html=True
 )
-# Auto-suggestion search box
-search_input = st.text_input("Fuzzy-Search Branch Name", value="", placeholder="Start typing to search. Just the first few words of the name is sufficient...")
-
-# Filter potential matches based on input
-matching_names = vet_reviews_details[
-    vet_reviews_details["Branch Name"].str.contains(search_input, case=False, na=False)
-]["Branch Name"].tolist()
-
-# Dropdown to select from matching results
-#selected_name = st.selectbox("Select the exact hospital name from the dropdown menu", options=matching_names if matching_names else ["No matches found"])
-# Define the default selection
-default_selection = "Affordable Animal Hospital-Compton, Compton, CA"
-
-# Sort the matching names alphabetically
-matching_names = sorted(matching_names) if matching_names else []
-
-# Check if the default selection is in the list of matching names
-if default_selection in matching_names:
-    selected_name = st.selectbox(
-        "Select the exact hospital name that matches the fuzzy-search from the dropdown menu",
-        options=matching_names if matching_names else ["No matches found"],
-        index=matching_names.index(default_selection)
-    )
-else:
-    selected_name = st.selectbox(
-        "Select the exact hospital name from the dropdown menu",
-        options=matching_names if matching_names else ["No matches found"]
-    )
 
 
+# Spatial indexes the candidates are scored against, built once per data version and competitor
+def get_target_scorer(dataset, competitor):
+    return dataset.derived(
+        ("target_scorer", competitor),
+        lambda: TargetScorer(
+            dataset.table("us_density", ["latitude", "longitude", "population"]),
+            dataset.hospitals(ALLIANCE),
+            dataset.hospitals(competitor),
+        ),
+    )
 
-st.markdown(
-    """
-    <div class="custom-font">
-        <strong>Step 4 - Access AI-Generated Insights</strong>: OpenAI has analyzed the branch's customer reviews to extract key findings.
-   </div>
-    """,
-    unsafe_allow_html=True
-)
 
+# Ranked candidates of an uploaded file, by file content, data version and competitor
+@st.cache_data(show_spinner="Scoring candidates...", max_entries=4)
+def score_candidates(content, name, version, competitor, _scorer):
+    return _scorer.score(read_candidates(io.BytesIO(content), name))
 
 
+# Number of candidates listed for the selected region
+ACQUISITION_TOP_TARGETS = 20
 
-# Display details as markdown when a selection is made
-if selected_name and selected_name != "No matches found":
-    #selected_details = vet_reviews_details[vet_reviews_details["Veterinary Partner Name"] == selected_name].iloc[0]
-    selected_details = vet_reviews_details[vet_reviews_details["Branch Name"] == selected_name].iloc[0]
-        
-    # st.markdown(f"""
-    #     <ul>
-    #         <li><strong style="font-size:21px;">Key Complaints:</strong> <span style="font-size:21px;">{selected_details['Key Complaints']}</span></li>
-    #         <li><strong style="font-size:21px;">Doctors with Complaints:</strong> <span style="font-size:21px;">{selected_details['Doctors with Complaints']}</span></li>
-    #         <li><strong style="font-size:21px;">Key Recommendations:</strong> <span style="font-size:21px;">{selected_details['Key Recommendations']}</span></li>
-    #         <li><strong style="font-size:21px;">Doctors Praised:</strong> <span style="font-size:21px;">{selected_details['Doctors Praised']}</span></li>
-    #     </ul>
-    # """, unsafe_allow_html=True)
-    
-    # Inject custom CSS to add indentation
-    st.markdown(
-        """
-        <style>
-        .indented-content {
-            margin-left: 20px; /* Adjust the value as needed */
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
 
-    # st.markdown(
-    #     f"""
-    #     <div class="custom-font">
-    #         <strong>For {selected_company}</strong>, below are key customer review AI insights of branch - <strong>{selected_details['Branch Name']}</strong>:
-    #    </div>
-    #     """,
-    #     unsafe_allow_html=True
-    # )
-    # Display the indented list
-    st.markdown(
-        f"""
-        <div class="indented-content">
-            <strong style="font-size:21px;">For {selected_company}</strong><span style="font-size:21px;">, below are key customer review AI insights of branch - </span><strong style="font-size:21px;">{selected_details['Branch Name']}</strong>: 
-            <ul>
-                <li><strong style="font-size:21px;">Key Complaints:</strong> <span style="font-size:21px;">{selected_details['Key Complaints']}</span></li>
-                <li><strong style="font-size:21px;">Doctors with Complaints:</strong> <span style="font-size:21px;">{selected_details['Doctors with Complaints']}</span></li>
-                <li><strong style="font-size:21px;">Key Recommendations:</strong> <span style="font-size:21px;">{selected_details['Key Recommendations']}</span></li>
-                <li><strong style="font-size:21px;">Doctors Praised:</strong> <span style="font-size:21px;">{selected_details['Doctors Praised']}</span></li>
-            </ul>
-        </div>
-        """,
-        unsafe_allow_html=True
+@st.fragment
+def acquisition_targets(dataset, selected_option, selected_region):
+    start_section("Section VI acquisition targets")
+    uploaded = st.file_uploader(
+        "Candidate hospitals", type=[extension.lstrip(".") for extension in CANDIDATE_READERS]
     )
-        
-
+    if uploaded is not None:
+        try:
+            ranked, summary = score_candidates(
+                uploaded.getvalue(), uploaded.name, dataset.version, selected_option,
+                get_target_scorer(dataset, selected_option),
+            )
+        except ValueError as error:
+            st.error(str(error))
+        else:
+            st.write(f"{describe_scoring(summary)} Top candidates in the selected region:")
+            st.dataframe(top_targets(ranked, selected_region, ACQUISITION_TOP_TARGETS), hide_index=True)
+            st.download_button(
+                "Download the full ranking",
+                ranked.to_csv(index=False),
+                file_name="acquisition_targets.csv",
+                mime="text/csv",
+            )
+    end_section()
+
+
+acquisition_targets(dataset, selected_option, selected_region)
+
+
+# Build every figure once per data version so switching competitor or region
+# is a cache hit; opt in with AAH_PREWARM_FIGURES=1
+def prewarm_figures(dataset):
+    for competitor in COMPETITORS:
+        if not is_available(competitor):
+            continue
+        for region in regions:
+            presence_map(dataset, competitor, region)
+            tier_pie(dataset, competitor, ALLIANCE, region)
+            tier_pie(dataset, competitor, competitor, region)
+
+
+if os.environ.get("AAH_PREWARM_FIGURES") == "1":
+    start_section("Figure prewarm")
+    dataset.derived("figures_prewarmed", lambda: prewarm_figures(dataset))
+end_section()
+render_profile_panel()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Cached data loading for the dashboard.
+
+All data comes from the columnar bundle written by `build_bundle.py`. Each
+bundle version is opened once as a `dataset.Dataset`, which reads every table
+once per column selection and shares it across reruns and browser sessions.
+Publishing a new bundle changes the version in `data_bundle/CURRENT`, and the
+next run gets the dataset of the new version.
+Set `AAH_BUNDLE_DIR` to read another bundle root, e.g. a synthetic one.
+
+The raw review texts are not part of the bundle; full-text searches read the
+review store (`review_store.py`) directly, at `AAH_REVIEW_STORE` if set.
+"""
+
+import json
+import os
+
+import streamlit as st
+
+from build_bundle import DEFAULT_OUTPUT, build_bundle
+from dataset import Dataset
+from review_store import REVIEW_STORE_FILE, open_readonly
+from schema import BUNDLE_FORMAT_VERSION
+
+BUNDLE_ROOT = os.environ.get("AAH_BUNDLE_DIR", DEFAULT_OUTPUT)
+REVIEW_STORE = os.environ.get("AAH_REVIEW_STORE", REVIEW_STORE_FILE)
+
+
+def current_version(bundle_root=BUNDLE_ROOT):
+    """Version of the bundle currently published under `bundle_root`."""
+    pointer = os.path.join(bundle_root, "CURRENT")
+    if not os.path.exists(pointer):
+        raise FileNotFoundError(
+            f"No data bundle found in '{bundle_root}'. Run `python build_bundle.py` first."
+        )
+    with open(pointer, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+@st.cache_resource(show_spinner="Building data bundle...")
+def ensure_bundle(source_dir=".", bundle_root=BUNDLE_ROOT):
+    """
+    Build the bundle from the raw sources if none has been published yet, or
+    if the published one was written in an older bundle format.
+    """
+    if os.path.exists(os.path.join(bundle_root, "CURRENT")):
+        manifest = _read_manifest(bundle_root, current_version(bundle_root))
+        if manifest["format_version"] == BUNDLE_FORMAT_VERSION:
+            return
+    build_bundle(source_dir, bundle_root)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _read_manifest(bundle_root, version):
+    with open(os.path.join(bundle_root, version, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_manifest(bundle_root=BUNDLE_ROOT):
+    return _read_manifest(bundle_root, current_version(bundle_root))
+
+
+# The previous version is kept while runs that started before a publish finish
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _open_dataset(bundle_root, version):
+    return Dataset(bundle_root, version, _read_manifest(bundle_root, version))
+
+
+def load_dataset(bundle_root=BUNDLE_ROOT):
+    """
+    The shared dataset of the currently published bundle version. Fetch it
+    once per run and read all tables from it, so a run never mixes versions.
+    """
+    return _open_dataset(bundle_root, current_version(bundle_root))
+
+
+def load_table(table, columns=None, bundle_root=BUNDLE_ROOT):
+    """
+    Return bundle table `table` of the current version, restricted to
+    `columns` if given.
+
+    The parsed frame is shared by all sessions, so callers get a shallow copy:
+    adding or replacing columns on it never touches the shared frame, and with
+    pandas copy-on-write enabled neither do in-place value edits.
+    """
+    return load_dataset(bundle_root).table(table, columns)
+
+
+def open_review_store(path=REVIEW_STORE):
+    """
+    Read-only connection to the review store, or None if there is none yet.
+    Connections are cheap and not shared, so every search opens and closes its own.
+    """
+    if not os.path.exists(path):
+        return None
+    return open_readonly(path)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Read-only, process-wide view of one data bundle version.
+
+A `Dataset` holds the parsed bundle tables and everything the dashboard
+derives from them (combined hospital frames, metrics cubes, tier tables,
+search indexes, ...). One instance per version is shared by all sessions, so
+30 viewers hold one copy of each table instead of 30.
+
+Sessions get shallow copies or row slices of the shared frames. With pandas
+copy-on-write enabled these never copy data until written to, and a write
+only ever touches the session's own copy. Derived objects are returned as-is
+and must be treated as read-only.
+
+A session should fetch the dataset once per run (`data_loader.load_dataset`)
+and read everything from that object: when a new version is published the
+next run gets a new dataset, while runs in flight finish on the old one.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from competitors import PARTNER_COLUMNS, hospital_table
+from metrics_cube import ALL_REGIONS
+
+
+class Dataset:
+    """Tables and derived objects of bundle `version`, built lazily and shared."""
+
+    def __init__(self, bundle_root, version, manifest):
+        self.bundle_root = bundle_root
+        self.version = version
+        self.manifest = manifest
+        self._values = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def derived(self, key, build):
+        """
+        Return the object stored under `key`, calling `build()` the first time.
+
+        Concurrent callers of the same key wait for one build instead of
+        repeating it; other keys are not blocked.
+        """
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._values:
+                value = build()
+                with self._lock:
+                    self._values[key] = value
+        return self._values[key]
+
+    def _read_table(self, table, columns):
+        spec = self.manifest["tables"][table]
+        path = os.path.join(self.bundle_root, self.version, spec["file"])
+        return pd.read_parquet(path, columns=list(columns) if columns is not None else None)
+
+    def table(self, table, columns=None):
+        """Bundle table `table`, restricted to `columns` if given, as a shallow copy."""
+        columns = tuple(columns) if columns is not None else None
+        frame = self.derived(("table", table, columns), lambda: self._read_table(table, columns))
+        return frame.copy(deep=False)
+
+    def _by_region(self, table, columns):
+        """`table` sorted by region, with the row range of every region."""
+        frame = self.table(table, columns).sort_values("Region", kind="stable")
+        regions = frame["Region"].to_numpy()
+        starts = np.r_[0, np.flatnonzero(regions[1:] != regions[:-1]) + 1]
+        stops = np.r_[starts[1:], len(frame)]
+        bounds = {regions[start]: (start, stop) for start, stop in zip(starts, stops)}
+        return frame, bounds
+
+    def hospitals(self, company, region=ALL_REGIONS, columns=PARTNER_COLUMNS):
+        """
+        Hospitals of `company`, optionally only those in `region`.
+
+        Region selections are row slices of a region-sorted copy of the table
+        that is made once, so they are views rather than filtered copies.
+        """
+        table = hospital_table(company)
+        if region == ALL_REGIONS:
+            return self.table(table, columns)
+        columns = tuple(columns) if columns is not None else None
+        frame, bounds = self.derived(("by_region", table, columns), lambda: self._by_region(table, columns))
+        start, stop = bounds.get(region, (0, 0))
+        return frame.iloc[start:stop]
+
+
+def open_current(bundle_root):
+    """
+    Uncached dataset of the version currently published under `bundle_root`,
+    for batch jobs; the dashboard shares its datasets via `data_loader`.
+    """
+    with open(os.path.join(bundle_root, "CURRENT"), encoding="utf-8") as f:
+        version = f.read().strip()
+    with open(os.path.join(bundle_root, version, "manifest.json"), encoding="utf-8") as f:
+        return Dataset(bundle_root, version, json.load(f))
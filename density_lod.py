@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Level-of-detail grids for the population density overlay.
+
+The density points are binned into square latitude/longitude cells at several
+resolutions when the data bundle is built. The map then draws one marker per
+occupied cell of the coarsest level that still looks like the raw points at
+the current view, instead of one marker per zip code.
+"""
+
+import numpy as np
+
+# Edge length of the square bins in degrees, finest first
+LOD_BIN_SIZES = (0.05, 0.1, 0.2, 0.4)
+
+# A bin may cover at most this many screen pixels; the density markers are 4px
+MAX_BIN_PIXELS = 5
+
+# Longitude span and approximate plot width of the full-US map view
+US_VIEW_LON_SPAN = 60.0
+MAP_WIDTH_PIXELS = 1400
+
+
+def lod_table_name(bin_size):
+    return f"density_lod_{bin_size:g}"
+
+
+def aggregate_density(us_density, bin_size):
+    """
+    Aggregate density points into `bin_size` degree cells.
+
+    Each cell is placed at the mean position of its points and carries the
+    highest `density_category` among them, so urban cores stay visible when
+    they share a cell with surrounding rural zip codes.
+    """
+    grid = us_density.assign(
+        lat_bin=np.floor(us_density["latitude"] / bin_size).astype("int32"),
+        lon_bin=np.floor(us_density["longitude"] / bin_size).astype("int32"),
+    )
+    grid = grid.groupby(["lat_bin", "lon_bin"], sort=False).agg(
+        latitude=("latitude", "mean"),
+        longitude=("longitude", "mean"),
+        density_category=("density_category", "max"),
+        points=("density_category", "size"),
+    )
+    grid["normalized_density"] = np.log1p(grid["density_category"])
+    return grid.reset_index(drop=True)
+
+
+def build_density_levels(us_density):
+    """Return {bundle table name: aggregated grid} for every LOD level."""
+    return {
+        lod_table_name(bin_size): aggregate_density(us_density, bin_size)
+        for bin_size in LOD_BIN_SIZES
+    }
+
+
+def pick_bin_size(lon_span=US_VIEW_LON_SPAN, width_pixels=MAP_WIDTH_PIXELS):
+    """Coarsest bin size whose cells stay within MAX_BIN_PIXELS on screen."""
+    pixels_per_degree = width_pixels / lon_span
+    for bin_size in sorted(LOD_BIN_SIZES, reverse=True):
+        if bin_size * pixels_per_degree <= MAX_BIN_PIXELS:
+            return bin_size
+    return min(LOD_BIN_SIZES)
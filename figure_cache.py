@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded LRU cache of built Plotly figures.
+
+Figures are keyed by everything that determines them, e.g. (figure kind, data
+version, competitor, region). They are kept as built `go.Figure` objects:
+`st.plotly_chart` validates dicts and JSON strings by rebuilding a Figure from
+them, which costs more than building the figure in the first place.
+"""
+
+import threading
+from collections import OrderedDict
+
+# 3 figures x 10 regions for a handful of competitors and two data versions
+DEFAULT_MAX_FIGURES = 256
+
+
+class FigureCache:
+    """Thread-safe LRU mapping of figure keys to built figures."""
+
+    def __init__(self, max_figures=DEFAULT_MAX_FIGURES):
+        self.max_figures = max_figures
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._figures)
+
+    def __contains__(self, key):
+        return key in self._figures
+
+    def get_or_build(self, key, build):
+        """Return the cached figure for `key`, calling `build()` on a miss."""
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+            self.misses += 1
+
+        # Build outside the lock so sessions building other figures don't wait
+        figure = build()
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_figures:
+                self._figures.popitem(last=False)
+        return figure
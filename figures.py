@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Plotly figures of the dashboard.
+
+The builders only depend on the frames passed in, so the same inputs always
+produce the same figure and the dashboard can cache the result.
+"""
+
+import plotly.express as px
+import plotly.graph_objects as go
+
+from competitors import ALLIANCE
+from tiers import TIERS
+
+# Coordinates sent to the browser are rounded to ~100 m, plenty for a national map
+COORDINATE_DECIMALS = 3
+
+# Hover label of the hospital markers; the per-hospital values travel in customdata
+HOSPITAL_HOVER_COLUMNS = ["Veterinary Partner Name", "Rating", "Total Ratings #"]
+HOSPITAL_HOVERTEMPLATE = (
+    "<b>%{customdata[0]}</b><br><br>"  # Extra <br> for spacing
+    "<b>Rating/#Reviews:</b> %{customdata[1]}/%{customdata[2]}"
+)
+
+# Hover label of the whitespace area markers
+WHITESPACE_HOVER_COLUMNS = ["Area", "Population", "Alliance Miles", "Gap Score"]
+WHITESPACE_HOVERTEMPLATE = (
+    "<b>Underserved: %{customdata[0]}</b><br><br>"
+    "<b>Population:</b> %{customdata[1]:,}<br>"
+    "<b>Nearest Alliance branch:</b> %{customdata[2]} mi<br>"
+    "<b>Gap score:</b> %{customdata[3]}"
+)
+
+TIER_COLORS = {
+    "Tier 1": "darkblue",
+    "Tier 2": "blue",
+    "Tier 3": "lightblue",
+    "Tier 4": "white",
+}
+
+
+def hospital_trace(hospitals, color, name):
+    return go.Scattergeo(
+        lat=hospitals["latitude"].round(COORDINATE_DECIMALS),
+        lon=hospitals["longitude"].round(COORDINATE_DECIMALS),
+        customdata=hospitals[HOSPITAL_HOVER_COLUMNS].to_numpy(),
+        hovertemplate=HOSPITAL_HOVERTEMPLATE,
+        hoverlabel=dict(font_size=16),
+        mode="markers",
+        marker=dict(color=color, size=8),
+        name=name,
+    )
+
+
+def whitespace_trace(areas):
+    # Marker area grows with the population of the underserved area
+    size = 8 + 22 * (areas["Population"] / max(areas["Population"].max(), 1)) ** 0.5
+    return go.Scattergeo(
+        lat=areas["latitude"].round(COORDINATE_DECIMALS),
+        lon=areas["longitude"].round(COORDINATE_DECIMALS),
+        customdata=areas[WHITESPACE_HOVER_COLUMNS].to_numpy(),
+        hovertemplate=WHITESPACE_HOVERTEMPLATE,
+        hoverlabel=dict(font_size=16),
+        mode="markers",
+        marker=dict(color="red", size=size, symbol="diamond-open", line=dict(width=2)),
+        name="Underserved areas",
+    )
+
+
+def build_presence_map(us_density, aa_hospitals, comp_hospitals, competitor, whitespace=None):
+    """
+    US map of Alliance (orange) and competitor (purple) hospitals over
+    population density, with the `whitespace` areas (see `whitespace`) if given.
+    """
+    # Create the base map
+    fig = go.Figure()
+
+    # Add density points to the map (without hover info)
+    fig.add_trace(
+        go.Scattergeo(
+            lat=us_density["latitude"].round(COORDINATE_DECIMALS),
+            lon=us_density["longitude"].round(COORDINATE_DECIMALS),
+            marker=dict(
+                size=4,
+                color=us_density["density_category"],
+                colorscale="Blues",
+                showscale=True,
+                colorbar=dict(title="Density Category"),
+            ),
+            hoverinfo="skip",  # Disable hover for density points
+            name="",
+        )
+    )
+
+    fig.add_trace(hospital_trace(aa_hospitals, "orange", ALLIANCE))
+    fig.add_trace(hospital_trace(comp_hospitals, "purple", competitor))
+    if whitespace is not None and len(whitespace):
+        fig.add_trace(whitespace_trace(whitespace))
+
+    # Update map layout
+    fig.update_layout(
+        geo=dict(
+            scope="usa",
+            showland=True,
+            landcolor="white",  # Set land color to white
+            showlakes=False,    # Optional: Disable lakes
+            showocean=False,    # Optional: Disable ocean
+        ),
+        dragmode=False,  # Disable dragging/zooming
+        title={
+            "text": "US Veterinary Hospitals Presence based on Population Density",
+            "x": 0.5,  # Center title
+            "xanchor": "center",
+            "yanchor": "top",
+            "font": {"size": 20},  # Larger font for the title
+        },
+        height=800,
+        margin={"r": 0, "t": 100, "l": 0, "b": 0},
+        legend=dict(
+            orientation="h",
+            yanchor="top",
+            y=0.92,  # Place the legend below the title
+            xanchor="center",
+            x=0.5,
+            font=dict(size=14),
+        ),
+    )
+    return fig
+
+
+def build_tier_pie(tier_counts):
+    """Pie chart of the number of hospitals per tier (`tier_counts` indexed by TIERS)."""
+    total = tier_counts.sum()
+    pie_data = {
+        "Category": TIERS,
+        "Count": tier_counts.tolist(),
+        "Percentage": (tier_counts / total * 100).tolist(),
+    }
+    # Create the pie chart with explicit category order
+    return px.pie(
+        pie_data,
+        names="Category",
+        values="Count",
+        color="Category",
+        color_discrete_map=TIER_COLORS,
+        category_orders={"Category": TIERS},
+    )
@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+"""
+Generate a synthetic data bundle for scale testing.
+
+    python generate_synthetic.py [--hospitals 10000] [--reviews 10000000]
+                                 [--density-cells 1000000] [--seed 0]
+                                 [--output synthetic_bundle]
+
+Every table in `schema.TABLES` is generated with its exact columns and dtypes:
+hospitals of Alliance and of each registered competitor, the zip code density
+points, per-branch review insights and the per-region review summary. The
+result is written as a regular bundle (including the density LOD grids), so
+the dashboard and the benchmarks run against it unchanged:
+
+    AAH_BUNDLE_DIR=synthetic_bundle streamlit run dashboard.py
+
+The version is a hash of the generator parameters, so the same parameters
+always produce the same bundle.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from build_bundle import apply_dtypes, bundle_version, publish_version, write_version
+from competitors import ALLIANCE, ALLIANCE_TABLE, COMPETITORS
+from metrics_cube import ALL_REGIONS
+from schema import TABLES
+
+DEFAULT_OUTPUT = "synthetic_bundle"
+
+# (abbreviation, name, region, centroid latitude, centroid longitude,
+#  latitude spread, longitude spread, population in millions)
+STATES = [
+    ("CT", "Connecticut", "New England", 41.6, -72.7, 0.3, 0.5, 3.6),
+    ("ME", "Maine", "New England", 45.3, -69.2, 1.2, 1.0, 1.4),
+    ("MA", "Massachusetts", "New England", 42.3, -71.8, 0.3, 1.0, 7.0),
+    ("NH", "New Hampshire", "New England", 43.7, -71.6, 0.7, 0.4, 1.4),
+    ("RI", "Rhode Island", "New England", 41.7, -71.5, 0.15, 0.15, 1.1),
+    ("VT", "Vermont", "New England", 44.0, -72.7, 0.6, 0.4, 0.6),
+    ("NJ", "New Jersey", "Mid-Atlantic", 40.2, -74.7, 0.6, 0.3, 9.3),
+    ("NY", "New York", "Mid-Atlantic", 42.9, -75.5, 1.0, 2.5, 19.6),
+    ("PA", "Pennsylvania", "Mid-Atlantic", 40.9, -77.8, 0.6, 2.2, 13.0),
+    ("IL", "Illinois", "East North Central", 40.0, -89.2, 1.8, 0.8, 12.5),
+    ("IN", "Indiana", "East North Central", 39.9, -86.3, 1.3, 0.6, 6.8),
+    ("MI", "Michigan", "East North Central", 43.6, -84.7, 1.4, 1.3, 10.0),
+    ("OH", "Ohio", "East North Central", 40.3, -82.8, 1.2, 1.2, 11.8),
+    ("WI", "Wisconsin", "East North Central", 44.6, -89.8, 1.5, 1.3, 5.9),
+    ("IA", "Iowa", "West North Central", 42.0, -93.5, 0.8, 2.2, 3.2),
+    ("KS", "Kansas", "West North Central", 38.5, -98.4, 0.8, 3.0, 2.9),
+    ("MN", "Minnesota", "West North Central", 46.3, -94.3, 2.0, 1.8, 5.7),
+    ("MO", "Missouri", "West North Central", 38.4, -92.5, 1.3, 2.0, 6.2),
+    ("NE", "Nebraska", "West North Central", 41.5, -99.8, 0.8, 3.3, 2.0),
+    ("ND", "North Dakota", "West North Central", 47.5, -100.5, 0.8, 3.0, 0.8),
+    ("SD", "South Dakota", "West North Central", 44.4, -100.2, 0.9, 3.0, 0.9),
+    ("DE", "Delaware", "South Atlantic", 39.0, -75.5, 0.4, 0.2, 1.0),
+    ("DC", "District of Columbia", "South Atlantic", 38.9, -77.0, 0.05, 0.05, 0.7),
+    ("FL", "Florida", "South Atlantic", 28.6, -82.4, 2.0, 1.5, 22.2),
+    ("GA", "Georgia", "South Atlantic", 32.7, -83.4, 1.5, 1.3, 10.9),
+    ("MD", "Maryland", "South Atlantic", 39.0, -76.8, 0.5, 1.2, 6.2),
+    ("NC", "North Carolina", "South Atlantic", 35.5, -79.4, 0.8, 2.5, 10.7),
+    ("SC", "South Carolina", "South Atlantic", 33.9, -80.9, 0.9, 1.3, 5.3),
+    ("VA", "Virginia", "South Atlantic", 37.5, -78.8, 0.8, 2.3, 8.7),
+    ("WV", "West Virginia", "South Atlantic", 38.6, -80.6, 0.9, 1.2, 1.8),
+    ("AL", "Alabama", "East South Central", 32.8, -86.8, 1.5, 0.8, 5.1),
+    ("KY", "Kentucky", "East South Central", 37.5, -85.3, 0.6, 2.2, 4.5),
+    ("MS", "Mississippi", "East South Central", 32.7, -89.7, 1.5, 0.8, 2.9),
+    ("TN", "Tennessee", "East South Central", 35.9, -86.4, 0.5, 2.5, 7.1),
+    ("AR", "Arkansas", "West South Central", 34.9, -92.4, 1.1, 1.2, 3.0),
+    ("LA", "Louisiana", "West South Central", 31.0, -92.0, 1.0, 1.5, 4.6),
+    ("OK", "Oklahoma", "West South Central", 35.6, -97.5, 1.0, 2.5, 4.0),
+    ("TX", "Texas", "West South Central", 31.5, -99.3, 3.0, 4.0, 30.0),
+    ("AZ", "Arizona", "Mountain", 34.3, -111.7, 1.8, 1.7, 7.4),
+    ("CO", "Colorado", "Mountain", 39.0, -105.5, 1.0, 1.8, 5.9),
+    ("ID", "Idaho", "Mountain", 44.4, -114.6, 2.0, 1.2, 1.9),
+    ("MT", "Montana", "Mountain", 47.0, -109.6, 1.2, 3.5, 1.1),
+    ("NV", "Nevada", "Mountain", 39.3, -116.6, 2.0, 1.5, 3.2),
+    ("NM", "New Mexico", "Mountain", 34.4, -106.1, 1.7, 1.6, 2.1),
+    ("UT", "Utah", "Mountain", 39.3, -111.7, 1.5, 1.3, 3.4),
+    ("WY", "Wyoming", "Mountain", 43.0, -107.5, 1.2, 2.0, 0.6),
+    ("AK", "Alaska", "Pacific", 61.4, -150.0, 1.5, 3.0, 0.7),
+    ("CA", "California", "Pacific", 36.8, -119.6, 3.0, 2.5, 39.0),
+    ("HI", "Hawaii", "Pacific", 20.8, -156.3, 0.5, 1.2, 1.4),
+    ("OR", "Oregon", "Pacific", 43.9, -120.6, 1.3, 2.5, 4.2),
+    ("WA", "Washington", "Pacific", 47.4, -120.5, 1.0, 2.5, 7.8),
+]
+STATE_COLUMNS = ["abbr", "name", "region", "lat", "lon", "lat_spread", "lon_spread", "population"]
+
+# Lower bounds of density categories 1-7 (people per square mile), as in us_density.xlsx
+DENSITY_CATEGORY_BOUNDS = [10, 50, 200, 500, 1000, 2000, 5000]
+
+CITY_STEMS = [
+    "Oak", "Cedar", "Maple", "Ash", "Elm", "Pine", "River", "Lake", "Spring", "Fair",
+    "Green", "Brook", "Clear", "Stone", "Wood", "Mill", "North", "South", "East", "West",
+]
+CITY_ENDINGS = ["dale", "ton", "field", "ville", "wood", "port", "ford", "view", "ridge", "haven"]
+HOSPITAL_KINDS = [
+    "Animal Hospital", "Veterinary Clinic", "Pet Hospital", "Veterinary Center",
+    "Animal Clinic", "Veterinary Hospital", "Pet Care Center", "Animal Medical Center",
+]
+SURNAMES = [
+    "Smith", "Johnson", "Lee", "Garcia", "Miller", "Davis", "Martinez", "Wilson",
+    "Anderson", "Taylor", "Thomas", "Moore", "Jackson", "White", "Harris", "Clark",
+]
+COMPLAINTS = [
+    "No major complaints.",
+    "Long wait times for appointments and at check-in.",
+    "Prices perceived as high and estimates not always honored.",
+    "Front desk communication and follow-up calls were inconsistent.",
+    "Billing errors and unclear invoices.",
+]
+DOCTOR_COMPLAINTS = [
+    "No doctors with complaints.",
+    "Dr. {0}: rushed appointments and limited explanations.",
+    "Dr. {0}: dismissive of owner concerns.",
+]
+RECOMMENDATIONS = [
+    "Customers recommend the clinic for its caring staff and thorough exams.",
+    "Improve scheduling and reduce wait times.",
+    "Provide clearer cost estimates before treatment.",
+    "Keep up the friendly service and follow-up communication.",
+]
+PRAISES = [
+    "Dr. {0}: praised for compassion and clear explanations.",
+    "Dr. {0}: praised for diagnosing difficult cases.",
+    "Dr. {0}: praised for gentle handling of anxious pets.",
+]
+COMPARISONS = ["Better", "Worse", "Neutral"]
+REVIEW_TEXTS = [
+    "Dr. {0} was wonderful with our dog and explained everything clearly.",
+    "Friendly front desk, but we waited almost an hour past our appointment.",
+    "The staff treated our cat like family. Highly recommend.",
+    "Expensive, and the estimate did not match the final bill.",
+    "Dr. {0} diagnosed what two other clinics missed.",
+    "Clean facility, easy scheduling and great follow-up calls.",
+]
+# Share of Google ratings that come with a written review
+REVIEW_TEXT_SHARE = 0.6
+
+
+def sample_locations(rng, n):
+    """Random (state row, latitude, longitude) of `n` points, weighted by population."""
+    states = pd.DataFrame(STATES, columns=STATE_COLUMNS)
+    weights = states["population"] / states["population"].sum()
+    rows = states.iloc[rng.choice(len(states), size=n, p=weights.to_numpy())].reset_index(drop=True)
+    latitude = rows["lat"] + rng.normal(0, 0.5, n) * rows["lat_spread"]
+    longitude = rows["lon"] + rng.normal(0, 0.5, n) * rows["lon_spread"]
+    return rows, latitude.round(6), longitude.round(6)
+
+
+def pick(rng, choices, n):
+    return np.asarray(choices, dtype=object)[rng.integers(0, len(choices), n)]
+
+
+def city_names(rng, n):
+    return pd.Series(pick(rng, CITY_STEMS, n) + pick(rng, CITY_ENDINGS, n))
+
+
+def with_doctor(rng, templates, n):
+    return pd.Series(pick(rng, templates, n)).combine(
+        pd.Series(pick(rng, SURNAMES, n)), lambda template, surname: template.format(surname)
+    )
+
+
+def generate_density(rng, n):
+    states, latitude, longitude = sample_locations(rng, n)
+    density = np.round(rng.lognormal(4.0, 2.0, n), 1)
+    city = city_names(rng, n)
+    return pd.DataFrame({
+        "Zip": np.arange(10000, 10000 + n, dtype="int64"),
+        "population": rng.lognormal(8.0, 1.5, n).astype("int64"),
+        "density": density,
+        "City": city,
+        "St": states["name"],
+        "State": states["abbr"],
+        "CitySt": city + "," + states["abbr"],
+        "County": pick(rng, CITY_STEMS, n) + " County",
+        "Country": "US",
+        "Coordinates": latitude.astype(str) + ", " + longitude.astype(str),
+        "latitude": latitude,
+        "longitude": longitude,
+        "density_category": np.searchsorted(DENSITY_CATEGORY_BOUNDS, density, side="right"),
+    })
+
+
+def generate_hospitals(rng, companies, reviews):
+    """
+    One hospital per entry of `companies`, sharing `reviews` Google ratings,
+    with the columns of every partner table.
+    """
+    n = len(companies)
+    states, latitude, longitude = sample_locations(rng, n)
+    city = city_names(rng, n)
+    name = pd.Series(pick(rng, CITY_STEMS, n) + " " + pick(rng, HOSPITAL_KINDS, n))
+    location = city + ", " + states["abbr"]
+    # Branch names must be unique per location, as the review insights are keyed by them
+    repeat = pd.DataFrame({"name": name, "location": location}).groupby(["name", "location"]).cumcount()
+    name = name.where(repeat == 0, name + " " + (repeat + 1).astype(str))
+
+    weights = rng.lognormal(0, 0.7, n)
+    zip_code = rng.integers(10000, 99999, n)
+    joined = pd.Series(pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 2500, n), unit="D"))
+    return pd.DataFrame({
+        "Company": companies,
+        "Veterinary Partner Name": name,
+        "Joined In": joined.dt.strftime("%m/%d/%Y"),
+        "Location": location,
+        "Lead Veterinarian": pick(rng, SURNAMES, n),
+        "Zip Code": zip_code,
+        "Full Business Name": name + "," + location + zip_code.astype(str),
+        "FullName": name + "," + location,
+        "Rating": np.clip(np.round(rng.normal(4.57, 0.33, n), 1), 1.0, 5.0),
+        "Total Ratings #": np.maximum(np.floor(weights / weights.sum() * reviews), 1).astype("int64"),
+        "Hospital Name": name,
+        "Location.1": location + " " + zip_code.astype(str),
+        "AAHA Accreditation Status": np.where(rng.random(n) < 0.15, "Yes", "No"),
+        "latitude": latitude,
+        "longitude": longitude,
+        "State": states["name"].str.upper(),
+        "StatesShortName": states["abbr"],
+        "Region": states["region"],
+        "States": states["name"],
+        "Lead 1": pick(rng, SURNAMES, n),
+        "Lead 2": None,
+    })
+
+
+def generate_review_details(rng, hospitals):
+    n = len(hospitals)
+    return pd.DataFrame({
+        "Hospital": hospitals["Veterinary Partner Name"] + ", " + hospitals["Location"],
+        "Key Complaints": pick(rng, COMPLAINTS, n),
+        "Doctors with Complaints": with_doctor(rng, DOCTOR_COMPLAINTS, n),
+        "Key Recommendations": pick(rng, RECOMMENDATIONS, n),
+        "Doctors Praised": with_doctor(rng, PRAISES, n),
+    })
+
+
+def company_region_summary(hospitals):
+    """Rating, rating count, AAHA count and hospital count per region, plus the "All" row."""
+    hospitals = hospitals.assign(
+        weighted=hospitals["Rating"] * hospitals["Total Ratings #"],
+        aaha=hospitals["AAHA Accreditation Status"] == "Yes",
+    )
+    by_region = hospitals.groupby("Region").agg(
+        weighted=("weighted", "sum"),
+        ratings_count=("Total Ratings #", "sum"),
+        AAHA=("aaha", "sum"),
+        counts=("Company", "size"),
+    )
+    by_region.loc[ALL_REGIONS] = by_region.sum()
+    by_region["rating"] = by_region["weighted"] / by_region["ratings_count"]
+    return by_region.drop(columns="weighted")
+
+
+def generate_region_summary(rng, aa_hospitals, comp_hospitals):
+    regions = [ALL_REGIONS] + list(dict.fromkeys(state[2] for state in STATES))
+    n = len(regions)
+    summary = pd.DataFrame({"Region": regions})
+    for prefix, hospitals in (("aa", aa_hospitals), ("vvp", comp_hospitals)):
+        metrics = company_region_summary(hospitals).reindex(regions)
+        summary[f"{prefix}_consumer_reviews"] = pick(rng, RECOMMENDATIONS, n)
+        for metric in ("rating", "ratings_count", "AAHA", "counts"):
+            summary[f"{prefix}_{metric}"] = metrics[metric].fillna(0).to_numpy()
+    for aspect in ("Medical Expertise", "Facilities", "Service Attitude", "Cost & Accessibility"):
+        summary[aspect] = pick(rng, COMPARISONS, n) + ". Synthetic comparison of " + aspect.lower() + "."
+    return summary
+
+
+def generate_frames(hospitals=10_000, reviews=10_000_000, density_cells=1_000_000, alliance_share=0.55, seed=0):
+    """Return {bundle table name: frame} for every table in `schema.TABLES`."""
+    rng = np.random.default_rng(seed)
+    companies = {ALLIANCE: ALLIANCE_TABLE}
+    companies.update((company, table) for company, table in COMPETITORS.items() if table is not None)
+
+    alliance_hospitals = int(round(hospitals * alliance_share))
+    competitors = list(companies)[1:]
+    company_names = np.concatenate([
+        np.full(alliance_hospitals, ALLIANCE, dtype=object),
+        np.asarray(competitors, dtype=object)[np.arange(hospitals - alliance_hospitals) % len(competitors)],
+    ])
+    all_hospitals = generate_hospitals(rng, company_names, reviews)
+    partners = {
+        table: all_hospitals[all_hospitals["Company"] == company].reset_index(drop=True)
+        for company, table in companies.items()
+    }
+    competitor_frames = all_hospitals[all_hospitals["Company"] != ALLIANCE]
+
+    frames = {
+        "us_density": generate_density(rng, density_cells),
+        **partners,
+        "vet_reviews_details": generate_review_details(rng, all_hospitals),
+        "vets_reviews_region_sum": generate_region_summary(rng, partners[ALLIANCE_TABLE], competitor_frames),
+    }
+    return {name: apply_dtypes(frames[name], spec["dtypes"], name) for name, spec in TABLES.items()}
+
+
+def generate_raw_reviews(frames, months=12, end="2024-12-31", seed=0):
+    """
+    Raw reviews of the hospitals in `frames`, as scraped for the review store:
+    `Total Ratings #` reviews per branch averaging its `Rating`, published over
+    the `months` months up to `end`.
+    """
+    rng = np.random.default_rng(seed)
+    tables = dict.fromkeys([ALLIANCE_TABLE, *(table for table in COMPETITORS.values() if table is not None)])
+    hospitals = pd.concat([frames[table] for table in tables], ignore_index=True)
+    counts = hospitals["Total Ratings #"].to_numpy(dtype="int64")
+    branch = np.repeat(np.arange(len(hospitals)), counts)
+    n = len(branch)
+    names = (hospitals["Veterinary Partner Name"].astype(str) + ", " + hospitals["Location"].astype(str)).to_numpy()
+    rating = np.clip(np.round(rng.normal(hospitals["Rating"].to_numpy()[branch], 0.8)), 1, 5).astype("int64")
+    end = pd.Timestamp(end, tz="UTC")
+    seconds = (end - (end - pd.DateOffset(months=months))).total_seconds()
+    published = end - pd.to_timedelta(rng.random(n) * seconds, unit="s").round("s")
+    text = pd.Series(with_doctor(rng, REVIEW_TEXTS, n)).where(rng.random(n) < REVIEW_TEXT_SHARE)
+    return pd.DataFrame({
+        "Hospital": names[branch],
+        "Review ID": pd.Series(np.arange(n)).map("syn-{:010d}".format),
+        "Published": published,
+        "Rating": rating,
+        "Text": text,
+    }).sort_values("Published", kind="stable", ignore_index=True)
+
+
+def generate_candidates(n, seed=0):
+    """`n` independent hospitals in the layout of the partner spreadsheets, for `acquisitions.py`."""
+    rng = np.random.default_rng(seed)
+    candidates = generate_hospitals(rng, np.full(n, "Independent", dtype=object), reviews=n * 300)
+    candidates["Veterinary Partner Name"] = "Independent " + candidates["Veterinary Partner Name"]
+    return candidates.drop(columns="Company")
+
+
+def write_raw_reviews(reviews, directory):
+    """Write `reviews` as one Parquet file per month, like the monthly scraper exports."""
+    os.makedirs(directory, exist_ok=True)
+    month = reviews["Published"].dt.strftime("%Y-%m")
+    for name, monthly in reviews.groupby(month):
+        monthly.to_parquet(os.path.join(directory, f"reviews_{name}.parquet"), index=False)
+
+
+def generate_bundle(output=DEFAULT_OUTPUT, **params):
+    """Write a synthetic bundle for `params` (see `generate_frames`) and publish it. Returns the version."""
+    version = bundle_version({"synthetic": params})
+    if not os.path.exists(os.path.join(output, version, "manifest.json")):
+        write_version(generate_frames(**params), version, output, synthetic=params)
+    publish_version(version, output)
+    return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hospitals", type=int, default=10_000, help="hospitals across all companies")
+    parser.add_argument("--reviews", type=int, default=10_000_000, help="Google ratings across all hospitals")
+    parser.add_argument("--density-cells", type=int, default=1_000_000, help="rows of the density table")
+    parser.add_argument("--alliance-share", type=float, default=0.55, help="share of hospitals that are Alliance's")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="bundle root directory")
+    parser.add_argument("--raw-reviews", help="also write the raw reviews, one file per month, into this directory")
+    parser.add_argument("--months", type=int, default=12, help="months of raw reviews")
+    parser.add_argument("--candidates", type=int, default=0, help="also write this many acquisition candidates")
+    parser.add_argument("--candidates-file", default="synthetic_candidates.parquet", help="where to write them")
+    args = parser.parse_args(argv)
+
+    params = dict(
+        hospitals=args.hospitals,
+        reviews=args.reviews,
+        density_cells=args.density_cells,
+        alliance_share=args.alliance_share,
+        seed=args.seed,
+    )
+    version = generate_bundle(args.output, **params)
+    print(f"Synthetic bundle version {version} written to {os.path.join(args.output, version)}")
+    if args.raw_reviews:
+        reviews = generate_raw_reviews(generate_frames(**params), months=args.months, seed=args.seed)
+        write_raw_reviews(reviews, args.raw_reviews)
+        print(f"{len(reviews)} raw reviews written to {args.raw_reviews}")
+    if args.candidates:
+        generate_candidates(args.candidates, seed=args.seed).to_parquet(args.candidates_file, index=False)
+        print(f"{args.candidates} acquisition candidates written to {args.candidates_file}")
+
+
+if __name__ == "__main__":
+    main()
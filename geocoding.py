@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Offline geocoding of hospital `Location` strings.
+
+    python geocoding.py new_competitor.xlsx [--column Location] [--output geocoded.xlsx]
+
+Locations look like "City, ST", "City, STATE NAME" or "City, ST 12345". They
+are resolved against a gazetteer built from `us_density`: the
+population-weighted centroid of every city's zip codes, and the zip code
+points themselves for locations that carry a zip code but name a city the
+gazetteer does not know.
+
+Resolved locations are kept in a persistent cache (`geocode_cache.csv` next
+to the raw data files) keyed by the normalized location, so monthly
+refreshes of the same branches never look them up again. Only distinct
+locations are resolved, in one vectorized pass. Locations that resolve
+neither way are reported and left without coordinates; fix them with a
+`latitude` / `longitude` override in `corrections.json`.
+
+`build_bundle.py` runs this for the rows of every table with a `geocode`
+column in `schema.TABLES` that come without coordinates.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataset import open_current
+from readers import read_source
+
+GEOCODE_CACHE_FILE = "geocode_cache.csv"
+
+CACHE_COLUMNS = ["location", "latitude", "longitude", "source"]
+
+# Spelled-out forms of common abbreviations in city names
+CITY_ABBREVIATIONS = {"st": "saint", "ste": "sainte", "ft": "fort", "mt": "mount"}
+
+LOCATION_PATTERN = r"^\s*(?P<city>.+?)\s*,\s*(?P<state>[^,]+?)\s*(?P<zip>\d{5})?(?:-\d{4})?\s*$"
+
+
+def normalize_city(cities):
+    """
+    Lower-case ASCII city names with abbreviations spelled out and no
+    punctuation or spaces, so "St. Louis", "Saint Louis" and "La Place" /
+    "Laplace" match.
+    """
+    words = (
+        cities.astype(str).str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+        .str.casefold()
+        .str.replace(r"[.'’]", "", regex=True)
+        .str.replace(r"[^\w]+", " ", regex=True)
+        .str.strip()
+        .str.split(" ")
+    )
+    return words.map(lambda parts: "".join(CITY_ABBREVIATIONS.get(part, part) for part in parts))
+
+
+def normalize_location(locations):
+    """Cache key of `locations`: the normalized text, stable across case and spacing."""
+    return locations.astype(str).str.casefold().str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+class Gazetteer:
+    """City and zip code coordinates of the US, built from the `us_density` table."""
+
+    def __init__(self, us_density):
+        density = us_density.dropna(subset=["latitude", "longitude"])
+        density = density.assign(
+            city_key=normalize_city(density["City"]) + "|" + density["State"].astype(str).str.upper(),
+            weight=density["population"].astype("float64") + 1,
+        )
+        density = density.assign(
+            weighted_latitude=density["latitude"] * density["weight"],
+            weighted_longitude=density["longitude"] * density["weight"],
+        )
+        cities = density.groupby("city_key")[["weighted_latitude", "weighted_longitude", "weight"]].sum()
+        self.cities = pd.DataFrame({
+            "latitude": cities["weighted_latitude"] / cities["weight"],
+            "longitude": cities["weighted_longitude"] / cities["weight"],
+        })
+        zips = density.drop_duplicates("Zip")
+        self.zips = zips[["latitude", "longitude"]].set_axis(zips["Zip"].astype(str).str.zfill(5))
+        states = density[["St", "State"]].drop_duplicates().astype(str)
+        self.state_codes = {
+            **dict(zip(states["St"].str.casefold(), states["State"].str.upper())),
+            **dict(zip(states["State"].str.casefold(), states["State"].str.upper())),
+        }
+
+    def resolve(self, locations):
+        """
+        Coordinates of the distinct `locations` (indexed by location), with
+        the `source` that resolved them; unresolved ones have NaN coordinates.
+        """
+        parts = locations.str.extract(LOCATION_PATTERN)
+        state = parts["state"].str.casefold().map(self.state_codes)
+        city_key = normalize_city(parts["city"].fillna("")) + "|" + state.fillna("")
+        by_city = self.cities.reindex(city_key.to_numpy()).set_axis(locations.index)
+        by_zip = self.zips.reindex(parts["zip"].to_numpy()).set_axis(locations.index)
+        resolved = by_city.fillna(by_zip)
+        resolved["source"] = np.where(
+            by_city["latitude"].notna(), "city", np.where(by_zip["latitude"].notna(), "zip", None)
+        )
+        return resolved
+
+
+def load_cache(path):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=CACHE_COLUMNS).set_index("location")
+    return pd.read_csv(path, dtype={"location": str, "source": str}).set_index("location")
+
+
+def save_cache(cache, path):
+    cache.rename_axis("location").sort_index().reset_index()[CACHE_COLUMNS].to_csv(path, index=False)
+
+
+def geocode(locations, gazetteer, cache):
+    """
+    `latitude` / `longitude` of every entry of `locations`, looked up in
+    `cache` first and in `gazetteer` otherwise. Returns the coordinates (NaN
+    where unresolved), the cache extended by the new resolutions and a
+    summary with the unresolved locations.
+    """
+    keys = normalize_location(locations)
+    distinct = pd.Series(keys.unique(), index=keys.unique())
+    cached = distinct[distinct.isin(cache.index)]
+    new = gazetteer.resolve(distinct[~distinct.isin(cache.index)])
+    resolved = new[new["latitude"].notna()]
+    if len(resolved):
+        cache = pd.concat([cache, resolved]) if len(cache) else resolved
+
+    coordinates = cache.reindex(keys.to_numpy())[["latitude", "longitude"]].set_axis(locations.index)
+    unresolved = locations[coordinates["latitude"].isna()]
+    summary = {
+        "locations": len(distinct),
+        "from_cache": len(cached),
+        "resolved": len(resolved),
+        "unresolved": sorted(unresolved.astype(str).unique()),
+    }
+    return coordinates, cache, summary
+
+
+def fill_coordinates(frame, column, gazetteer, cache):
+    """
+    Geocode the rows of `frame` without coordinates from their `column`.
+    Returns the frame, the updated cache and the geocoding summary (None if
+    every row already had coordinates).
+    """
+    frame = frame.copy()
+    for axis in ("latitude", "longitude"):
+        if axis not in frame.columns:
+            frame[axis] = np.nan
+    missing = frame["latitude"].isna() | frame["longitude"].isna()
+    if not missing.any():
+        return frame, cache, None
+    coordinates, cache, summary = geocode(frame.loc[missing, column], gazetteer, cache)
+    frame.loc[missing, ["latitude", "longitude"]] = coordinates.to_numpy()
+    summary["rows"] = int(missing.sum())
+    return frame, cache, summary
+
+
+def main(argv=None):
+    # build_bundle imports this module for its geocoding stage
+    from build_bundle import DEFAULT_OUTPUT
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("file", help="xlsx/csv/parquet/pkl file with a location column")
+    parser.add_argument("--column", default="Location", help="column holding the locations")
+    parser.add_argument("--output", help="write the file with latitude/longitude filled in here")
+    parser.add_argument("--cache", default=GEOCODE_CACHE_FILE, help="path of the geocode cache")
+    parser.add_argument(
+        "--bundle", default=os.environ.get("AAH_BUNDLE_DIR", DEFAULT_OUTPUT), help="bundle whose us_density is the gazetteer"
+    )
+    args = parser.parse_args(argv)
+
+    frame = read_source(args.file)
+    gazetteer = Gazetteer(open_current(args.bundle).table("us_density"))
+    frame, cache, summary = fill_coordinates(frame, args.column, gazetteer, load_cache(args.cache))
+    save_cache(cache, args.cache)
+    if summary is None:
+        print("Every row already has coordinates")
+    else:
+        print(
+            f"{summary['rows']} rows without coordinates, {summary['locations']} distinct locations: "
+            f"{summary['from_cache']} from the cache, {summary['resolved']} resolved, "
+            f"{len(summary['unresolved'])} unresolved"
+        )
+        for location in summary["unresolved"]:
+            print(f"  unresolved: {location}")
+    if args.output:
+        output_extension = os.path.splitext(args.output)[1].lower()
+        if output_extension == ".xlsx":
+            frame.to_excel(args.output, index=False)
+        elif output_extension == ".parquet":
+            frame.to_parquet(args.output, index=False)
+        else:
+            frame.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Stable integer IDs of hospital branches.
+
+A branch is identified by its name and location ("Name, City, ST"), the same
+text the review insights use to refer to it. The ID is a 64-bit hash of that
+text after normalizing case and whitespace, so it is identical in every table
+and every bundle version without a central registry, and tables are joined on
+integers instead of concatenated strings.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+HOSPITAL_ID = "Hospital ID"
+
+
+def normalize_key(text):
+    return re.sub(r"\s+", " ", str(text)).strip().casefold()
+
+
+def hospital_id(key):
+    """ID of the branch whose "Name, Location" text is `key`."""
+    digest = hashlib.blake2b(normalize_key(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def hospital_ids(frame, key_columns):
+    """IDs of the rows of `frame`, whose key is `key_columns` joined with ", "."""
+    keys = frame[key_columns[0]].astype(str)
+    for column in key_columns[1:]:
+        keys = keys + ", " + frame[column].astype(str)
+    return pd.Series(np.fromiter(map(hospital_id, keys), dtype="int64", count=len(keys)), index=frame.index)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed company x region metrics for the Section III metrics panel.
+
+All hospital-level aggregates are computed in one vectorized pass when the
+data version changes. The dashboard then reads single values by (company,
+region, metric) with dictionary lookups instead of rebuilding per-region
+summaries on every rerun.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Region label that stands for the whole country
+ALL_REGIONS = "All"
+
+# Choices of the dashboard's region selector: the country, then the US Census
+# divisions from east to west
+REGIONS = [
+    ALL_REGIONS,
+    "New England",
+    "Mid-Atlantic",
+    "East North Central",
+    "West North Central",
+    "South Atlantic",
+    "East South Central",
+    "West South Central",
+    "Mountain",
+    "Pacific",
+]
+
+METRICS = ("hospitals", "accredited", "rating", "total_reviews")
+
+
+class MetricsCube:
+    """Dense (company, region, metric) array with label-based lookups."""
+
+    def __init__(self, companies, regions, values):
+        self.companies = list(companies)
+        self.regions = list(regions)
+        self.values = values
+        self._company_index = {company: i for i, company in enumerate(self.companies)}
+        self._region_index = {region: i for i, region in enumerate(self.regions)}
+        self._metric_index = {metric: i for i, metric in enumerate(METRICS)}
+
+    def get(self, company, region, metric):
+        return self.values[
+            self._company_index[company],
+            self._region_index[region],
+            self._metric_index[metric],
+        ]
+
+    def metrics(self, company, region):
+        """All metrics of one company in one region, as {metric: value}."""
+        cell = self.values[self._company_index[company], self._region_index[region]]
+        return dict(zip(METRICS, cell.tolist()))
+
+
+def build_metrics_cube(hospitals, regions):
+    """
+    Aggregate `hospitals` (one row per branch, all companies) into a cube.
+
+    `regions` lists the region labels to index, optionally including
+    ALL_REGIONS for the national totals. Hospital counts are distinct branch
+    names per region, summed across regions for the national figure; ratings
+    are review-weighted and 0 where a company has no reviews. Missing ratings
+    and review counts are skipped, like pandas' `sum`.
+    """
+    companies = list(pd.unique(hospitals["Company"]))
+    regional = [region for region in regions if region != ALL_REGIONS]
+    n_companies, n_regions = len(companies), len(regional)
+
+    company_codes = pd.Categorical(hospitals["Company"], categories=companies).codes
+    region_codes = pd.Categorical(hospitals["Region"], categories=regional).codes
+    in_cube = region_codes >= 0
+    cell = (company_codes * n_regions + region_codes)[in_cube]
+
+    def per_cell(weights=None):
+        # Missing values count as 0, as in pandas' sum; bincount would make the whole cell NaN
+        if weights is not None:
+            weights = np.nan_to_num(weights, nan=0.0)
+        counts = np.bincount(cell, weights=weights, minlength=n_companies * n_regions)
+        return counts.reshape(n_companies, n_regions)
+
+    reviews = hospitals["Total Ratings #"].to_numpy(dtype="float64")[in_cube]
+    ratings = hospitals["Rating"].to_numpy(dtype="float64")[in_cube]
+    accredited = (hospitals["AAHA Accreditation Status"] == "Yes").to_numpy()[in_cube]
+    distinct = ~pd.DataFrame(
+        {"cell": cell, "name": hospitals["Veterinary Partner Name"].to_numpy()[in_cube]}
+    ).duplicated().to_numpy()
+
+    sums = np.stack(
+        [
+            per_cell(distinct.astype("float64")),
+            per_cell(accredited.astype("float64")),
+            per_cell(reviews * ratings),
+            per_cell(reviews),
+        ],
+        axis=-1,
+    )
+    # National totals are the sum over regions
+    sums = np.concatenate([sums.sum(axis=1, keepdims=True), sums], axis=1)
+
+    values = sums.copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values[..., 2] = np.where(sums[..., 3] > 0, sums[..., 2] / sums[..., 3], 0.0)
+
+    index = {region: i + 1 for i, region in enumerate(regional)}
+    index[ALL_REGIONS] = 0
+    order = [index[region] for region in regions]
+    return MetricsCube(companies, regions, values[:, order])
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Per-section wall time of a dashboard run, and the opt-in profiling panel.
+
+The dashboard marks the start of each section with `start_section(name)`;
+a section ends when the next one starts or `end_section()` is called. The
+timings of the latest run are kept in the session state, where benchmarks
+and the profiling panel read them.
+
+Profiling is enabled with `AAH_PROFILE=1` or the `?profile=1` query parameter.
+It records the size of the main DataFrames, shows the breakdown in a sidebar
+expander and, if `AAH_PROFILE_LOG` names a file, appends every run to it as a
+JSON line. With `AAH_PROFILE=1` it also traces allocations per section with
+tracemalloc. tracemalloc is process-wide and slows every session down, so a
+visitor's query parameter never turns it on; only the server's environment
+does, and then concurrent sessions share its counters.
+"""
+
+import datetime
+import json
+import os
+import time
+import tracemalloc
+
+import pandas as pd
+import streamlit as st
+
+TIMER_KEY = "_section_timer"
+
+PROFILE_ENV = "AAH_PROFILE"
+PROFILE_LOG_ENV = "AAH_PROFILE_LOG"
+PROFILE_QUERY_PARAM = "profile"
+
+
+def allocation_tracing_enabled():
+    return os.environ.get(PROFILE_ENV) == "1"
+
+
+def profiling_enabled():
+    if allocation_tracing_enabled():
+        return True
+    return st.query_params.get(PROFILE_QUERY_PARAM) in ("1", "true")
+
+
+class SectionTimer:
+    """Accumulates wall time (and allocations when tracing) per section name."""
+
+    def __init__(self, profile=False, trace=False):
+        self.profile = profile
+        self.trace = trace
+        self.timings = {}
+        self.allocated = {}
+        self.peak = {}
+        self.frames = {}
+        self._current = None
+        self._started = None
+        self._traced = 0
+
+    def start(self, name):
+        self.stop()
+        self._current = name
+        if self.trace:
+            tracemalloc.reset_peak()
+            self._traced = tracemalloc.get_traced_memory()[0]
+        self._started = time.perf_counter()
+
+    def stop(self):
+        if self._current is None:
+            return
+        elapsed = time.perf_counter() - self._started
+        name = self._current
+        self.timings[name] = self.timings.get(name, 0.0) + elapsed
+        if self.trace:
+            traced, peak = tracemalloc.get_traced_memory()
+            self.allocated[name] = self.allocated.get(name, 0) + traced - self._traced
+            self.peak[name] = max(self.peak.get(name, 0), peak - self._traced)
+        self._current = None
+
+    def forget(self, name):
+        for values in (self.timings, self.allocated, self.peak):
+            values.pop(name, None)
+
+    def report(self):
+        """Sections and frames of the run as plain, JSON-serializable dicts."""
+        sections = {}
+        for name, seconds in self.timings.items():
+            sections[name] = {"seconds": seconds}
+            if self.trace:
+                sections[name]["allocated_bytes"] = self.allocated.get(name, 0)
+                sections[name]["peak_bytes"] = self.peak.get(name, 0)
+        return {"sections": sections, "frames": dict(self.frames)}
+
+
+def reset_timer():
+    """Start timing a new full script run."""
+    trace = allocation_tracing_enabled()
+    if trace and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    st.session_state[TIMER_KEY] = SectionTimer(profiling_enabled(), trace)
+
+
+def start_section(name):
+    if TIMER_KEY not in st.session_state:
+        reset_timer()
+    timer = st.session_state[TIMER_KEY]
+    # A fragment rerun replaces the numbers of its own section only
+    timer.forget(name)
+    timer.start(name)
+
+
+def end_section():
+    if TIMER_KEY in st.session_state:
+        st.session_state[TIMER_KEY].stop()
+
+
+def section_timings():
+    """{section: seconds} of the latest run of each section."""
+    if TIMER_KEY not in st.session_state:
+        return {}
+    return dict(st.session_state[TIMER_KEY].timings)
+
+
+def record_frame(name, frame):
+    """Record the row count and deep memory size of `frame` when profiling."""
+    timer = st.session_state.get(TIMER_KEY)
+    if timer is None or not timer.profile:
+        return
+    timer.frames[name] = {"rows": len(frame), "bytes": int(frame.memory_usage(deep=True).sum())}
+
+
+def _megabytes(values):
+    return (pd.Series(values, dtype="float64") / 2**20).round(2)
+
+
+def render_profile_panel():
+    """Sidebar breakdown of the latest run; also logs it when AAH_PROFILE_LOG is set."""
+    timer = st.session_state.get(TIMER_KEY)
+    if timer is None or not timer.profile:
+        return
+    report = timer.report()
+
+    log_path = os.environ.get(PROFILE_LOG_ENV)
+    if log_path:
+        record = {"timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(), **report}
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    sections = pd.DataFrame.from_dict(report["sections"], orient="index")
+    with st.sidebar.expander("Profiling: latest run", expanded=False):
+        st.write(f"Total: {sections['seconds'].sum() * 1000:.0f} ms")
+        breakdown = pd.DataFrame({"ms": (sections["seconds"] * 1000).round(1)})
+        if timer.trace:
+            breakdown["allocated MB"] = _megabytes(sections["allocated_bytes"])
+            breakdown["peak MB"] = _megabytes(sections["peak_bytes"])
+        st.dataframe(breakdown, use_container_width=True)
+        if report["frames"]:
+            frames = pd.DataFrame.from_dict(report["frames"], orient="index")
+            frames["MB"] = _megabytes(frames.pop("bytes"))
+            st.dataframe(frames, use_container_width=True)
+        st.caption("Section V reruns on its own when its widgets change; reload to refresh this panel.")
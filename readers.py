@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Parsers of the tabular files the pipeline reads: the raw bundle sources,
+review exports and the inputs of the batch jobs. Formats are added or
+removed here only; callers that take files from untrusted users restrict
+READERS further (see `acquisitions.CANDIDATE_READERS`).
+"""
+
+import os
+
+import pandas as pd
+
+READERS = {
+    ".xlsx": pd.read_excel,
+    ".pkl": pd.read_pickle,
+    ".csv": pd.read_csv,
+    ".parquet": pd.read_parquet,
+}
+
+
+def read_source(path):
+    """Frame of the file at `path`, parsed according to its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Unsupported data file type: {path}")
+    return READERS[extension](path)
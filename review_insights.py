@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+Per-branch review insights, summarized from the review store by a chat model.
+
+    python review_insights.py [--store reviews.sqlite] [--output vet_reviews_details.pkl]
+                              [--base-url http://localhost:8000/v1] [--model gpt-4o-mini]
+                              [--concurrency 8] [--requests-per-minute 300] [--dry-run]
+
+Every branch with review texts in the store (`review_store.py`) gets the
+INSIGHT_COLUMNS of `vet_reviews_details.pkl`, summarized from its newest
+MAX_REVIEWS_PER_BRANCH reviews by any OpenAI-compatible chat completions
+endpoint (`OPENAI_BASE_URL`, `OPENAI_API_KEY`).
+
+A branch is only sent to the model when its content hash changed: the hash
+covers the IDs of the reviews in its prompt, the model and PROMPT_VERSION,
+and is stored with the summary in the `insights` table of the review store.
+A monthly refresh therefore summarizes the branches that got new reviews and
+nothing else, and a run that is interrupted resumes where it stopped, because
+every summary is committed as soon as it arrives.
+
+Requests run on `concurrency` asyncio workers, spaced by a shared rate
+limiter. Rate-limit responses, server errors and timeouts are retried with
+exponential backoff (honouring `Retry-After`) up to MAX_ATTEMPTS times; a
+branch that still fails keeps its previous summary and is reported.
+
+The client only needs a `model` attribute and a blocking `complete(messages)`
+method returning the reply text, so `ChatClient` can be swapped for another
+provider, or pointed at a local stub server with `--base-url`.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import urllib.error
+import urllib.request
+
+import pandas as pd
+
+from hospital_ids import hospital_ids
+from review_store import REVIEW_STORE_FILE, connect
+
+INSIGHTS_FILE = "vet_reviews_details.pkl"
+
+INSIGHT_COLUMNS = ["Key Complaints", "Doctors with Complaints", "Key Recommendations", "Doctors Praised"]
+
+# Summary of a branch whose reviews do not mention the topic
+INSIGHT_DEFAULTS = {
+    "Key Complaints": "No major complaints.",
+    "Doctors with Complaints": "No doctors with complaints.",
+    "Key Recommendations": "No specific recommendations.",
+    "Doctors Praised": "No doctors praised.",
+}
+
+# Bump when SYSTEM_PROMPT changes, so every branch is summarized again
+PROMPT_VERSION = 1
+
+SYSTEM_PROMPT = (
+    "You summarize Google reviews of one veterinary hospital for its operators. "
+    "Reply with a JSON object with exactly these string fields:\n"
+    '"Key Complaints": the main complaints in one or two sentences, or "No major complaints.";\n'
+    '"Doctors with Complaints": "Dr. Name: complaint" for each doctor criticized, '
+    'or "No doctors with complaints.";\n'
+    '"Key Recommendations": why customers recommend the hospital in one or two sentences, '
+    'or "No specific recommendations.";\n'
+    '"Doctors Praised": "Dr. Name: praise" for each doctor praised, or "No doctors praised.".'
+)
+
+# Newest reviews of a branch that go into its prompt; bounds the prompt size
+MAX_REVIEWS_PER_BRANCH = 200
+
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_REQUESTS_PER_MINUTE = 300
+
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 1.0
+
+INSIGHTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS insights (
+    hospital_id             INTEGER PRIMARY KEY,
+    content_hash            TEXT NOT NULL,
+    model                   TEXT NOT NULL,
+    summarized              TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
+    key_complaints          TEXT,
+    doctors_with_complaints TEXT,
+    key_recommendations     TEXT,
+    doctors_praised         TEXT
+);
+"""
+
+# The newest reviews with text of every branch, the ones its prompt is built from
+PROMPT_REVIEWS_QUERY = """
+SELECT hospital_id, review_id, published, rating, text FROM (
+    SELECT hospital_id, review_id, published, rating, text,
+           row_number() OVER (PARTITION BY hospital_id ORDER BY published DESC, review_id) AS n
+    FROM reviews WHERE text IS NOT NULL AND text != ''
+)
+WHERE n <= :limit {branch_filter}
+ORDER BY hospital_id, published DESC, review_id
+"""
+
+INSIGHT_FIELDS = dict(zip(
+    INSIGHT_COLUMNS, ["key_complaints", "doctors_with_complaints", "key_recommendations", "doctors_praised"]
+))
+
+
+class TransientError(Exception):
+    """A request that may succeed when retried, optionally after `retry_after` seconds."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ChatClient:
+    """OpenAI-compatible chat completions endpoint, over the standard library's HTTP client."""
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, api_key=None, model=DEFAULT_MODEL, timeout=120):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+
+    def complete(self, messages):
+        """Reply text of the model to `messages`. Blocking; raises TransientError for retryable failures."""
+        body = json.dumps({
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0,
+            "response_format": {"type": "json_object"},
+        }).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                reply = json.load(response)
+        except urllib.error.HTTPError as error:
+            if error.code == 429 or error.code >= 500:
+                retry_after = error.headers.get("Retry-After")
+                raise TransientError(
+                    f"HTTP {error.code}", float(retry_after) if retry_after and retry_after.isdigit() else None
+                ) from error
+            raise
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as error:
+            raise TransientError(str(error)) from error
+        return reply["choices"][0]["message"]["content"]
+
+
+class RateLimiter:
+    """Spaces the starts of requests at least 60 / `per_minute` seconds apart, across all workers."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+def connect_insights(path=REVIEW_STORE_FILE):
+    """Open the review store at `path` with the `insights` table."""
+    conn = connect(path)
+    conn.executescript(INSIGHTS_SCHEMA)
+    return conn
+
+
+def content_hash(review_ids, model):
+    """Hash of what a branch's summary depends on: its prompt reviews, the model and the prompt."""
+    digest = hashlib.sha256(f"{PROMPT_VERSION}\n{model}\n".encode("utf-8"))
+    digest.update("\n".join(sorted(review_ids)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def prompt_reviews(conn, hospital_ids=None, limit=MAX_REVIEWS_PER_BRANCH):
+    """The reviews each branch's prompt is built from, optionally only for `hospital_ids`."""
+    params = {"limit": limit}
+    branch_filter = ""
+    if hospital_ids is not None:
+        params["hospital_ids"] = json.dumps([int(value) for value in hospital_ids])
+        branch_filter = "AND hospital_id IN (SELECT value FROM json_each(:hospital_ids))"
+    return pd.read_sql(PROMPT_REVIEWS_QUERY.format(branch_filter=branch_filter), conn, params=params)
+
+
+def stale_branches(conn, model):
+    """
+    Content hashes of the branches whose summary is missing or out of date,
+    by hospital ID, and the number of branches with review texts.
+    """
+    ids = prompt_reviews(conn)[["hospital_id", "review_id"]]
+    hashes = ids.groupby("hospital_id")["review_id"].agg(lambda review_ids: content_hash(review_ids, model))
+    stored = pd.read_sql("SELECT hospital_id, content_hash FROM insights", conn, index_col="hospital_id")
+    return hashes[hashes != stored["content_hash"].reindex(hashes.index)], len(hashes)
+
+
+def build_messages(hospital, reviews):
+    """Chat messages asking for the insights of `hospital` from its `reviews`."""
+    lines = [
+        f"[{review.published[:10]}] {review.rating}/5: {' '.join(review.text.split())}"
+        for review in reviews.itertuples(index=False)
+    ]
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Hospital: {hospital}\n\nReviews:\n" + "\n".join(lines)},
+    ]
+
+
+def parse_insights(reply):
+    """INSIGHT_COLUMNS from the model's JSON reply, with the defaults for missing or empty fields."""
+    text = reply.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json")
+    fields = json.loads(text)
+    if not isinstance(fields, dict):
+        raise ValueError("reply is not a JSON object")
+    return {
+        column: str(fields.get(column) or "").strip() or INSIGHT_DEFAULTS[column]
+        for column in INSIGHT_COLUMNS
+    }
+
+
+def save_insights(conn, hospital_id, digest, model, insights):
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO insights (hospital_id, content_hash, model, key_complaints,"
+            " doctors_with_complaints, key_recommendations, doctors_praised) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (int(hospital_id), digest, model, *(insights[column] for column in INSIGHT_COLUMNS)),
+        )
+
+
+async def complete_with_retries(client, messages, limiter, attempts=MAX_ATTEMPTS):
+    for attempt in range(attempts):
+        await limiter.wait()
+        try:
+            return await asyncio.to_thread(client.complete, messages)
+        except TransientError as error:
+            if attempt == attempts - 1:
+                raise
+            backoff = BACKOFF_SECONDS * 2 ** attempt
+            await asyncio.sleep(error.retry_after or backoff * (1 + random.random()))
+
+
+async def summarize_branches(conn, client, hashes, concurrency=DEFAULT_CONCURRENCY,
+                             requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE):
+    """
+    Summarize the branches in `hashes` (content hash by hospital ID) and store
+    each summary as it arrives. Returns the failures as {hospital ID: error}.
+    """
+    names = pd.read_sql("SELECT hospital_id, hospital FROM hospitals", conn, index_col="hospital_id")["hospital"]
+    reviews = prompt_reviews(conn, hashes.index)
+    by_branch = dict(tuple(reviews.groupby("hospital_id")))
+    queue = asyncio.Queue()
+    for hospital_id in hashes.index:
+        queue.put_nowait(hospital_id)
+    limiter = RateLimiter(requests_per_minute)
+    failures = {}
+
+    async def worker():
+        while not queue.empty():
+            hospital_id = queue.get_nowait()
+            try:
+                reply = await complete_with_retries(
+                    client, build_messages(names[hospital_id], by_branch[hospital_id]), limiter
+                )
+                save_insights(conn, hospital_id, hashes[hospital_id], client.model, parse_insights(reply))
+            except Exception as error:  # one failing branch must not stop the run
+                failures[hospital_id] = f"{type(error).__name__}: {error}"
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(hashes))))))
+    return failures
+
+
+def read_insights(conn):
+    """Stored insights in the layout of `vet_reviews_details.pkl`, one row per branch."""
+    insights = pd.read_sql(
+        f"SELECT h.hospital AS Hospital, {', '.join(INSIGHT_FIELDS.values())}"
+        " FROM insights i JOIN hospitals h ON h.hospital_id = i.hospital_id ORDER BY h.hospital",
+        conn,
+    )
+    return insights.rename(columns={field: column for column, field in INSIGHT_FIELDS.items()})
+
+
+def write_insights(insights, path=INSIGHTS_FILE):
+    """
+    Merge `insights` into the insights file at `path`: branches in `insights`
+    are replaced, the others kept. Branches are matched by hospital ID, as in
+    the bundle, so spelling variants of a name replace each other too. The
+    file is replaced atomically.
+    """
+    if os.path.exists(path):
+        existing = pd.read_pickle(path)
+        replaced = hospital_ids(existing, ["Hospital"]).isin(hospital_ids(insights, ["Hospital"]))
+        insights = pd.concat([existing[~replaced], insights], ignore_index=True)
+    insights = insights.sort_values("Hospital", kind="stable", ignore_index=True)
+    insights.to_pickle(path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return len(insights)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--store", default=REVIEW_STORE_FILE, help="path of the review store")
+    parser.add_argument("--output", default=INSIGHTS_FILE, help="insights file to update")
+    parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL", DEFAULT_BASE_URL),
+                        help="OpenAI-compatible API root")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="chat model")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="requests in flight")
+    parser.add_argument("--requests-per-minute", type=float, default=DEFAULT_REQUESTS_PER_MINUTE,
+                        help="rate limit of the endpoint")
+    parser.add_argument("--dry-run", action="store_true", help="only count the branches to summarize")
+    args = parser.parse_args(argv)
+
+    conn = connect_insights(args.store)
+    try:
+        hashes, branches = stale_branches(conn, args.model)
+        print(f"{len(hashes)} of {branches} branches with reviews need a new summary")
+        if args.dry_run:
+            return
+        client = ChatClient(args.base_url, os.environ.get("OPENAI_API_KEY"), args.model)
+        failures = asyncio.run(summarize_branches(conn, client, hashes, args.concurrency, args.requests_per_minute))
+        for hospital_id, error in failures.items():
+            print(f"  failed: hospital {hospital_id}: {error}")
+        rows = write_insights(read_insights(conn), args.output)
+        print(f"{len(hashes) - len(failures)} branches summarized, {rows} branches in {args.output}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Local warehouse of raw Google reviews, refreshed incrementally.
+
+    python review_store.py ingest reviews_2024-11.csv [...] [--store reviews.sqlite]
+    python review_store.py status [--store reviews.sqlite]
+    python review_store.py search "wait time" [--store reviews.sqlite]
+
+The store is a single SQLite file next to the raw data files. It holds every
+review once (`reviews`) and one row per branch (`hospitals`) with its
+watermark, the publication time of its newest review, and the `Rating` /
+`Total Ratings #` computed from its reviews.
+
+Review files need the columns `Hospital` ("Name, City, ST", as in the review
+insights), `Review ID`, `Published` and `Rating`; `Text` is optional. An
+ingest keeps only rows published at or after their branch's watermark, skips
+review IDs already stored and recomputes the ratings of the branches that got
+new reviews, all in one transaction. A monthly refresh therefore costs time
+proportional to the new reviews rather than to the whole history.
+
+Review texts are indexed in an FTS5 full-text index (`reviews_fts`, stemmed
+with the Porter stemmer) that triggers keep in step with `reviews`.
+`search_reviews` returns BM25-ranked hits and per-branch hit counts for a
+set of branches straight from the index, without scanning the reviews.
+
+`build_bundle.py` takes the branch ratings from the store when it exists, so
+the dashboard shows ratings computed from the raw reviews.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+import pandas as pd
+
+from hospital_ids import HOSPITAL_ID, hospital_ids
+from readers import read_source
+
+REVIEW_STORE_FILE = "reviews.sqlite"
+
+REVIEW_COLUMNS = ["Hospital", "Review ID", "Published", "Rating"]
+
+# Bump when SCHEMA adds tables that must be filled from existing rows (see `connect`)
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    review_id   TEXT PRIMARY KEY,
+    hospital_id INTEGER NOT NULL,
+    published   TEXT NOT NULL,
+    rating      INTEGER NOT NULL,
+    text        TEXT
+);
+CREATE INDEX IF NOT EXISTS reviews_by_hospital ON reviews (hospital_id, published, rating);
+CREATE TABLE IF NOT EXISTS hospitals (
+    hospital_id   INTEGER PRIMARY KEY,
+    hospital      TEXT NOT NULL,
+    watermark     TEXT,
+    rating        REAL,
+    total_ratings INTEGER
+);
+CREATE TABLE IF NOT EXISTS ingest_runs (
+    run_id      INTEGER PRIMARY KEY,
+    finished    TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
+    source      TEXT,
+    rows        INTEGER NOT NULL,
+    new_reviews INTEGER NOT NULL,
+    hospitals   INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5 (
+    text, content = 'reviews', tokenize = 'porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS reviews_fts_insert AFTER INSERT ON reviews BEGIN
+    INSERT INTO reviews_fts (rowid, text) VALUES (new.rowid, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS reviews_fts_delete AFTER DELETE ON reviews BEGIN
+    INSERT INTO reviews_fts (reviews_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+END;
+"""
+
+# Hits of one search, best first
+HIT_QUERY = """
+SELECT r.hospital_id, r.published, r.rating,
+       snippet(reviews_fts, 0, '[', ']', '...', 16) AS excerpt, bm25(reviews_fts) AS score
+FROM reviews_fts JOIN reviews r ON r.rowid = reviews_fts.rowid
+WHERE reviews_fts MATCH :query {branch_filter}
+ORDER BY rank
+LIMIT :limit
+"""
+
+# Number of hits and their average rating per branch
+BRANCH_QUERY = """
+SELECT r.hospital_id, count(*) AS hits, avg(r.rating) AS rating
+FROM reviews_fts JOIN reviews r ON r.rowid = reviews_fts.rowid
+WHERE reviews_fts MATCH :query {branch_filter}
+GROUP BY r.hospital_id
+ORDER BY hits DESC, r.hospital_id
+"""
+
+BRANCH_FILTER = "AND r.hospital_id IN (SELECT value FROM json_each(:hospital_ids))"
+
+
+def connect(path=REVIEW_STORE_FILE):
+    """Open (and if needed create) the review store at `path`."""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        # Stores written before the full-text index existed: index their reviews once
+        with conn:
+            conn.execute("INSERT INTO reviews_fts (reviews_fts) VALUES ('rebuild')")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return conn
+
+
+def open_readonly(path=REVIEW_STORE_FILE):
+    """Read-only connection to an existing store, for the dashboard."""
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def prepare_reviews(frame):
+    """Review rows of `frame` in the store's layout: ID, hospital ID and name, time, rating, text."""
+    missing = [column for column in REVIEW_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Review file is missing columns {missing}")
+    published = pd.to_datetime(frame["Published"], utc=True)
+    return pd.DataFrame({
+        "review_id": frame["Review ID"].astype(str),
+        "hospital_id": hospital_ids(frame, ["Hospital"]),
+        "hospital": frame["Hospital"].astype(str),
+        "published": published.dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "rating": frame["Rating"].astype("int64"),
+        "text": frame["Text"].astype(object).where(frame["Text"].notna(), None) if "Text" in frame else None,
+    })
+
+
+def ingest(conn, frame, source=None):
+    """
+    Add the reviews of `frame` that are not in the store yet and recompute the
+    ratings of the branches they belong to. Returns a summary of the run.
+    """
+    reviews = prepare_reviews(frame)
+    watermarks = pd.read_sql("SELECT hospital_id, watermark FROM hospitals", conn, index_col="hospital_id")
+    watermark = reviews["hospital_id"].map(watermarks["watermark"]).fillna("")
+    # Reviews published at the watermark itself may still be new; the ID check below drops repeats
+    candidates = reviews[reviews["published"] >= watermark]
+
+    with conn:
+        conn.execute("CREATE TEMP TABLE staged (review_id TEXT PRIMARY KEY, hospital_id INTEGER, hospital TEXT,"
+                     " published TEXT, rating INTEGER, text TEXT)")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO staged VALUES (?, ?, ?, ?, ?, ?)",
+                candidates[["review_id", "hospital_id", "hospital", "published", "rating", "text"]]
+                .itertuples(index=False, name=None),
+            )
+            conn.execute("DELETE FROM staged WHERE review_id IN (SELECT review_id FROM reviews)")
+            new_reviews = conn.execute("SELECT count(*) FROM staged").fetchone()[0]
+            conn.execute("INSERT INTO reviews SELECT review_id, hospital_id, published, rating, text FROM staged")
+            conn.execute(
+                "INSERT INTO hospitals (hospital_id, hospital) SELECT hospital_id, max(hospital) FROM staged"
+                " GROUP BY hospital_id ON CONFLICT (hospital_id) DO NOTHING"
+            )
+            changed = conn.execute(
+                """
+                UPDATE hospitals
+                SET (watermark, rating, total_ratings) = (
+                    SELECT max(published), round(avg(rating), 1), count(*)
+                    FROM reviews WHERE reviews.hospital_id = hospitals.hospital_id
+                )
+                WHERE hospital_id IN (SELECT hospital_id FROM staged)
+                """
+            ).rowcount
+            conn.execute(
+                "INSERT INTO ingest_runs (source, rows, new_reviews, hospitals) VALUES (?, ?, ?, ?)",
+                (source, len(reviews), new_reviews, changed),
+            )
+        finally:
+            conn.execute("DROP TABLE staged")
+    return {"rows": len(reviews), "new_reviews": new_reviews, "hospitals": changed}
+
+
+def hospital_ratings(conn):
+    """`Rating` and `Total Ratings #` of every branch in the store, by hospital ID."""
+    return pd.read_sql(
+        "SELECT hospital_id, rating, total_ratings FROM hospitals WHERE total_ratings > 0 ORDER BY hospital_id",
+        conn,
+    ).rename(columns={"hospital_id": HOSPITAL_ID, "rating": "Rating", "total_ratings": "Total Ratings #"})
+
+
+def ratings_fingerprint(ratings):
+    """Content hash of `ratings`, so a bundle is rebuilt only when the ratings changed."""
+    return hashlib.sha256(pd.util.hash_pandas_object(ratings, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def apply_ratings(frames, ratings):
+    """
+    Replace `Rating` and `Total Ratings #` in the hospital tables of `frames`
+    by the values in `ratings`, for the branches the store knows. Returns the
+    updated frames and the number of rows changed per table.
+    """
+    frames = dict(frames)
+    updated = {}
+    ratings = ratings.set_index(HOSPITAL_ID)
+    for name, frame in frames.items():
+        if HOSPITAL_ID not in frame.columns or "Total Ratings #" not in frame.columns:
+            continue
+        matched = frame[HOSPITAL_ID].isin(ratings.index)
+        frame = frame.copy()
+        for column in ("Rating", "Total Ratings #"):
+            values = frame.loc[matched, HOSPITAL_ID].map(ratings[column])
+            frame.loc[matched, column] = values.astype(frame[column].dtype)
+        frames[name] = frame
+        updated[name] = int(matched.sum())
+    return frames, updated
+
+
+def fts_query(text):
+    """
+    FTS5 query matching reviews that contain every word of `text`. Words are
+    quoted, so user input never reaches the query syntax; the last word also
+    matches as a prefix, so partially typed names find their reviews.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def search_reviews(conn, text, hospital_ids=None, limit=50):
+    """
+    Reviews matching `text`, optionally only those of the branches in
+    `hospital_ids`. Returns the `limit` best hits and the hit counts of all
+    matching branches, both as frames keyed by hospital ID.
+    """
+    hits = pd.DataFrame(columns=[HOSPITAL_ID, "Published", "Rating", "Excerpt", "Score"])
+    branches = pd.DataFrame(columns=[HOSPITAL_ID, "Hits", "Average Rating"])
+    query = fts_query(text)
+    if query is None:
+        return hits, branches
+    params = {"query": query, "limit": limit}
+    branch_filter = ""
+    if hospital_ids is not None:
+        params["hospital_ids"] = json.dumps([int(value) for value in hospital_ids])
+        branch_filter = BRANCH_FILTER
+    hits = pd.read_sql(HIT_QUERY.format(branch_filter=branch_filter), conn, params=params)
+    branches = pd.read_sql(BRANCH_QUERY.format(branch_filter=branch_filter), conn, params=params)
+    hits.columns = [HOSPITAL_ID, "Published", "Rating", "Excerpt", "Score"]
+    branches.columns = [HOSPITAL_ID, "Hits", "Average Rating"]
+    return hits, branches
+
+
+def print_status(conn):
+    hospitals, reviews, watermark = conn.execute(
+        "SELECT count(*), sum(total_ratings), max(watermark) FROM hospitals"
+    ).fetchone()
+    print(f"{reviews or 0} reviews of {hospitals} branches, newest published {watermark}")
+    for finished, source, rows, new_reviews, changed in conn.execute(
+        "SELECT finished, source, rows, new_reviews, hospitals FROM ingest_runs ORDER BY run_id DESC LIMIT 5"
+    ):
+        print(f"  {finished}  {source}: {new_reviews} of {rows} rows new, {changed} branches updated")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--store", default=REVIEW_STORE_FILE, help="path of the review store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = commands.add_parser("ingest", help="add new reviews from review files")
+    ingest_parser.add_argument("files", nargs="+", help="csv/parquet/pkl/xlsx review files")
+    commands.add_parser("status", help="show the size of the store and the latest ingests")
+    search_parser = commands.add_parser("search", help="full-text search over the review texts")
+    search_parser.add_argument("text", help="words the reviews must contain")
+    search_parser.add_argument("--limit", type=int, default=10, help="number of hits to show")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.store)
+    try:
+        if args.command == "ingest":
+            for path in args.files:
+                summary = ingest(conn, read_source(path), source=os.path.basename(path))
+                print(
+                    f"{path}: {summary['new_reviews']} of {summary['rows']} reviews new, "
+                    f"{summary['hospitals']} branches updated"
+                )
+        elif args.command == "search":
+            start = time.perf_counter()
+            hits, branches = search_reviews(conn, args.text, limit=args.limit)
+            elapsed = time.perf_counter() - start
+            print(f"{branches['Hits'].sum()} reviews of {len(branches)} branches match ({elapsed * 1000:.1f} ms)")
+            for hit in hits.itertuples(index=False):
+                print(f"  {hit.Published}  {hit.Rating}*  {hit.Excerpt}")
+        else:
+            print_status(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Schema of the columnar data bundle.
+
+Each bundle table is built from one source file. The dtypes listed here are
+applied at build time and recorded in the bundle manifest; columns not listed
+are dropped. Tables with a `hospital_key` get an integer `Hospital ID` column
+computed from those columns (see `hospital_ids`) and keep one row per ID.
+Tables with a `geocode` column get their missing `latitude` / `longitude`
+resolved from it (see `geocoding`), so new sources only need `Location`.
+
+Low-cardinality text columns are stored as categoricals and counts as the
+smallest integer type that holds them. Ratings and coordinates stay float64:
+float32 cannot represent one-decimal ratings exactly, and those values are
+shown as-is in tables and hover labels.
+"""
+
+# Bump when the layout of the bundle changes in a way readers must know about
+BUNDLE_FORMAT_VERSION = 5
+
+# Categorical columns that get the same categories in every table, so that
+# concatenating or merging tables keeps them categorical instead of object
+SHARED_CATEGORIES = ("Company", "Region", "AAHA Accreditation Status", "StatesShortName", "States")
+
+TABLES = {
+    "us_density": {
+        "source": "us_density.xlsx",
+        "dtypes": {
+            "Zip": "int32",
+            "population": "int32",
+            "density": "float64",
+            "City": "object",
+            "St": "category",
+            "State": "category",
+            "CitySt": "object",
+            "County": "category",
+            "Country": "category",
+            "Coordinates": "object",
+            "latitude": "float64",
+            "longitude": "float64",
+            "density_category": "int8",
+        },
+    },
+    "aa_partners": {
+        "source": "vets_partners_aa_google_reviews.xlsx",
+        "hospital_key": ["Veterinary Partner Name", "Location"],
+        "geocode": "Location",
+        "dtypes": {
+            "Company": "category",
+            "Veterinary Partner Name": "object",
+            "Joined In": "object",
+            "Location": "object",
+            "Lead Veterinarian": "object",
+            "Zip Code": "int32",
+            "Full Business Name": "object",
+            "Rating": "float64",
+            "Total Ratings #": "int32",
+            "Hospital Name": "object",
+            "Location.1": "object",
+            "AAHA Accreditation Status": "category",
+            "latitude": "float64",
+            "longitude": "float64",
+            "StatesShortName": "category",
+            "Region": "category",
+            "States": "category",
+        },
+    },
+    "vvp_partners": {
+        "source": "vets_partners_vvp_google_reviews.xlsx",
+        "hospital_key": ["Veterinary Partner Name", "Location"],
+        "geocode": "Location",
+        "dtypes": {
+            "Company": "category",
+            "Veterinary Partner Name": "object",
+            "Location": "object",
+            "State": "category",
+            "Region": "category",
+            "States": "category",
+            "StatesShortName": "category",
+            "latitude": "float64",
+            "longitude": "float64",
+            "Rating": "float64",
+            "Total Ratings #": "int32",
+            "FullName": "object",
+            "Lead 1": "object",
+            "Lead 2": "object",
+            "Hospital Name": "object",
+            "Location.1": "object",
+            "AAHA Accreditation Status": "category",
+        },
+    },
+    "vet_reviews_details": {
+        "source": "vet_reviews_details.pkl",
+        # Review insights name their branch as "Name, Location"
+        "hospital_key": ["Hospital"],
+        "dtypes": {
+            "Hospital": "object",
+            "Key Complaints": "object",
+            "Doctors with Complaints": "object",
+            "Key Recommendations": "object",
+            "Doctors Praised": "object",
+        },
+    },
+    "vets_reviews_region_sum": {
+        "source": "vets_reviews_region_sum.pkl",
+        "dtypes": {
+            "Region": "object",
+            "vvp_consumer_reviews": "object",
+            "aa_consumer_reviews": "object",
+            "aa_rating": "float64",
+            "aa_ratings_count": "float64",
+            "vvp_rating": "float64",
+            "vvp_ratings_count": "int32",
+            "aa_AAHA": "float64",
+            "aa_counts": "float64",
+            "vvp_AAHA": "float64",
+            "vvp_counts": "int32",
+            "Medical Expertise": "object",
+            "Facilities": "object",
+            "Service Attitude": "object",
+            "Cost & Accessibility": "object",
+        },
+    },
+}
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Great-circle proximity queries over hospitals and density points.
+
+Points are indexed as 3D unit vectors in a KD-tree. On the unit sphere the
+straight-line (chord) distance grows monotonically with the great-circle
+distance, so "within N miles" is an exact ball query with the matching chord
+length, without the distortion of treating latitude/longitude as planar.
+Every query takes arrays of points and answers them all in one call.
+
+When the bundle is built, `build_catchment_tables` uses these queries to
+precompute per-branch catchment metrics for the data version:
+
+* `hospital_catchments`: population of the zip codes within each radius of
+  `CATCHMENT_MILES` of every branch.
+* `hospital_competition`: for every branch and every other company, the
+  distance to that company's nearest branch and the number of its branches
+  within each radius.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from hospital_ids import HOSPITAL_ID
+
+EARTH_RADIUS_MILES = 3958.8
+
+# Catchment radii precomputed for every branch, in miles
+CATCHMENT_MILES = (5, 10, 25)
+
+# Radius the dashboard shows with every branch; one of CATCHMENT_MILES
+DISPLAY_CATCHMENT_MILES = 10
+
+# Branches whose population sums are computed together; bounds the memory of
+# the branch x zip code pairs of one step at the largest radius
+CATCHMENT_CHUNK = 1024
+
+
+def unit_vectors(latitude, longitude):
+    """Points on the unit sphere for `latitude` / `longitude` in degrees, shape (n, 3)."""
+    lat = np.radians(np.asarray(latitude, dtype="float64"))
+    lon = np.radians(np.asarray(longitude, dtype="float64"))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def chord_length(miles):
+    """Chord length on the unit sphere for a great-circle distance in miles."""
+    return 2 * np.sin(np.asarray(miles, dtype="float64") / (2 * EARTH_RADIUS_MILES))
+
+
+def arc_miles(chord):
+    """Great-circle distance in miles for a chord length on the unit sphere."""
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.clip(np.asarray(chord, dtype="float64") / 2, 0, 1))
+
+
+class SpatialIndex:
+    """KD-tree over points given by latitude and longitude, with optional weights."""
+
+    def __init__(self, latitude, longitude, weights=None):
+        self.points = unit_vectors(latitude, longitude)
+        self.weights = None if weights is None else np.asarray(weights, dtype="float64")
+        self._tree = cKDTree(self.points)
+
+    def __len__(self):
+        return len(self.points)
+
+    def count_within(self, latitude, longitude, miles):
+        """Number of indexed points within `miles` of each query point."""
+        if not len(self):
+            return np.zeros(len(latitude), dtype="int64")
+        return self._tree.query_ball_point(
+            unit_vectors(latitude, longitude), chord_length(miles), return_length=True
+        ).astype("int64")
+
+    def sum_within(self, latitude, longitude, miles, chunk=CATCHMENT_CHUNK):
+        """Sum of the weights of the indexed points within `miles` of each query point."""
+        queries = unit_vectors(latitude, longitude)
+        totals = np.zeros(len(queries))
+        radius = float(chord_length(miles))
+        for start in range(0, len(queries), chunk):
+            pairs = cKDTree(queries[start:start + chunk]).sparse_distance_matrix(
+                self._tree, radius, output_type="ndarray"
+            )
+            totals[start:start + chunk] = np.bincount(
+                pairs["i"], weights=self.weights[pairs["j"]], minlength=len(queries[start:start + chunk])
+            )
+        return totals
+
+    def pairs_within(self, miles):
+        """Index pairs (i < j) of the indexed points within `miles` of each other, shape (n, 2)."""
+        return self._tree.query_pairs(float(chord_length(miles)), output_type="ndarray")
+
+    def nearest_miles(self, latitude, longitude):
+        """Great-circle distance from each query point to the nearest indexed point, NaN if none."""
+        if not len(self):
+            return np.full(len(latitude), np.nan)
+        chord, _ = self._tree.query(unit_vectors(latitude, longitude))
+        return arc_miles(chord)
+
+
+def build_catchment_tables(hospitals, us_density):
+    """
+    Catchment tables (see module docstring) of the branches in `hospitals`,
+    with `Hospital ID`, `Company`, `latitude` and `longitude` columns.
+    Branches without coordinates are left out.
+    """
+    hospitals = hospitals.dropna(subset=["latitude", "longitude"])
+    hospitals = hospitals[[HOSPITAL_ID, "Company", "latitude", "longitude"]].reset_index(drop=True)
+    latitude, longitude = hospitals["latitude"], hospitals["longitude"]
+
+    density = us_density.dropna(subset=["latitude", "longitude"])
+    population = SpatialIndex(density["latitude"], density["longitude"], density["population"])
+    catchments = hospitals[[HOSPITAL_ID, "Company"]].assign(**{
+        f"Population within {miles} mi": population.sum_within(latitude, longitude, miles).astype("int64")
+        for miles in CATCHMENT_MILES
+    })
+
+    companies = hospitals["Company"].astype(str)
+    branch_indexes = {
+        company: SpatialIndex(latitude[companies == company], longitude[companies == company])
+        for company in companies.unique()
+    }
+    competition = []
+    for company, branches in hospitals.groupby(companies, sort=False):
+        for rival, rival_index in branch_indexes.items():
+            if rival == company:
+                continue
+            competition.append(branches[[HOSPITAL_ID, "Company"]].assign(**{
+                "Rival Company": rival,
+                "Nearest Rival Miles": rival_index.nearest_miles(branches["latitude"], branches["longitude"]),
+                **{
+                    f"Rivals within {miles} mi": rival_index.count_within(
+                        branches["latitude"], branches["longitude"], miles
+                    ).astype("int32")
+                    for miles in CATCHMENT_MILES
+                },
+            }))
+    if competition:
+        competition = pd.concat(competition, ignore_index=True)
+    else:
+        competition = hospitals[[HOSPITAL_ID, "Company"]].iloc[:0].assign(**{
+            "Rival Company": pd.Series(dtype=object),
+            "Nearest Rival Miles": pd.Series(dtype="float64"),
+            **{f"Rivals within {miles} mi": pd.Series(dtype="int32") for miles in CATCHMENT_MILES},
+        })
+    competition["Rival Company"] = competition["Rival Company"].astype(hospitals["Company"].dtype)
+    return {"hospital_catchments": catchments, "hospital_competition": competition}
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# The modules live at the repository root, next to dashboard.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hospital_ids import HOSPITAL_ID, hospital_ids  # noqa: E402
+
+
+@pytest.fixture
+def us_density():
+    """Four zip codes: two around Denver, one in Chicago, one in rural Kansas."""
+    return pd.DataFrame({
+        "Zip": [80202, 80203, 60601, 67401],
+        "population": [10_000, 20_000, 50_000, 500],
+        "density": [5_000.0, 8_000.0, 12_000.0, 20.0],
+        "City": ["Denver", "Denver", "Chicago", "Salina"],
+        "State": ["CO", "CO", "IL", "KS"],
+        "St": ["Colorado", "Colorado", "Illinois", "Kansas"],
+        "latitude": [39.75, 39.73, 41.88, 38.84],
+        "longitude": [-104.99, -104.98, -87.62, -97.61],
+    })
+
+
+@pytest.fixture
+def make_branches():
+    """Builds a hospital frame of `company` from (name, location, latitude, longitude) tuples."""
+    def make(company, rows):
+        frame = pd.DataFrame(rows, columns=["Veterinary Partner Name", "Location", "latitude", "longitude"])
+        return frame.assign(**{
+            "Company": company,
+            HOSPITAL_ID: hospital_ids(frame, ["Veterinary Partner Name", "Location"]),
+            "Rating": 4.5,
+            "Total Ratings #": 100,
+        })
+    return make
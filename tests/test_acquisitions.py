@@ -0,0 +1,91 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from acquisitions import TargetScorer, read_candidates
+
+
+def candidates(rows):
+    """Candidate frame from (name, location, state, latitude, longitude, rating, reviews) tuples."""
+    frame = pd.DataFrame(rows, columns=[
+        "Veterinary Partner Name", "Location", "StatesShortName", "latitude", "longitude",
+        "Rating", "Total Ratings #",
+    ])
+    return frame.assign(**{"AAHA Accreditation Status": "Yes"})
+
+
+def test_branches_without_coordinates_are_ignored(us_density, make_branches):
+    aa = make_branches("Alliance", [
+        ("Mile High Vets", "Denver, CO", 39.74, -104.99),
+        ("Nowhere Vets", "Nowhereville, ZZ", np.nan, np.nan),
+    ])
+    comp = make_branches("Rival", [("Windy Vets", "Chicago, IL", 41.88, -87.63)])
+
+    ranked, _ = TargetScorer(us_density, aa, comp).score(candidates([
+        ("Salina Pets", "Salina, KS", "KS", 38.84, -97.61, 4.8, 200),
+    ]))
+
+    assert len(ranked) == 1
+    assert np.isfinite(ranked.loc[0, "Alliance Miles"])
+
+
+def test_uploaded_pickles_are_never_loaded(tmp_path):
+    path = tmp_path / "candidates.pkl"
+    candidates([]).to_pickle(path)
+
+    with pytest.raises(ValueError, match="Unsupported candidate file type"):
+        read_candidates(io.BytesIO(path.read_bytes()), "candidates.pkl")
+
+
+def test_candidate_files_are_read_by_extension(tmp_path):
+    path = tmp_path / "candidates.csv"
+    frame = candidates([("Salina Pets", "Salina, KS", "KS", 38.84, -97.61, 4.8, 200)])
+    frame.to_csv(path, index=False)
+
+    assert read_candidates(io.BytesIO(path.read_bytes()), "Candidates.CSV").equals(frame)
+
+
+def test_skipped_and_unranked_candidates_are_counted(us_density, make_branches):
+    aa = make_branches("Alliance", [("Mile High Vets", "Denver, CO", 39.74, -104.99)])
+    comp = make_branches("Rival", [("Windy Vets", "Chicago, IL", 41.88, -87.63)])
+    scorer = TargetScorer(us_density, aa, comp)
+
+    ranked, summary = scorer.score(candidates([
+        ("Salina Pets", "Salina, KS", "KS", 38.84, -97.61, 4.8, 200),
+        ("Salina Pets", "Salina, KS", "KS", 38.84, -97.61, 4.8, 200),
+        ("Prairie Pets", "Salina, KS", "KS", 38.85, -97.60, 3.9, 20),
+        ("Mile High Vets", "Denver, CO", "CO", 39.74, -104.99, 4.5, 100),
+        ("Unplaced Pets", "Somewhere, KS", "KS", np.nan, np.nan, 4.0, 10),
+        ("Island Pets", "San Juan, PR", "PR", 18.47, -66.11, 4.9, 300),
+    ]))
+
+    assert summary == {
+        "candidates": 6, "without_coordinates": 1, "existing_branches": 1, "duplicates": 1,
+        "scored": 3, "unranked": 1,
+    }
+    assert ranked["Rank"].dtype == "Int64"
+    ranks = ranked.set_index("Veterinary Partner Name")["Rank"]
+    assert ranks["Salina Pets"] == 1 and ranks["Prairie Pets"] == 2
+    assert ranks.isna()["Island Pets"]
+
+
+def test_scores_follow_rating_accreditation_and_shrinkage(us_density, make_branches):
+    aa = make_branches("Alliance", [("Mile High Vets", "Denver, CO", 39.74, -104.99)])
+    comp = make_branches("Rival", [("Windy Vets", "Chicago, IL", 41.88, -87.63)])
+    pool = candidates([
+        ("Strong Pets", "Salina, KS", "KS", 38.84, -97.61, 4.9, 800),
+        ("Lucky Pets", "Salina, KS", "KS", 38.84, -97.61, 5.0, 3),
+        ("Weak Pets", "Salina, KS", "KS", 38.84, -97.61, 2.5, 800),
+    ])
+    pool.loc[2, "AAHA Accreditation Status"] = "No"
+
+    ranked, _ = TargetScorer(us_density, aa, comp).score(pool)
+
+    assert ranked["Veterinary Partner Name"].tolist() == ["Strong Pets", "Lucky Pets", "Weak Pets"]
+    assert ranked["Rank"].tolist() == [1, 2, 3]
+    assert ranked["Score"].between(0, 100).all()
+    # A perfect rating from three reviews is pulled towards the branches' average of 4.5
+    lucky = ranked.set_index("Veterinary Partner Name").loc["Lucky Pets"]
+    assert lucky["Rating Quality"] < (4.9 - 1) / 4
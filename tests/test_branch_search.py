@@ -0,0 +1,58 @@
+import pytest
+
+from branch_search import BranchSearchIndex
+
+
+@pytest.fixture
+def index():
+    return BranchSearchIndex(
+        [
+            "Paws Clinic, Denver, CO",
+            "Pawsitive Care Vets, Austin, TX",
+            "Happy Paws Animal Hospital, Boise, ID",
+            "Tails Vets, Aurora, CO",
+            "Paws Clinic, Tulsa, OK",
+        ],
+        ["Alliance", "Alliance", "Alliance", "Alliance", "Other Vets"],
+    )
+
+
+def test_a_misspelled_name_still_matches(index):
+    assert index.search("Pasw Clinc")[:2] == ["Paws Clinic, Denver, CO", "Paws Clinic, Tulsa, OK"]
+    assert index.search("Tials Vets")[0] == "Tails Vets, Aurora, CO"
+
+
+def test_names_starting_with_the_query_rank_first(index):
+    results = index.search("paws")
+
+    assert results[:3] == ["Paws Clinic, Denver, CO", "Paws Clinic, Tulsa, OK", "Pawsitive Care Vets, Austin, TX"]
+    assert results[3] == "Happy Paws Animal Hospital, Boise, ID"
+
+
+def test_branches_sharing_too_few_trigrams_are_not_returned(index):
+    assert index.search("Clinic Denver Memorial Specialty") == []
+    assert index.search("qqqq") == []
+
+
+def test_the_company_filter_excludes_other_companies(index):
+    assert index.search("paws clinic", company="Other Vets") == ["Paws Clinic, Tulsa, OK"]
+    assert "Paws Clinic, Tulsa, OK" not in index.search("paws clinic", company="Alliance")
+    assert index.search("paws", company="Unknown Company") == []
+
+
+def test_queries_without_words_list_every_branch_alphabetically(index):
+    # The dashboard shows the full list before anything is typed
+    assert index.search("", company="Alliance") == [
+        "Happy Paws Animal Hospital, Boise, ID",
+        "Paws Clinic, Denver, CO",
+        "Pawsitive Care Vets, Austin, TX",
+        "Tails Vets, Aurora, CO",
+    ]
+    assert index.search(" ,.- ", limit=2) == ["Happy Paws Animal Hospital, Boise, ID", "Paws Clinic, Denver, CO"]
+
+
+def test_one_letter_queries_match_word_starts(index):
+    results = index.search("t")
+
+    assert results[0] == "Tails Vets, Aurora, CO"
+    assert sorted(results[1:]) == ["Paws Clinic, Tulsa, OK", "Pawsitive Care Vets, Austin, TX"]
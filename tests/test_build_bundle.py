@@ -0,0 +1,50 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from build_bundle import apply_dtypes, publish_version, share_categories, write_version
+from competitors import ALLIANCE
+from dataset import open_current
+from generate_synthetic import generate_frames
+from hospital_ids import HOSPITAL_ID
+
+
+def test_apply_dtypes_keeps_and_casts_the_declared_columns():
+    frame = pd.DataFrame({"Rating": ["4.5"], "Extra": [1], "Company": ["Alliance"]})
+
+    typed = apply_dtypes(frame, {"Company": "category", "Rating": "float64"}, "aa_partners")
+
+    assert list(typed.columns) == ["Company", "Rating"]
+    assert typed.dtypes.astype(str).tolist() == ["category", "float64"]
+    with pytest.raises(ValueError, match="missing columns"):
+        apply_dtypes(frame, {"Location": "object"}, "aa_partners")
+
+
+def test_shared_categories_survive_concatenation():
+    first = pd.DataFrame({"Region": pd.Categorical(["Pacific"])})
+    second = pd.DataFrame({"Region": pd.Categorical(["Mountain"])})
+
+    shared = share_categories({"first": first, "second": second}, columns=["Region"])
+
+    combined = pd.concat(shared.values(), ignore_index=True)
+    assert isinstance(combined["Region"].dtype, pd.CategoricalDtype)
+    assert combined["Region"].tolist() == ["Pacific", "Mountain"]
+
+
+def test_written_version_reads_back_through_the_dataset(tmp_path):
+    frames = generate_frames(hospitals=60, reviews=6_000, density_cells=400, seed=1)
+    output = str(tmp_path / "bundle")
+
+    write_version(frames, "v1", output)
+    publish_version("v1", output)
+
+    with open(os.path.join(output, "v1", "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert {"hospital_catchments", "hospital_competition"} <= set(manifest["tables"])
+    dataset = open_current(output)
+    alliance = dataset.hospitals(ALLIANCE)
+    assert len(alliance) == manifest["tables"]["aa_partners"]["rows"]
+    assert alliance[HOSPITAL_ID].is_unique
+    assert isinstance(alliance["Region"].dtype, pd.CategoricalDtype)
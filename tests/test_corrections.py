@@ -0,0 +1,104 @@
+import pandas as pd
+import pytest
+
+from corrections import apply_corrections, load_corrections
+from hospital_ids import HOSPITAL_ID, hospital_ids
+
+
+def details():
+    frame = pd.DataFrame({
+        "Hospital": ["Paws Clinic, Denver, CO", "Tails Vets, Aurora, CO", "Fur Friends, Boulder, CO"],
+        "Doctors Praised": ["Dr. Lee", None, "Dr. Kim"],
+    })
+    return frame.assign(**{HOSPITAL_ID: hospital_ids(frame, ["Hospital"])})
+
+
+def test_overrides_and_exclusions_are_applied_and_audited():
+    corrections = {
+        "overrides": [
+            {"table": "vet_reviews_details", "hospital": "PAWS CLINIC, Denver, CO",
+             "column": "Doctors Praised", "value": "Dr. Lee: thorough", "reason": "typo"},
+            {"table": "vet_reviews_details", "hospital": "Tails Vets, Aurora, CO",
+             "column": "Doctors Praised", "value": "Dr. Ray", "reason": "missing"},
+            {"table": "vet_reviews_details", "hospital": "Gone Vets, Nowhere, CO",
+             "column": "Doctors Praised", "value": "x", "reason": "stale"},
+        ],
+        "exclusions": [
+            {"table": "vet_reviews_details", "hospital": "Fur Friends, Boulder, CO", "reason": "closed"},
+        ],
+    }
+
+    frames, audit = apply_corrections({"vet_reviews_details": details()}, corrections)
+
+    corrected = frames["vet_reviews_details"]
+    assert corrected["Doctors Praised"].tolist() == ["Dr. Lee: thorough", "Dr. Ray"]
+    assert [(entry["action"], entry["rows"], entry.get("previous")) for entry in audit] == [
+        ("override", 1, "Dr. Lee"),
+        ("override", 1, None),
+        ("override", 0, None),
+        ("exclude", 1, None),
+    ]
+
+
+def test_the_last_override_of_a_hospital_wins():
+    entry = {"table": "vet_reviews_details", "hospital": "Paws Clinic, Denver, CO", "column": "Doctors Praised"}
+    corrections = {
+        "overrides": [{**entry, "value": "first", "reason": ""}, {**entry, "value": "second", "reason": ""}],
+        "exclusions": [],
+    }
+
+    frames, _ = apply_corrections({"vet_reviews_details": details()}, corrections)
+
+    assert frames["vet_reviews_details"]["Doctors Praised"].iloc[0] == "second"
+
+
+def test_corrections_are_only_supported_for_hospital_tables():
+    corrections = {"overrides": [], "exclusions": [{"table": "us_density", "hospital": "x", "reason": ""}]}
+
+    with pytest.raises(ValueError, match="only supported for hospital tables"):
+        apply_corrections({"us_density": pd.DataFrame()}, corrections)
+
+
+def test_missing_corrections_file_means_no_corrections(tmp_path):
+    assert load_corrections(str(tmp_path / "corrections.json")) == {"overrides": [], "exclusions": []}
+
+
+def partners():
+    frame = pd.DataFrame({
+        "Veterinary Partner Name": ["Paws Clinic", "Tails Vets"],
+        "Location": ["Denver, CO", "Aurora, CO"],
+        "Lead Veterinarian": ["Dr. Lee", "Dr. Ray"],
+        "Total Ratings #": [120, 80],
+        "latitude": [39.75, float("nan")],
+    }).astype({"Total Ratings #": "int32", "latitude": "float64"})
+    return frame.assign(**{HOSPITAL_ID: hospital_ids(frame, ["Veterinary Partner Name", "Location"])})
+
+
+def test_numeric_overrides_keep_the_column_dtypes():
+    entry = {"table": "aa_partners", "hospital": "Tails Vets, Aurora, CO", "reason": ""}
+    corrections = {
+        "overrides": [
+            {**entry, "column": "latitude", "value": 39.72},
+            {**entry, "column": "Total Ratings #", "value": "95"},
+            {**entry, "column": "Lead Veterinarian", "value": "Dr. Kim"},
+        ],
+        "exclusions": [],
+    }
+    original = partners()
+
+    frames, _ = apply_corrections({"aa_partners": original}, corrections)
+
+    corrected = frames["aa_partners"]
+    assert corrected.dtypes.equals(original.dtypes)
+    assert corrected.loc[1, ["latitude", "Total Ratings #", "Lead Veterinarian"]].tolist() == [39.72, 95, "Dr. Kim"]
+
+
+def test_overrides_that_do_not_fit_the_column_are_rejected():
+    corrections = {
+        "overrides": [{"table": "aa_partners", "hospital": "Paws Clinic, Denver, CO", "column": "latitude",
+                       "value": "north of Denver", "reason": ""}],
+        "exclusions": [],
+    }
+
+    with pytest.raises(ValueError, match="'Paws Clinic, Denver, CO' is not a valid float64 value"):
+        apply_corrections({"aa_partners": partners()}, corrections)
@@ -0,0 +1,82 @@
+import pytest
+
+from figure_cache import FigureCache
+
+
+class Builder:
+    """Figure builder that returns a new object per call and counts its calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, key):
+        def build():
+            self.calls.append(key)
+            return {"figure": key, "build": len(self.calls)}
+        return build
+
+
+def test_a_hit_returns_the_same_figure_without_building():
+    cache, builder = FigureCache(), Builder()
+    key = ("presence_map", "v1", "VPP", "All")
+
+    first = cache.get_or_build(key, builder(key))
+    second = cache.get_or_build(key, builder(key))
+
+    assert second is first
+    assert builder.calls == [key]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_the_least_recently_used_figure_is_evicted_first():
+    cache, builder = FigureCache(max_figures=2), Builder()
+    for key in ("a", "b", "c"):
+        cache.get_or_build(key, builder(key))
+
+    assert len(cache) == 2
+    assert "a" not in cache
+    assert "b" in cache and "c" in cache
+
+
+def test_a_hit_makes_a_figure_the_most_recently_used():
+    cache, builder = FigureCache(max_figures=2), Builder()
+    cache.get_or_build("a", builder("a"))
+    cache.get_or_build("b", builder("b"))
+
+    cache.get_or_build("a", builder("a"))
+    cache.get_or_build("c", builder("c"))
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert builder.calls == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize("changed", [
+    ("tier_pie", "v1", "VPP", "All"),
+    ("presence_map", "v2", "VPP", "All"),
+    ("presence_map", "v1", "Other Vets", "All"),
+    ("presence_map", "v1", "VPP", "Pacific"),
+])
+def test_a_change_in_any_part_of_the_key_builds_a_new_figure(changed):
+    cache, builder = FigureCache(), Builder()
+    key = ("presence_map", "v1", "VPP", "All")
+    cached = cache.get_or_build(key, builder(key))
+
+    figure = cache.get_or_build(changed, builder(changed))
+
+    assert figure is not cached
+    assert figure["figure"] == changed
+    assert cache.get_or_build(key, builder(key)) is cached
+
+
+def test_a_failed_build_is_not_cached():
+    cache, builder = FigureCache(), Builder()
+
+    def fail():
+        raise RuntimeError("no data")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_build("a", fail)
+
+    assert "a" not in cache
+    assert cache.get_or_build("a", builder("a"))["build"] == 1
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from geocoding import Gazetteer, fill_coordinates, geocode, load_cache, save_cache
+
+
+@pytest.fixture
+def gazetteer(us_density):
+    saint_louis = pd.DataFrame({
+        "Zip": [63101], "population": [3_000], "density": [4_000.0], "City": ["Saint Louis"],
+        "State": ["MO"], "St": ["Missouri"], "latitude": [38.63], "longitude": [-90.19],
+    })
+    return Gazetteer(pd.concat([us_density, saint_louis], ignore_index=True))
+
+
+def test_cities_resolve_to_their_population_weighted_centroid(gazetteer):
+    coordinates, _, summary = geocode(pd.Series(["Denver, CO", "denver,  COLORADO"]), gazetteer, load_cache(""))
+
+    # 10,000 people at 39.75 and 20,000 at 39.73
+    assert coordinates["latitude"].tolist() == pytest.approx([39.73667, 39.73667], abs=1e-4)
+    assert summary["locations"] == 2 and summary["resolved"] == 2
+
+
+def test_spelling_variants_zip_fallback_and_unresolved(gazetteer):
+    locations = pd.Series(["St. Louis, MO", "Lower Downtown, CO 80202", "Nowhereville, ZZ"])
+
+    coordinates, cache, summary = geocode(locations, gazetteer, load_cache(""))
+
+    assert coordinates["latitude"].iloc[:2].tolist() == pytest.approx([38.63, 39.75])
+    assert np.isnan(coordinates["latitude"].iloc[2])
+    assert cache["source"].tolist() == ["city", "zip"]
+    assert summary["unresolved"] == ["Nowhereville, ZZ"]
+
+
+def test_cached_locations_are_not_looked_up_again(gazetteer, tmp_path):
+    path = str(tmp_path / "geocode_cache.csv")
+    _, cache, _ = geocode(pd.Series(["Salina, KS"]), gazetteer, load_cache(path))
+    save_cache(cache, path)
+
+    coordinates, _, summary = geocode(pd.Series(["SALINA, KS", "Chicago, IL"]), gazetteer, load_cache(path))
+
+    assert (summary["from_cache"], summary["resolved"]) == (1, 1)
+    assert coordinates["latitude"].tolist() == pytest.approx([38.84, 41.88])
+
+
+def test_fill_coordinates_only_touches_rows_without_coordinates(gazetteer):
+    frame = pd.DataFrame({
+        "Location": ["Salina, KS", "Chicago, IL"],
+        "latitude": [40.0, np.nan],
+        "longitude": [-100.0, np.nan],
+    })
+
+    filled, _, summary = fill_coordinates(frame, "Location", gazetteer, load_cache(""))
+
+    assert filled["latitude"].tolist() == pytest.approx([40.0, 41.88])
+    assert summary["rows"] == 1
+    assert fill_coordinates(filled, "Location", gazetteer, load_cache(""))[2] is None
@@ -0,0 +1,32 @@
+import pandas as pd
+
+from build_bundle import add_hospital_ids
+from hospital_ids import HOSPITAL_ID, hospital_id, hospital_ids
+
+
+def test_ids_ignore_case_and_whitespace():
+    assert hospital_id("Paws Clinic, Denver, CO") == hospital_id("  paws   clinic, DENVER, co ")
+    assert hospital_id("Paws Clinic, Denver, CO") != hospital_id("Paws Clinic, Aurora, CO")
+
+
+def test_ids_of_joined_columns_match_the_joined_text():
+    frame = pd.DataFrame({"Veterinary Partner Name": ["Paws Clinic"], "Location": ["Denver, CO"]})
+
+    ids = hospital_ids(frame, ["Veterinary Partner Name", "Location"])
+
+    assert ids.dtype == "int64"
+    assert ids.tolist() == [hospital_id("Paws Clinic, Denver, CO")]
+
+
+def test_add_hospital_ids_keeps_the_first_row_of_every_branch():
+    frame = pd.DataFrame({
+        "Veterinary Partner Name": ["Paws Clinic", "PAWS CLINIC", "Tails Vets"],
+        "Location": ["Denver, CO", "Denver,  CO", "Denver, CO"],
+        "Rating": [4.8, 3.0, 4.1],
+    })
+
+    deduplicated, dropped = add_hospital_ids(frame, ["Veterinary Partner Name", "Location"])
+
+    assert dropped == 1
+    assert deduplicated["Rating"].tolist() == [4.8, 4.1]
+    assert deduplicated[HOSPITAL_ID].is_unique
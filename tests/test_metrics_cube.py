@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from metrics_cube import ALL_REGIONS, REGIONS, build_metrics_cube
+
+
+@pytest.fixture
+def hospitals():
+    """Two companies' branches with repeated names, a region without branches and one without reviews."""
+    rng = np.random.default_rng(7)
+    n = 400
+    frame = pd.DataFrame({
+        "Company": rng.choice(["Alliance", "Rival"], n),
+        "Region": rng.choice(REGIONS[1:-1], n),
+        "Veterinary Partner Name": rng.choice([f"Clinic {i}" for i in range(150)], n),
+        "Rating": rng.integers(10, 51, n) / 10,
+        "Total Ratings #": rng.integers(0, 500, n),
+        "AAHA Accreditation Status": rng.choice(["Yes", "No"], n),
+    })
+    silent = (frame["Company"] == "Rival") & (frame["Region"] == "Mountain")
+    frame.loc[silent, "Total Ratings #"] = 0
+    return frame
+
+
+def per_render_metrics(hospitals, company, region):
+    """Section III metrics as the dashboard computed them on every rerun before the cube."""
+    branches = hospitals[hospitals["Company"] == company]
+    by_region = branches.groupby("Region").agg(
+        hospitals=("Veterinary Partner Name", "nunique"),
+        reviews=("Total Ratings #", "sum"),
+    )
+    weighted = (branches["Total Ratings #"] * branches["Rating"]).groupby(branches["Region"]).sum()
+    in_region = branches if region == ALL_REGIONS else branches[branches["Region"] == region]
+    if region == ALL_REGIONS:
+        count, reviews, weighted_sum = by_region["hospitals"].sum(), by_region["reviews"].sum(), weighted.sum()
+    elif region in by_region.index:
+        count, reviews = by_region.loc[region, ["hospitals", "reviews"]]
+        weighted_sum = weighted[region]
+    else:
+        count, reviews, weighted_sum = 0, 0, 0.0
+    return {
+        "hospitals": count,
+        "accredited": (in_region["AAHA Accreditation Status"] == "Yes").sum(),
+        "rating": weighted_sum / reviews if reviews else 0.0,
+        "total_reviews": reviews,
+    }
+
+
+def test_cube_matches_the_per_render_computation(hospitals):
+    cube = build_metrics_cube(hospitals, REGIONS)
+
+    for company in ("Alliance", "Rival"):
+        for region in REGIONS:
+            expected = per_render_metrics(hospitals, company, region)
+            actual = cube.metrics(company, region)
+            assert actual == pytest.approx(expected), (company, region)
+
+
+def test_missing_ratings_and_review_counts_are_skipped(hospitals):
+    hospitals.loc[0, "Rating"] = np.nan
+    hospitals.loc[1, "Total Ratings #"] = np.nan
+    cube = build_metrics_cube(hospitals, REGIONS)
+
+    for company in ("Alliance", "Rival"):
+        for region in REGIONS:
+            expected = per_render_metrics(hospitals, company, region)
+            actual = cube.metrics(company, region)
+            assert not np.isnan(list(actual.values())).any(), (company, region)
+            assert actual == pytest.approx(expected), (company, region)
+
+
+def test_regions_without_branches_are_zero(hospitals):
+    cube = build_metrics_cube(hospitals, REGIONS)
+
+    assert cube.metrics("Alliance", "Pacific") == {"hospitals": 0, "accredited": 0, "rating": 0.0, "total_reviews": 0}
+    assert cube.get("Rival", "Mountain", "rating") == 0.0
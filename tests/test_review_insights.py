@@ -0,0 +1,162 @@
+import asyncio
+import json
+
+import pandas as pd
+import pytest
+
+import review_insights
+from hospital_ids import hospital_id
+from review_insights import (
+    INSIGHT_COLUMNS,
+    INSIGHT_DEFAULTS,
+    RateLimiter,
+    TransientError,
+    connect_insights,
+    parse_insights,
+    read_insights,
+    stale_branches,
+    summarize_branches,
+    write_insights,
+)
+from review_store import ingest
+
+
+PAWS = "Paws Clinic, Denver, CO"
+TAILS = "Tails Vets, Aurora, CO"
+
+REPLY = json.dumps({"Key Complaints": "Long waits."})
+
+
+class StubClient:
+    """Chat client answering from `replies` (a reply text or an exception per call) without a network."""
+
+    model = "stub-model"
+
+    def __init__(self, replies=None):
+        self.replies = list(replies or [])
+        self.hospitals = []
+
+    def complete(self, messages):
+        self.hospitals.append(messages[-1]["content"].splitlines()[0].removeprefix("Hospital: "))
+        reply = self.replies.pop(0) if self.replies else REPLY
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+@pytest.fixture
+def store(tmp_path):
+    conn = connect_insights(str(tmp_path / "reviews.sqlite"))
+    ingest(conn, pd.DataFrame([
+        (PAWS, "p1", "2024-10-01", 2, "Long wait time"),
+        (TAILS, "t1", "2024-10-03", 5, "Friendly vets"),
+    ], columns=["Hospital", "Review ID", "Published", "Rating", "Text"]))
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(review_insights, "BACKOFF_SECONDS", 0.001)
+
+
+def summarize(conn, client, hashes):
+    return asyncio.run(summarize_branches(conn, client, hashes, concurrency=2, requests_per_minute=None))
+
+
+def insights(rows):
+    """Insights frame from (hospital, key complaints) pairs."""
+    return pd.DataFrame([
+        {"Hospital": hospital, **INSIGHT_DEFAULTS, "Key Complaints": complaints} for hospital, complaints in rows
+    ])
+
+
+def test_write_insights_replaces_spelling_variants_of_a_branch(tmp_path):
+    path = str(tmp_path / "vet_reviews_details.pkl")
+    insights([
+        ("30th Street Animal Hospital, Indianapolis, INDIANA", "stale"),
+        ("Other Vets, Mobile, AL", "kept"),
+    ]).to_pickle(path)
+
+    rows = write_insights(insights([("30th Street  Animal Hospital, Indianapolis, Indiana", "fresh")]), path)
+
+    written = pd.read_pickle(path)
+    assert rows == 2
+    assert written["Key Complaints"].tolist() == ["fresh", "kept"]
+
+
+def test_parse_insights_fills_missing_fields_with_defaults():
+    parsed = parse_insights('```json\n{"Key Complaints": "Long waits.", "Doctors Praised": ""}\n```')
+
+    assert list(parsed) == INSIGHT_COLUMNS
+    assert parsed["Key Complaints"] == "Long waits."
+    assert parsed["Doctors Praised"] == INSIGHT_DEFAULTS["Doctors Praised"]
+
+
+def test_only_branches_with_new_reviews_are_sent_again(store):
+    hashes, branches = stale_branches(store, StubClient.model)
+    assert (len(hashes), branches) == (2, 2)
+    assert summarize(store, StubClient(), hashes) == {}
+
+    ingest(store, pd.DataFrame([(TAILS, "t2", "2024-11-01", 1, "Rude front desk")],
+                               columns=["Hospital", "Review ID", "Published", "Rating", "Text"]))
+    hashes, _ = stale_branches(store, StubClient.model)
+    client = StubClient()
+    summarize(store, client, hashes)
+
+    assert hashes.index.tolist() == [hospital_id(TAILS)]
+    assert client.hospitals == [TAILS]
+    assert stale_branches(store, StubClient.model)[0].empty
+    # A different model invalidates every summary
+    assert len(stale_branches(store, "other-model")[0]) == 2
+
+
+def test_transient_errors_are_retried_after_retry_after(store):
+    hashes, _ = stale_branches(store, StubClient.model)
+    client = StubClient([TransientError("HTTP 429", retry_after=0.01)])
+
+    failures = summarize(store, client, hashes.iloc[:1])
+
+    assert failures == {}
+    assert len(client.hospitals) == 2
+    assert read_insights(store)["Key Complaints"].tolist() == ["Long waits."]
+
+
+def test_a_failing_branch_is_reported_and_the_others_are_summarized(store, no_backoff):
+    hashes, _ = stale_branches(store, StubClient.model)
+    failing = hashes.index[0]
+    client = StubClient([TransientError("HTTP 503")] * review_insights.MAX_ATTEMPTS)
+
+    failures = asyncio.run(summarize_branches(store, client, hashes, concurrency=1, requests_per_minute=None))
+
+    assert list(failures) == [failing]
+    assert failures[failing] == "TransientError: HTTP 503"
+    assert len(client.hospitals) == review_insights.MAX_ATTEMPTS + 1
+    assert stale_branches(store, StubClient.model)[0].index.tolist() == [failing]
+
+
+def test_other_errors_are_not_retried(store):
+    hashes, _ = stale_branches(store, StubClient.model)
+    client = StubClient([ValueError("HTTP 400"), "not json"])
+
+    failures = summarize(store, client, hashes)
+
+    assert sorted(failures.values()) == ["JSONDecodeError: Expecting value: line 1 column 1 (char 0)",
+                                         "ValueError: HTTP 400"]
+    assert len(client.hospitals) == 2
+
+
+def test_rate_limiter_spaces_requests_across_workers():
+    async def start_times():
+        limiter = RateLimiter(per_minute=600)
+        loop = asyncio.get_running_loop()
+
+        async def request():
+            await limiter.wait()
+            return loop.time()
+
+        return await asyncio.gather(*(request() for _ in range(4)))
+
+    starts = sorted(asyncio.run(start_times()))
+
+    assert all(later - earlier >= 0.099 for earlier, later in zip(starts, starts[1:]))
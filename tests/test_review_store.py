@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from hospital_ids import HOSPITAL_ID, hospital_id
+from review_store import connect, hospital_ratings, ingest, search_reviews
+
+PAWS = "Paws Clinic, Denver, CO"
+TAILS = "Tails Vets, Aurora, CO"
+
+
+def reviews(rows):
+    """Review export from (hospital, review ID, published, rating, text) tuples."""
+    return pd.DataFrame(rows, columns=["Hospital", "Review ID", "Published", "Rating", "Text"])
+
+
+@pytest.fixture
+def store(tmp_path):
+    conn = connect(str(tmp_path / "reviews.sqlite"))
+    yield conn
+    conn.close()
+
+
+def ratings(conn):
+    return hospital_ratings(conn).set_index(HOSPITAL_ID)
+
+
+def test_ingest_adds_only_new_reviews_and_updates_their_branches(store):
+    first = ingest(store, reviews([
+        (PAWS, "p1", "2024-10-01", 5, "Great staff"),
+        (PAWS, "p2", "2024-10-15", 3, "Long wait time"),
+        (TAILS, "t1", "2024-10-20", 4, None),
+    ]))
+    assert first == {"rows": 3, "new_reviews": 3, "hospitals": 2}
+
+    second = ingest(store, reviews([
+        (PAWS, "p2", "2024-10-15", 3, "Long wait time"),
+        (PAWS, "p3", "2024-11-02", 1, "Rude front desk"),
+        (TAILS, "t1", "2024-10-20", 4, None),
+    ]))
+    assert second == {"rows": 3, "new_reviews": 1, "hospitals": 1}
+
+    stored = ratings(store)
+    assert stored.loc[hospital_id(PAWS)].tolist() == [3.0, 3]
+    assert stored.loc[hospital_id(TAILS)].tolist() == [4.0, 1]
+
+
+def test_reviews_older_than_the_watermark_are_skipped(store):
+    ingest(store, reviews([(PAWS, "p1", "2024-11-01", 5, None)]))
+
+    late = ingest(store, reviews([
+        (PAWS, "p0", "2024-10-01", 1, None),
+        (PAWS, "p2", "2024-11-01", 4, None),
+    ]))
+
+    # Reviews at the watermark itself still count; older ones are from earlier exports
+    assert late["new_reviews"] == 1
+    assert ratings(store).loc[hospital_id(PAWS), "Total Ratings #"] == 2
+
+
+def test_search_finds_stemmed_words_per_branch(store):
+    ingest(store, reviews([
+        (PAWS, "p1", "2024-10-01", 2, "We waited two hours"),
+        (PAWS, "p2", "2024-10-02", 5, "No waiting at all"),
+        (TAILS, "t1", "2024-10-03", 4, "Friendly vets"),
+    ]))
+
+    hits, branches = search_reviews(store, "wait", [hospital_id(PAWS), hospital_id(TAILS)])
+
+    assert len(hits) == 2
+    assert branches[HOSPITAL_ID].tolist() == [hospital_id(PAWS)]
+    assert branches["Hits"].tolist() == [2]
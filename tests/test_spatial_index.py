@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spatial_index import CATCHMENT_MILES, EARTH_RADIUS_MILES, SpatialIndex, build_catchment_tables
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(3)
+    return pd.DataFrame({
+        "latitude": rng.uniform(39, 41, 300),
+        "longitude": rng.uniform(-106, -104, 300),
+        "population": rng.integers(0, 10_000, 300),
+    })
+
+
+def test_queries_match_brute_force_great_circle_distances(points):
+    index = SpatialIndex(points["latitude"], points["longitude"], points["population"])
+    queries = points.iloc[:20]
+    distances = haversine_miles(
+        queries["latitude"].to_numpy()[:, None], queries["longitude"].to_numpy()[:, None],
+        points["latitude"].to_numpy()[None, :], points["longitude"].to_numpy()[None, :],
+    )
+
+    counts = index.count_within(queries["latitude"], queries["longitude"], 25)
+    assert counts.tolist() == (distances <= 25).sum(axis=1).tolist()
+    assert index.sum_within(queries["latitude"], queries["longitude"], 10, chunk=7) == pytest.approx(
+        (distances <= 10) @ points["population"].to_numpy()
+    )
+    others = SpatialIndex(points["latitude"].iloc[20:], points["longitude"].iloc[20:])
+    assert others.nearest_miles(queries["latitude"], queries["longitude"]) == pytest.approx(
+        distances[:, 20:].min(axis=1), abs=1e-6
+    )
+
+
+def test_empty_index_has_no_neighbours():
+    index = SpatialIndex([], [])
+
+    assert index.count_within([40.0], [-105.0], 10).tolist() == [0]
+    assert np.isnan(index.nearest_miles([40.0], [-105.0])).all()
+
+
+def test_catchment_tables_cover_every_located_branch_and_rival(points, make_branches):
+    hospitals = pd.concat([
+        make_branches("Alliance", [("A1", "Denver, CO", 39.74, -104.99), ("A2", "Nowhere, ZZ", np.nan, np.nan)]),
+        make_branches("Rival", [("R1", "Aurora, CO", 39.73, -104.83)]),
+    ], ignore_index=True)
+
+    tables = build_catchment_tables(hospitals, points)
+
+    catchments, competition = tables["hospital_catchments"], tables["hospital_competition"]
+    assert len(catchments) == 2
+    assert list(catchments.columns[2:]) == [f"Population within {miles} mi" for miles in CATCHMENT_MILES]
+    assert competition[["Company", "Rival Company"]].values.tolist() == [["Alliance", "Rival"], ["Rival", "Alliance"]]
+    assert competition["Nearest Rival Miles"].tolist() == pytest.approx([8.5] * 2, abs=0.1)
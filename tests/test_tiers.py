@@ -0,0 +1,34 @@
+import pandas as pd
+
+from tiers import TIERS, TierTable, classify_tiers
+
+
+def hospitals():
+    """Six hospitals of one company in one region; the median rating of the well-reviewed ones is 3.5."""
+    return pd.DataFrame({
+        "Company": "Alliance",
+        "Region": "Mountain",
+        "Veterinary Partner Name": ["A", "B", "C", "D", "E", "F"],
+        "Rating": [4.9, 4.5, 3.0, 4.8, 3.5, 2.0],
+        "Total Ratings #": [200, 150, 300, 20, 400, 500],
+        "AAHA Accreditation Status": ["Yes", "No", "Yes", "No", "No", "No"],
+    })
+
+
+def test_classify_tiers_uses_the_median_of_well_reviewed_hospitals():
+    classified = classify_tiers(hospitals(), min_reviews=100)
+
+    assert classified["RatingMedium"].eq(3.5).all()
+    assert classified.set_index("Veterinary Partner Name")["Tier"].to_dict() == {
+        "A": "Tier 1", "B": "Tier 2", "C": "Tier 3", "D": "Tier 2", "E": "Tier 4", "F": "Tier 4",
+    }
+
+
+def test_select_lists_best_rated_first_and_tier_4_worst_first():
+    table = TierTable(classify_tiers(hospitals(), min_reviews=100))
+
+    assert table.select("Alliance")["Veterinary Partner Name"].tolist() == ["A", "D", "B", "E", "C", "F"]
+    assert table.select("Alliance", tier="Tier 2")["Veterinary Partner Name"].tolist() == ["D", "B"]
+    assert table.select("Alliance", tier="Tier 4")["Veterinary Partner Name"].tolist() == ["F", "E"]
+    assert table.counts("Alliance").tolist() == [1, 2, 1, 2]
+    assert table.counts("Alliance").index.tolist() == TIERS
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from whitespace import build_whitespace, find_areas, score_cells
+
+
+def test_branches_without_coordinates_are_ignored(us_density, make_branches):
+    aa = make_branches("Alliance", [
+        ("Mile High Vets", "Denver, CO", 39.74, -104.99),
+        ("Nowhere Vets", "Nowhereville, ZZ", np.nan, np.nan),
+    ])
+    comp = make_branches("Rival", [("Lost Vets", "Atlantis, ZZ", np.nan, np.nan)])
+
+    cells = score_cells(us_density, aa, comp)
+
+    assert cells["Alliance Miles"].notna().all()
+    assert cells["Competitor Miles"].isna().all()
+    assert cells.loc[cells["City"] == "Denver", "Alliance Miles"].max() < 2
+    build_whitespace(us_density, aa, comp)
+
+
+def test_dense_areas_without_alliance_rank_first_and_competitors_raise_the_score(make_branches):
+    grid = pd.DataFrame({
+        "Zip": [80202, 60601, 48201, 67401],
+        "population": [20_000, 20_000, 20_000, 500],
+        "density": [8_000.0, 8_000.0, 8_000.0, 20.0],
+        "City": ["Denver", "Chicago", "Detroit", "Salina"],
+        "State": ["CO", "IL", "MI", "KS"],
+        "latitude": [39.75, 41.88, 42.33, 38.84],
+        "longitude": [-104.99, -87.62, -83.05, -97.61],
+    })
+    aa = make_branches("Alliance", [("Mile High Vets", "Denver, CO", 39.75, -104.99)])
+    comp = make_branches("Rival", [("Motor City Vets", "Detroit, MI", 42.33, -83.05)])
+
+    scores = score_cells(grid, aa, comp).set_index("City")["Gap Score"]
+
+    # Detroit: dense, unserved, proven demand; Chicago: dense, unserved; Denver: dense but served
+    assert scores.idxmax() == "Detroit"
+    assert scores["Detroit"] > scores["Chicago"] > scores["Salina"] > scores["Denver"]
+    assert scores["Detroit"] / scores["Chicago"] == pytest.approx(2, rel=0.01)
+
+    areas = find_areas(score_cells(grid, aa, comp), quantile=0)
+    central = areas[areas["Region"] == "East North Central"]
+    assert central["Area"].tolist() == ["Detroit, MI", "Chicago, IL"]
+    assert central["Rank"].tolist() == [1, 2]
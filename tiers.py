@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Tier classification of hospitals.
+
+A hospital meets Criteria 1 when its Google rating is above the median rating
+of its region, where the median only counts hospitals with at least
+`min_reviews` reviews. It meets Criteria 2 when it is AAHA accredited.
+
+    Tier 1 - meets both criteria
+    Tier 2 - meets only Criteria 1
+    Tier 3 - meets only Criteria 2
+    Tier 4 - meets neither
+"""
+
+import numpy as np
+import pandas as pd
+
+from metrics_cube import ALL_REGIONS
+
+# Minimum number of reviews for a rating to count towards the regional median
+MIN_REVIEWS_FOR_RANKING = 100
+
+TIERS = ["Tier 1", "Tier 2", "Tier 3", "Tier 4"]
+
+
+def classify_tiers(hospitals, min_reviews=MIN_REVIEWS_FOR_RANKING):
+    """
+    Add `RatingMedium`, `Top50%` and a categorical `Tier` column to `hospitals`.
+
+    The medians are taken over all rows of `hospitals`, i.e. over every
+    company being compared, in a single vectorized pass.
+    """
+    ranked_ratings = hospitals["Rating"].where(hospitals["Total Ratings #"] >= min_reviews)
+    median = ranked_ratings.groupby(hospitals["Region"], observed=True).transform("median")
+    top = (hospitals["Rating"] > median).to_numpy()
+    accredited = (hospitals["AAHA Accreditation Status"] == "Yes").to_numpy()
+    codes = (~top).astype("int8") * 2 + (~accredited).astype("int8")
+    return hospitals.assign(
+        RatingMedium=median,
+        **{"Top50%": np.where(top, "Yes", "No")},
+        Tier=pd.Categorical.from_codes(codes, categories=TIERS),
+    )
+
+
+class TierTable:
+    """
+    Classified hospitals sorted by descending rating, with row positions
+    grouped by (company, region, tier) so selections are index lookups, not
+    scans.
+    """
+
+    def __init__(self, hospitals):
+        self.hospitals = hospitals.sort_values("Rating", ascending=False, kind="stable", ignore_index=True)
+        self._groups = self.hospitals.groupby(
+            ["Company", "Region", "Tier"], observed=True, sort=False
+        ).indices
+
+    def _positions(self, company, region, tiers):
+        positions = [
+            rows
+            for (group_company, group_region, group_tier), rows in self._groups.items()
+            if group_company == company
+            and (region == ALL_REGIONS or group_region == region)
+            and group_tier in tiers
+        ]
+        if not positions:
+            return np.empty(0, dtype="int64")
+        return np.sort(np.concatenate(positions))
+
+    def select(self, company, region=ALL_REGIONS, tier=None):
+        """
+        Hospitals of `company` in `region` (optionally one tier), best rated
+        first; Tier 4 lists the worst rated first.
+        """
+        tiers = TIERS if tier is None else [tier]
+        positions = self._positions(company, region, tiers)
+        if tier == TIERS[-1]:
+            positions = positions[::-1]
+        return self.hospitals.iloc[positions]
+
+    def counts(self, company, region=ALL_REGIONS):
+        """Number of hospitals per tier, in TIERS order."""
+        return pd.Series(
+            [len(self._positions(company, region, [tier])) for tier in TIERS], index=TIERS
+        )
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Underserved ("whitespace") areas for Alliance on the zip code density grid.
+
+    python whitespace.py [--competitor "Veterinary Practice Partners"] [--top 10]
+                         [--output whitespace.csv]
+
+Every `us_density` point is scored by how much demand it has that Alliance
+does not reach:
+
+    gap score = log(1 + density) * alliance gap * (1 + competitor presence)
+
+    alliance gap         = 1 - exp(-miles to nearest Alliance branch / REACH_MILES)
+    competitor presence  = exp(-miles to nearest competitor branch / REACH_MILES)
+
+A dense zip code far from any Alliance branch scores high, and a competitor
+branch nearby, which shows the demand is real and is being served by someone
+else, raises the score up to twofold. The highest-scoring points are linked
+into areas when they lie within CLUSTER_MILES of each other, and the areas are
+ranked per region by their summed score.
+
+All distances come from KD-tree queries over the whole grid at once (see
+`spatial_index`), so a million points are scored and clustered in seconds.
+The dashboard computes the areas once per data version and competitor.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from build_bundle import DEFAULT_OUTPUT
+from competitors import ALLIANCE, COMPETITORS, is_available
+from dataset import open_current
+from spatial_index import SpatialIndex
+
+# Distance at which a branch's pull on a zip code has fallen to 1/e
+REACH_MILES = 10.0
+
+# Share of populated zip codes, by gap score, that can be part of an area
+GAP_QUANTILE = 0.95
+
+# Zip codes this close to each other belong to the same area
+CLUSTER_MILES = 10.0
+
+# Columns of `us_density` the scoring reads
+DENSITY_COLUMNS = ["latitude", "longitude", "population", "density", "City", "State"]
+
+# US Census divisions, the regions of the dashboard, by state abbreviation
+STATE_REGIONS = {
+    **dict.fromkeys(["CT", "ME", "MA", "NH", "RI", "VT"], "New England"),
+    **dict.fromkeys(["NJ", "NY", "PA"], "Mid-Atlantic"),
+    **dict.fromkeys(["IL", "IN", "MI", "OH", "WI"], "East North Central"),
+    **dict.fromkeys(["IA", "KS", "MN", "MO", "NE", "ND", "SD"], "West North Central"),
+    **dict.fromkeys(["DE", "DC", "FL", "GA", "MD", "NC", "SC", "VA", "WV"], "South Atlantic"),
+    **dict.fromkeys(["AL", "KY", "MS", "TN"], "East South Central"),
+    **dict.fromkeys(["AR", "LA", "OK", "TX"], "West South Central"),
+    **dict.fromkeys(["AZ", "CO", "ID", "MT", "NV", "NM", "UT", "WY"], "Mountain"),
+    **dict.fromkeys(["AK", "CA", "HI", "OR", "WA"], "Pacific"),
+}
+
+AREA_COLUMNS = [
+    "Region", "Rank", "Area", "latitude", "longitude", "Zip Codes", "Population",
+    "Alliance Miles", "Competitor Miles", "Gap Score",
+]
+
+
+def score_cells(us_density, aa_hospitals, comp_hospitals):
+    """`us_density` with the distances to the nearest branches, the region and the gap score of every point."""
+    cells = us_density.dropna(subset=["latitude", "longitude"]).reset_index(drop=True)
+    latitude, longitude = cells["latitude"], cells["longitude"]
+    # Branches whose location could not be geocoded have no place on the grid
+    aa_hospitals = aa_hospitals.dropna(subset=["latitude", "longitude"])
+    comp_hospitals = comp_hospitals.dropna(subset=["latitude", "longitude"])
+    alliance_miles = SpatialIndex(aa_hospitals["latitude"], aa_hospitals["longitude"]).nearest_miles(latitude, longitude)
+    competitor_miles = SpatialIndex(comp_hospitals["latitude"], comp_hospitals["longitude"]).nearest_miles(latitude, longitude)
+
+    # No branch at all counts as infinitely far away
+    alliance_gap = 1 - np.exp(-np.nan_to_num(alliance_miles, nan=np.inf) / REACH_MILES)
+    competitor_presence = np.exp(-np.nan_to_num(competitor_miles, nan=np.inf) / REACH_MILES)
+    return cells.assign(**{
+        "Region": cells["State"].astype(str).map(STATE_REGIONS),
+        "Alliance Miles": alliance_miles,
+        "Competitor Miles": competitor_miles,
+        "Gap Score": np.log1p(cells["density"].to_numpy(dtype="float64")) * alliance_gap * (1 + competitor_presence),
+    })
+
+
+def cluster_cells(cells, miles=CLUSTER_MILES):
+    """Area number of every row of `cells`; rows within `miles` of each other, directly or in a chain, share one."""
+    pairs = SpatialIndex(cells["latitude"], cells["longitude"]).pairs_within(miles)
+    links = coo_matrix((np.ones(len(pairs), dtype=bool), (pairs[:, 0], pairs[:, 1])), shape=(len(cells), len(cells)))
+    return connected_components(links, directed=False)[1]
+
+
+def find_areas(cells, quantile=GAP_QUANTILE):
+    """Whitespace areas of scored `cells` (see `score_cells`), ranked within each region."""
+    populated = cells[cells["population"] > 0]
+    if not len(populated):
+        return pd.DataFrame(columns=AREA_COLUMNS)
+    gaps = populated[populated["Gap Score"] >= populated["Gap Score"].quantile(quantile)]
+    gaps = gaps[gaps["Region"].notna()].reset_index(drop=True)
+    gaps = gaps.assign(
+        area=cluster_cells(gaps),
+        weighted_latitude=gaps["latitude"] * gaps["population"],
+        weighted_longitude=gaps["longitude"] * gaps["population"],
+    )
+    # An area lies in the region of its most populous zip code and is named after it
+    largest = gaps.sort_values("population", ascending=False, kind="stable").drop_duplicates("area").set_index("area")
+    areas = gaps.groupby("area").agg(**{
+        "Zip Codes": ("population", "size"),
+        "Population": ("population", "sum"),
+        "weighted_latitude": ("weighted_latitude", "sum"),
+        "weighted_longitude": ("weighted_longitude", "sum"),
+        "Alliance Miles": ("Alliance Miles", "min"),
+        "Competitor Miles": ("Competitor Miles", "min"),
+        "Gap Score": ("Gap Score", "sum"),
+    })
+    areas["Region"] = largest["Region"]
+    areas["Area"] = largest["City"].astype(str) + ", " + largest["State"].astype(str)
+    areas["latitude"] = areas.pop("weighted_latitude") / areas["Population"]
+    areas["longitude"] = areas.pop("weighted_longitude") / areas["Population"]
+    areas = areas.sort_values(["Region", "Gap Score"], ascending=[True, False], kind="stable")
+    areas["Rank"] = areas.groupby("Region").cumcount() + 1
+    return areas[AREA_COLUMNS].reset_index(drop=True).round(
+        {"Alliance Miles": 1, "Competitor Miles": 1, "Gap Score": 1}
+    )
+
+
+def build_whitespace(us_density, aa_hospitals, comp_hospitals):
+    """Ranked whitespace areas of Alliance against the branches in `comp_hospitals`."""
+    return find_areas(score_cells(us_density, aa_hospitals, comp_hospitals))
+
+
+def top_areas(areas, region, count=10):
+    """The `count` best areas of `region`, or of all regions for "All"."""
+    if region == "All":
+        return areas.sort_values("Gap Score", ascending=False, kind="stable").head(count)
+    return areas[areas["Region"] == region].head(count)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bundle", default=os.environ.get("AAH_BUNDLE_DIR", DEFAULT_OUTPUT), help="bundle root directory")
+    parser.add_argument(
+        "--competitor",
+        default=next(name for name in COMPETITORS if is_available(name)),
+        help="competitor whose branches count as competitor presence",
+    )
+    parser.add_argument("--top", type=int, default=5, help="areas to print per region")
+    parser.add_argument("--output", help="write all ranked areas to this CSV file")
+    args = parser.parse_args(argv)
+
+    dataset = open_current(args.bundle)
+    areas = build_whitespace(
+        dataset.table("us_density", DENSITY_COLUMNS),
+        dataset.hospitals(ALLIANCE),
+        dataset.hospitals(args.competitor),
+    )
+    if args.output:
+        areas.to_csv(args.output, index=False)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(areas.groupby("Region").head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()